@@ -0,0 +1,267 @@
+"""Memory admission control for uploads: size images from their headers before decoding.
+
+Analysis keeps several copies of a frame alive at once: the decoded BGR
+frame and its gray conversion (which OCR also reads) at full size, and the
+blurred and thresholded images of the contour pass, at full size or at
+ANALYSIS_WORKING_WIDTH. `analysis_bytes` estimates that peak. Uploads are
+sized from the encoded header, downscaled at decode time or rejected when
+they exceed the pixel cap, and every decode + analysis reserves its
+estimate from a process-wide MemoryBudget first.
+
+PNG, JPEG, BMP and WebP are sized from their headers, and GIF too when the
+installed OpenCV can decode it (4.12+; older builds have no GIF decoder, so
+GIF gets a 415 like any unsupported format). Other formats
+OpenCV decodes (TIFF, PNM, Sun raster, JPEG 2000, OpenEXR, Radiance HDR)
+are admitted with a worst-case reservation for a `max_pixels` image and
+held to the pixel cap after decoding (`cap_decoded`). Anything else is
+refused with 415.
+"""
+import struct
+import threading
+import time
+
+import cv2
+import numpy as np
+
+# At full size: BGR (3) + gray, blurred and thresholded (1 each); OCR reads the gray frame
+ANALYSIS_BYTES_PER_PIXEL = 6
+# With a working width: BGR (3) + gray for OCR (1) at full size, plus the
+# resized BGR (3) and its gray, blurred and thresholded images at working size
+FRAME_BYTES_PER_PIXEL = 4
+WORKING_BYTES_PER_PIXEL = 6
+DECODE_BYTES_PER_PIXEL = 3
+REDUCE_FACTORS = (1, 2, 4, 8)
+REDUCED_DECODE_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+# A 1x1 GIF; decoding it tells whether this OpenCV build has a GIF decoder
+_GIF_PROBE = (b'GIF87a\x01\x00\x01\x00\x81\x00\x00' + b'\x00' * 12
+              + b',\x00\x00\x00\x00\x01\x00\x01\x00\x00\x08\x04\x00\x01\x04\x04\x00;')
+OPENCV_DECODES_GIF = cv2.imdecode(np.frombuffer(_GIF_PROBE, dtype=np.uint8), cv2.IMREAD_COLOR) is not None
+SUPPORTED_FORMATS = ('PNG', 'JPEG', 'BMP', 'WebP') + (('GIF',) if OPENCV_DECODES_GIF else ())
+# Formats OpenCV decodes whose size is not read from the header
+UNSIZED_SIGNATURES = {
+    'TIFF': (b'II*\x00', b'MM\x00*'),
+    'PNM': (b'P1', b'P2', b'P3', b'P4', b'P5', b'P6', b'P7', b'PF', b'Pf'),
+    'Sun raster': (b'\x59\xa6\x6a\x95',),
+    'JPEG 2000': (b'\x00\x00\x00\x0cjP  \r\n\x87\n', b'\xff\x4f\xff\x51'),
+    'OpenEXR': (b'v/1\x01',),
+    'Radiance HDR': (b'#?RADIANCE', b'#?RGBE'),
+}
+OVERSIZE_POLICIES = ('downscale', 'reject')
+
+_JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+class AdmissionError(ValueError):
+    """An upload refused by admission control; the message is safe to show to clients.
+
+    `status` is the HTTP status to answer with (413 too large, 415
+    unreadable format, 503 server busy).
+    """
+
+    def __init__(self, message, status=413):
+        super().__init__(message)
+        self.status = status
+
+
+def _jpeg_size(data):
+    # Walks marker segments by their lengths, so large APPn segments (EXIF
+    # thumbnails, ICC profiles, XMP) before the frame header cost nothing
+    i = 2
+    while i + 9 <= len(data):
+        if data[i] != 0xFF:
+            i += 1
+            continue
+        marker = data[i + 1]
+        if marker == 0xFF:
+            i += 1  # fill byte
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            i += 2  # markers without a length field
+            continue
+        if marker in _JPEG_SOF_MARKERS:
+            height, width = struct.unpack('>HH', data[i + 5:i + 9])
+            return width, height
+        if marker == 0xDA:
+            return None  # start of scan without a frame header
+        i += 2 + struct.unpack('>H', data[i + 2:i + 4])[0]
+    return None
+
+
+def read_image_size(data):
+    """(format, width, height) from an encoded image's header, or None if not recognised.
+
+    Only the first bytes are inspected (JPEG: the marker segments up to the
+    frame header); nothing is decoded.
+    """
+    if data[:2] == b'\xff\xd8':
+        jpeg_size = _jpeg_size(data)
+        return ('JPEG',) + jpeg_size if jpeg_size and min(jpeg_size) > 0 else None
+
+    data = bytes(data[:64])
+    size = None
+    if data[:8] == b'\x89PNG\r\n\x1a\n' and data[12:16] == b'IHDR' and len(data) >= 24:
+        size = ('PNG',) + struct.unpack('>II', data[16:24])
+    elif data[:6] in (b'GIF87a', b'GIF89a') and len(data) >= 10:
+        size = ('GIF',) + struct.unpack('<HH', data[6:10])
+    elif data[:2] == b'BM' and len(data) >= 26:
+        width, height = struct.unpack('<ii', data[18:26])
+        size = ('BMP', abs(width), abs(height))  # negative height: top-down rows
+    elif data[:4] == b'RIFF' and data[8:12] == b'WEBP' and len(data) >= 30:
+        chunk = data[12:16]
+        if chunk == b'VP8 ':
+            width, height = struct.unpack('<HH', data[26:30])
+            size = ('WebP', width & 0x3FFF, height & 0x3FFF)
+        elif chunk == b'VP8L':
+            bits = int.from_bytes(data[21:25], 'little')
+            size = ('WebP', (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1)
+        elif chunk == b'VP8X':
+            size = ('WebP', int.from_bytes(data[24:27], 'little') + 1, int.from_bytes(data[27:30], 'little') + 1)
+    if size is None or size[1] <= 0 or size[2] <= 0:
+        return None
+    return size
+
+
+def _too_large(width, height, max_pixels):
+    return AdmissionError(
+        f"Image is {width}x{height} ({width * height / 1e6:.1f} MP); the limit is {max_pixels / 1e6:.1f} MP",
+        status=413)
+
+
+def unsized_format(data):
+    """Name of a decodable format whose size is not read from its header, or None."""
+    for image_format, signatures in UNSIZED_SIGNATURES.items():
+        if bytes(data[:12]).startswith(signatures):
+            return image_format
+    return None
+
+
+def analysis_bytes(width, height, working_width=0):
+    """Estimated peak bytes of analyze_image on a decoded `width` x `height` frame."""
+    if not working_width or width <= working_width:
+        return width * height * ANALYSIS_BYTES_PER_PIXEL
+    working_height = max(1, int(round(height * working_width / width)))
+    return width * height * FRAME_BYTES_PER_PIXEL + working_width * working_height * WORKING_BYTES_PER_PIXEL
+
+
+def plan_decode(data, max_pixels, policy='downscale', working_width=0):
+    """Decide how to decode an upload: returns (reduce_factor, estimated_bytes).
+
+    Images within `max_pixels` decode at full size. Larger ones are decoded
+    at 1/2, 1/4 or 1/8 scale under the 'downscale' policy, or rejected under
+    'reject' (or when even 1/8 scale is over the cap). Formats in
+    UNSIZED_SIGNATURES decode at full size with a worst-case estimate; pass
+    the decoded image through `cap_decoded`. The estimate assumes the
+    contour pass runs at `working_width` (ANALYSIS_WORKING_WIDTH; 0 for
+    full size).
+    """
+    size = read_image_size(data)
+    if size is None:
+        if unsized_format(data):
+            return 1, len(data) + max_pixels * (ANALYSIS_BYTES_PER_PIXEL + DECODE_BYTES_PER_PIXEL)
+        formats = SUPPORTED_FORMATS + tuple(UNSIZED_SIGNATURES)
+        raise AdmissionError(f"Unsupported or corrupt image; expected {', '.join(formats)}", status=415)
+    image_format, width, height = size
+    if image_format not in SUPPORTED_FORMATS:
+        raise AdmissionError(f"{image_format} images are not supported; expected {', '.join(SUPPORTED_FORMATS)}",
+                             status=415)
+
+    for factor in REDUCE_FACTORS:
+        reduced_width, reduced_height = -(-width // factor), -(-height // factor)
+        if reduced_width * reduced_height <= max_pixels:
+            break
+    else:
+        factor = None
+    if factor is None or (factor > 1 and policy == 'reject'):
+        raise _too_large(width, height, max_pixels)
+
+    estimate = len(data) + analysis_bytes(reduced_width, reduced_height, working_width)
+    if factor > 1 and image_format != 'JPEG':
+        # Only JPEG decodes at reduced scale natively; other formats are
+        # decoded at full size and resized inside OpenCV
+        estimate += width * height * DECODE_BYTES_PER_PIXEL
+    return factor, estimate
+
+
+def cap_decoded(img, max_pixels, policy='downscale'):
+    """Hold a decoded image to `max_pixels`: resize it down, or reject it under 'reject'.
+
+    A no-op for images sized by plan_decode; catches formats it could not size.
+    """
+    height, width = img.shape[:2]
+    if width * height <= max_pixels:
+        return img
+    if policy == 'reject':
+        raise _too_large(width, height, max_pixels)
+    scale = (max_pixels / (width * height)) ** 0.5
+    size = (max(1, int(width * scale)), max(1, int(height * scale)))
+    return cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+
+
+class Reservation:
+    """Bytes held from a MemoryBudget; release() is idempotent."""
+
+    def __init__(self, budget, nbytes):
+        self.budget = budget
+        self.nbytes = nbytes
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self.budget._release(self.nbytes)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+class MemoryBudget:
+    """Caps the estimated bytes of all analyses running at once in this process.
+
+    `reserve` waits up to `timeout` seconds for room and raises a 503
+    AdmissionError otherwise. A single reservation larger than the whole
+    budget is admitted once nothing else is running.
+
+    `wait_while` lets a caller that already holds reservations (a batch
+    whose earlier files are still being analysed) wait for its own work
+    without a deadline: the timeout only starts once `wait_while()` is false,
+    so it applies to contention from other requests alone.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.in_flight = 0
+        self.stats = {'admitted': 0, 'rejected_busy': 0}
+        self._condition = threading.Condition()
+
+    def reserve(self, nbytes, timeout=5.0, wait_while=None):
+        nbytes = min(nbytes, self.max_bytes)
+        deadline = None
+        with self._condition:
+            while self.in_flight + nbytes > self.max_bytes:
+                if wait_while is not None and wait_while():
+                    # The caller's own reservations notify us when released
+                    self._condition.wait()
+                    continue
+                if deadline is None:
+                    deadline = time.monotonic() + timeout
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.stats['rejected_busy'] += 1
+                    raise AdmissionError('Server busy analysing other images. Retry shortly.', status=503)
+                self._condition.wait(remaining)
+            self.in_flight += nbytes
+            self.stats['admitted'] += 1
+        return Reservation(self, nbytes)
+
+    def _release(self, nbytes):
+        with self._condition:
+            self.in_flight -= nbytes
+            self._condition.notify_all()
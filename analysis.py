@@ -0,0 +1,281 @@
+"""Layout analysis and matching of decoded frames, independent of the Flask app.
+
+The app calls these with its config; /upload/batch and /upload/page pool
+workers (pool_worker.py) and bulk_match.py import this module directly, so
+they do not start the app's catalog watcher, job threads or caches.
+"""
+import cv2
+import numpy as np
+
+from admission import REDUCED_DECODE_FLAGS, cap_decoded
+from geometry import BOX_AREA, BOX_H, BOX_W, BOX_X, BOX_Y, center_spacing, contour_stats
+from matching import find_best_match
+from metrics import time_stage
+from ocr_backends import find_text_regions, get_ocr_backend
+from vectors import VectorIndex, layout_vector
+
+# Settings that change what an analysis returns for the same image bytes,
+# with their defaults. The app passes its config values for these names
+# with every analysis and folds them into its cache keys.
+DEFAULT_SETTINGS = {
+    'OCR_BACKEND': 'auto',
+    'OCR_REGIONS': False,
+    'ANALYSIS_WORKING_WIDTH': 0,
+    'MAX_IMAGE_PIXELS': 40_000_000,
+    'OVERSIZE_IMAGES': 'downscale',
+    'SCORING_TRACE': False,
+    'VECTOR_MIN_SIMILARITY': 0.5,
+}
+
+
+def decode_image(data, reduce_factor=1, max_pixels=DEFAULT_SETTINGS['MAX_IMAGE_PIXELS'], policy='downscale'):
+    """Decode an encoded image (PNG/JPEG/...) straight from memory. Returns None if undecodable.
+
+    `reduce_factor` (1, 2, 4 or 8) decodes at that fraction of the full size.
+    The result is held to `max_pixels` for formats admission could not size
+    from the header; under the 'reject' `policy` an oversized image raises
+    AdmissionError.
+    """
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    if buffer.size == 0:
+        return None
+    with time_stage('decode'):
+        img_cv = cv2.imdecode(buffer, REDUCED_DECODE_FLAGS[reduce_factor])
+        if img_cv is None:
+            return None
+        return cap_decoded(img_cv, max_pixels, policy)
+
+
+def odd_kernel_size(size):
+    """Nearest odd kernel size >= 3 (GaussianBlur / adaptiveThreshold need odd sizes)."""
+    size = max(3, int(round(size)))
+    return size if size % 2 == 1 else size + 1
+
+
+def analyze_image(img_cv, ocr_backend=None, ocr_regions=False, progress=None, working_width=0):
+    """Layout features of a decoded BGR image: significant boxes, spacing patterns and OCR text blocks.
+
+    `ocr_backend` defaults to the shared 'auto' backend; `ocr_regions` and
+    `working_width` are the OCR_REGIONS and ANALYSIS_WORKING_WIDTH settings.
+    """
+    height, width, _ = img_cv.shape
+    if progress:
+        progress('contours')
+
+    # Geometric pass at a normalised working resolution: 2x/4x exports are
+    # downsampled and the pixel thresholds scaled to match. Boxes are mapped
+    # back to full-resolution coordinates below.
+    with time_stage('blur_threshold'):
+        scale = 1.0
+        geo_img = img_cv
+        if working_width and width > working_width:
+            scale = working_width / width
+            geo_img = cv2.resize(img_cv, (working_width, max(1, int(round(height * scale)))),
+                                 interpolation=cv2.INTER_AREA)
+
+        # Convert to grayscale and apply preprocessing
+        gray = cv2.cvtColor(geo_img, cv2.COLOR_BGR2GRAY)
+        blur_size = 5 if scale == 1.0 else odd_kernel_size(5 * scale)
+        blurred = cv2.GaussianBlur(gray, (blur_size, blur_size), 0)
+
+        # Adaptive thresholding for better edge detection
+        block_size = 11 if scale == 1.0 else odd_kernel_size(11 * scale)
+        thresh = cv2.adaptiveThreshold(blurred, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
+                                     cv2.THRESH_BINARY_INV, block_size, 2)
+    
+    # Find contours
+    with time_stage('contours'):
+        contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    
+    # Analyze layout features. Boxes are kept as an N x 5 array
+    # (x, y, w, h, area; see geometry.BOX_COLUMNS); the JSON payload only
+    # reports their count.
+    layout_features = {
+        'bounding_boxes': np.zeros((0, 5), dtype=np.int64),
+        'text_blocks': [],
+        'grid_patterns': [],
+        'spacing_patterns': [],
+        'element_ratios': np.zeros(0, dtype=np.float64)
+    }
+    
+    # Process significant contours
+    min_contour_area = 500 * scale * scale
+    rects, areas = contour_stats(contours)
+    significant = areas > min_contour_area
+    rects, areas = rects[significant], areas[significant]
+    if scale != 1.0:
+        rects = np.rint(rects / scale).astype(np.int64)
+        areas = areas / (scale * scale)
+    boxes = np.column_stack([rects, areas.astype(np.int64)])
+
+    # Calculate aspect ratios (contour order)
+    widths, heights = boxes[:, BOX_W].astype(np.float64), boxes[:, BOX_H].astype(np.float64)
+    layout_features['element_ratios'] = np.divide(widths, heights, out=np.zeros_like(widths), where=heights > 0)
+    
+    # Sort boxes by area (largest first, stable for equal areas)
+    boxes = boxes[np.argsort(-boxes[:, BOX_AREA], kind='stable')]
+    layout_features['bounding_boxes'] = boxes
+    
+    # Analyze grid patterns
+    if len(boxes) >= 3:
+        # Check for vertical alignment
+        vertical_spacing = center_spacing(boxes[:, BOX_X] + boxes[:, BOX_W] / 2)
+        
+        # Check for horizontal alignment
+        horizontal_spacing = center_spacing(boxes[:, BOX_Y] + boxes[:, BOX_H] / 2)
+        
+        # Store spacing patterns
+        layout_features['spacing_patterns'] = {
+            'vertical': vertical_spacing,
+            'horizontal': horizontal_spacing
+        }
+    
+    # Perform OCR with improved settings
+    if progress:
+        progress('ocr')
+    del geo_img, blurred
+    try:
+        # Tesseract binarises a grayscale image anyway. A full-resolution gray
+        # frame is 1 byte/pixel and PIL wraps it without copying, where an RGB
+        # conversion plus its PIL copy would be 6.
+        ocr_gray = gray if scale == 1.0 else cv2.cvtColor(img_cv, cv2.COLOR_BGR2GRAY)
+
+        if ocr_backend is None:
+            ocr_backend = get_ocr_backend()
+        # Region mode: only recognise candidate text regions from the contour pass
+        regions = None
+        if ocr_regions:
+            regions = [
+                (int(x / scale), int(y / scale), int(round(w / scale)), int(round(h / scale)))
+                for x, y, w, h in find_text_regions(thresh)
+            ]
+        with time_stage('ocr'):
+            ocr_data = ocr_backend.image_to_data(ocr_gray, regions=regions)
+        
+        # Process OCR results
+        detected_blocks = set()
+        min_ocr_confidence = 50
+        for i in range(len(ocr_data['level'])):
+            confidence = int(ocr_data['conf'][i])
+            text = ocr_data['text'][i].strip()
+            if confidence >= min_ocr_confidence and text:
+                block_num = ocr_data['block_num'][i]
+                detected_blocks.add(block_num)
+                
+                # Store text block information
+                text_block = {
+                    'text': text,
+                    'confidence': confidence,
+                    'position': {
+                        'x': ocr_data['left'][i],
+                        'y': ocr_data['top'][i],
+                        'w': ocr_data['width'][i],
+                        'h': ocr_data['height'][i]
+                    }
+                }
+                layout_features['text_blocks'].append(text_block)
+    except Exception as e_ocr:
+        print(f"Error during OCR processing: {e_ocr}")
+    
+    return layout_features
+
+
+def spacing_patterns_to_json(spacing_patterns):
+    if not spacing_patterns:
+        return []
+    return {axis: np.asarray(spacing).tolist() for axis, spacing in spacing_patterns.items()}
+
+
+def guess_dominant_side(layout_features, image_width):
+    """Count boxes either side of the vertical centre line and guess the dominant side."""
+    boxes = layout_features['bounding_boxes']
+    center_x = image_width / 2
+
+    box_centers = boxes[:, BOX_X] + boxes[:, BOX_W] / 2
+    left_box_count = int(np.count_nonzero(box_centers < center_x))
+    right_box_count = len(boxes) - left_box_count
+
+    total_boxes = left_box_count + right_box_count
+    guessed_dominant_side = "balanced"
+    if total_boxes > 0:
+        left_ratio = left_box_count / total_boxes
+        if left_ratio > 0.65:
+            guessed_dominant_side = "left"
+        elif left_ratio < 0.35:
+            guessed_dominant_side = "right"
+
+    return left_box_count, right_box_count, guessed_dominant_side
+
+
+def build_analysis_result(img_cv, matcher, settings, top_k=None, progress=None):
+    """Run layout analysis and matching on a decoded image.
+
+    `matcher` is a compiled catalog or a VectorIndex; `settings` maps the
+    names in DEFAULT_SETTINGS to their values. Returns the
+    JSON-serialisable `analysis` payload used by /upload.
+    `progress(stage)` is called as each pipeline stage starts.
+    """
+    # Enhanced image analysis
+    layout_features = analyze_image(img_cv, ocr_backend=get_ocr_backend(settings['OCR_BACKEND']),
+                                    ocr_regions=settings['OCR_REGIONS'], progress=progress,
+                                    working_width=settings['ANALYSIS_WORKING_WIDTH'])
+
+    # Calculate dominant side
+    left_box_count, right_box_count, guessed_dominant_side = guess_dominant_side(
+        layout_features, img_cv.shape[1]
+    )
+
+    # Find best matching component using enhanced matching
+    if progress:
+        progress('match')
+    # Optional ranked alternatives (top_k); scored in the same batched pass
+    with time_stage('match'):
+        if isinstance(matcher, VectorIndex):
+            ranked_matches = matcher.search(
+                layout_vector(layout_features, img_cv.shape[1], img_cv.shape[0]),
+                k=max(top_k or 1, 1),
+                min_similarity=settings['VECTOR_MIN_SIMILARITY']
+            )
+        else:
+            ranked_matches = find_best_match(
+                matcher,
+                layout_features,
+                guessed_dominant_side,
+                top_k=max(top_k or 1, 1),
+                trace=settings['SCORING_TRACE']
+            )
+    match_info = ranked_matches[0][0] if ranked_matches else None
+
+    match_name = "No suitable match found"
+    match_link = "#"
+    if match_info:
+        match_name = match_info.get('name', match_name)
+        match_link = match_info.get('link', match_link)
+
+    analysis_result = {
+        'significant_box_count': len(layout_features['bounding_boxes']),
+        'layout_features': {
+            'left_box_count': left_box_count,
+            'right_box_count': right_box_count,
+            'text_block_count': len(layout_features['text_blocks']),
+            'spacing_patterns': spacing_patterns_to_json(layout_features['spacing_patterns']),
+            'element_ratios': layout_features['element_ratios'].tolist(),
+            'guessed_dominant_side': guessed_dominant_side
+        },
+        'componentName': match_name,
+        'componentLink': match_link
+    }
+    if top_k is not None:
+        analysis_result['alternatives'] = [
+            {'name': component.get('name'), 'link': component.get('link', '#'), 'score': score}
+            for component, score in ranked_matches
+        ]
+    return analysis_result
+
+
+def analyze_image_bytes(data, matcher, settings, top_k=None, reduce_factor=1):
+    """Decode and analyse one encoded image with build_analysis_result."""
+    img_cv = decode_image(data, reduce_factor, settings['MAX_IMAGE_PIXELS'], settings['OVERSIZE_IMAGES'])
+    if img_cv is None:
+        raise ValueError('Failed to decode image file')
+    return build_analysis_result(img_cv, matcher, settings, top_k=top_k)
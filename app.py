@@ -1,275 +1,433 @@
 import os
+import io
+import hashlib
 import cv2
 import numpy as np
 import json
-import pytesseract
-from PIL import Image
-from flask import Flask, request, jsonify
+from flask import Flask, Request, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
 import traceback
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import analysis
+import pool_worker
+from analysis import DEFAULT_SETTINGS, decode_image, guess_dominant_side, spacing_patterns_to_json
+from catalog import CatalogStore
+from matching import find_best_match
+from vectors import load_vector_index
+from ocr_backends import get_ocr_backend
+from metrics import ADMISSION_REJECTIONS, REGISTRY, REQUEST_SECONDS, REQUESTS_TOTAL, record_stages, time_stage
+from sections import cap_sections, find_section_bounds
+from result_cache import AnalysisCache, cache_key
+from near_duplicates import NearDuplicateIndex, dhash
+from admission import AdmissionError, MemoryBudget, plan_decode
+from jobs import JobQueue, QueueFull
+from payloads import encode_body, negotiate_mimetype, parse_shape_args, shape_analysis
 
 UPLOAD_FOLDER = 'uploads'
-if not os.path.exists(UPLOAD_FOLDER):
-    os.makedirs(UPLOAD_FOLDER)
+
+
+class InMemoryUploadRequest(Request):
+    """Keeps multipart file parts in memory instead of spooling them to temp files.
+
+    Uploads are read into bytes and decoded in memory; Werkzeug's default
+    writes any part over 500 KB to a temporary file first. The buffer is
+    bounded by MAX_CONTENT_LENGTH, which caps the whole request.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return io.BytesIO()
+
 
 app = Flask(__name__)
+app.request_class = InMemoryUploadRequest
 CORS(app)
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+# Uploads are decoded in memory; keeping a copy on disk is opt-in and capped
+app.config['PERSIST_UPLOADS'] = os.environ.get('PERSIST_UPLOADS', '').lower() in ('1', 'true', 'yes')
+app.config['UPLOAD_RETENTION_MAX_FILES'] = int(os.environ.get('UPLOAD_RETENTION_MAX_FILES', 200))
+app.config['UPLOAD_RETENTION_MAX_BYTES'] = int(os.environ.get('UPLOAD_RETENTION_MAX_BYTES', 500 * 1024 * 1024))
+if app.config['PERSIST_UPLOADS'] and not os.path.exists(UPLOAD_FOLDER):
+    os.makedirs(UPLOAD_FOLDER)
 
+# Component catalog: a JSON component list or a binary catalog directory
+# (`python catalog.py compile relume_data.json relume_catalog`). The file is
+# polled every CATALOG_RELOAD_INTERVAL seconds and a changed catalog is
+# rebuilt and swapped in; 0 disables reloading. The watcher thread starts
+# with the first request in each process, not at import, so serve.py's
+# parent forks its workers without it.
 RELUME_DATA_FILE = 'relume_data.json'
-relume_components = []
-try:
-    with open(RELUME_DATA_FILE, 'r') as f:
-        relume_components = json.load(f)
-    print(f"Successfully loaded {len(relume_components)} components from {RELUME_DATA_FILE}")
-except Exception as e:
-    print(f"ERROR loading {RELUME_DATA_FILE}: {e}")
-
-
-def find_best_match(components, layout_features, guessed_dominant_side):
-    best_match_components = []
-    best_score = -1
-    min_match_score_threshold = 5.0  # Increased threshold for better quality matches
-
-    print(f"Matching based on: Layout Features={layout_features}, GuessedSide='{guessed_dominant_side}'")
-
-    for component in components:
-        current_score = 0
-        component_side = component.get('dominant_side', 'unknown').lower()
-        component_type = component.get('layout_type', '').lower()
-        
-        # 1. Side Alignment Score (weight: 2.5)
-        side_score = 0
-        if guessed_dominant_side == 'balanced' and component_side in ['center', 'balanced']:
-            side_score = 2.5
-        elif guessed_dominant_side == component_side:
-            side_score = 2.5
-            # Extra bonus for exact side match on directional layouts
-            if guessed_dominant_side in ['left', 'right'] and component_side == guessed_dominant_side:
-                side_score += 0.5
-        current_score += side_score
-
-        # 2. Box Count Score (weight: 2)
-        box_count = len(layout_features['bounding_boxes'])
-        min_boxes = component.get('min_boxes', 0)
-        max_boxes = component.get('max_boxes', 1000)
-        
-        geo_box_score = 0
-        if min_boxes <= box_count <= max_boxes:
-            geo_box_score = 2
-            # Bonus for being closer to the expected range midpoint
-            expected_mid = (min_boxes + max_boxes) / 2
-            if abs(box_count - expected_mid) <= (max_boxes - min_boxes) / 4:
-                geo_box_score += 0.5
-                
-            # Additional bonus for hero sections with more elements
-            if 'hero' in component_type and box_count >= 8:
-                geo_box_score += 0.5
-        current_score += geo_box_score
-
-        # 3. Text Block Score (weight: 2)
-        text_block_count = len(layout_features['text_blocks'])
-        min_text_blocks = component.get('min_text_blocks', 0)
-        max_text_blocks = component.get('max_text_blocks', 100)
-        
-        ocr_block_score = 0
-        if min_text_blocks <= text_block_count <= max_text_blocks:
-            ocr_block_score = 2
-            # Bonus for being closer to the expected range midpoint
-            expected_mid = (min_text_blocks + max_text_blocks) / 2
-            if abs(text_block_count - expected_mid) <= (max_text_blocks - min_text_blocks) / 4:
-                ocr_block_score += 0.5
-                
-            # Additional bonus for matching text block expectations
-            if 'hero' in component_type and text_block_count >= 2:
-                ocr_block_score += 0.5
-            elif 'cta' in component_type and text_block_count <= 2:
-                ocr_block_score += 0.25
-        current_score += ocr_block_score
-
-        # 4. Grid Pattern Score (weight: 1.5)
-        grid_score = 0
-        if layout_features['spacing_patterns']:
-            vertical_spacing = layout_features['spacing_patterns']['vertical']
-            horizontal_spacing = layout_features['spacing_patterns']['horizontal']
-            
-            # Check for consistent spacing patterns
-            if len(vertical_spacing) >= 2:
-                vertical_consistency = all(abs(s - vertical_spacing[0]) < 10 for s in vertical_spacing)
-                if vertical_consistency:
-                    grid_score += 0.75
-            
-            if len(horizontal_spacing) >= 2:
-                horizontal_consistency = all(abs(s - horizontal_spacing[0]) < 10 for s in horizontal_spacing)
-                if horizontal_consistency:
-                    grid_score += 0.75
-                    
-            # Extra bonus for grid components with consistent spacing
-            if 'grid' in component_type and grid_score > 1:
-                grid_score += 0.5
-        current_score += grid_score
-
-        # 5. Element Ratio Score (weight: 1.5)
-        ratio_score = 0
-        if layout_features['element_ratios']:
-            avg_ratio = sum(layout_features['element_ratios']) / len(layout_features['element_ratios'])
-            
-            # Different ratio expectations for different component types
-            if 'hero' in component_type:
-                if 0.5 <= avg_ratio <= 2.0:  # Hero sections often have balanced ratios
-                    ratio_score += 1.5
-            elif 'cta' in component_type:
-                if 1.0 <= avg_ratio <= 3.0:  # CTAs often have wider elements
-                    ratio_score += 1.0
-            elif 'grid' in component_type:
-                if 0.8 <= avg_ratio <= 1.2:  # Grids often have square-like elements
-                    ratio_score += 1.5
-        current_score += ratio_score
-
-        # 6. Component Type Specific Adjustments
-        if 'hero' in component_type:
-            # Penalize centered hero sections for left/right layouts
-            if component_side == 'center' and guessed_dominant_side in ['left', 'right']:
-                current_score -= 1.0
-            # Bonus for hero sections with appropriate side alignment
-            elif component_side == guessed_dominant_side:
-                current_score += 0.5
-        elif 'cta' in component_type:
-            if box_count <= 5:  # CTAs typically have fewer elements
-                current_score += 0.25
-            # Penalize CTAs for directional layouts
-            if guessed_dominant_side in ['left', 'right']:
-                current_score -= 0.5
-        elif 'grid' in component_type:
-            if grid_score > 0:  # Grids should have consistent spacing
-                current_score += 0.5
-            if len(layout_features['bounding_boxes']) >= 3:  # Grids should have multiple elements
-                current_score += 0.5
-
-        print(f"  - Scoring '{component.get('name')}': Side='{component_side}'(Wt=2.5, Score={side_score}), "
-              f"GeoBoxRange=[{min_boxes}-{max_boxes}](In={min_boxes <= box_count <= max_boxes}, Wt=2, Score={geo_box_score}), "
-              f"OcrBoxRange=[{min_text_blocks}-{max_text_blocks}](In={min_text_blocks <= text_block_count <= max_text_blocks}, "
-              f"Wt=2, Score={ocr_block_score}), GridScore={grid_score}, RatioScore={ratio_score}. Total Score={current_score}")
-
-        # Update best matches
-        if current_score > best_score:
-            best_score = current_score
-            best_match_components = [component]
-        elif current_score == best_score:
-            best_match_components.append(component)
-
-    # No matches found
-    if not best_match_components or best_score < min_match_score_threshold:
-        print(f"No suitable match found (Best score: {best_score} < Threshold: {min_match_score_threshold})")
-        return None
-
-    # If multiple matches with same score, use tiebreakers
-    if len(best_match_components) > 1:
-        # Tiebreaker 1: Prefer components where the box_count is closer to the middle of their range
-        best_match = min(best_match_components, 
-                        key=lambda c: abs(box_count - ((c.get('min_boxes', 0) + c.get('max_boxes', 1000)) / 2)))
-    else:
-        best_match = best_match_components[0]
-
-    print(f"Final Best Match (Score {best_score}): {best_match['name']}")
-    return best_match
-
-
-def analyze_image(img_cv):
-    height, width, _ = img_cv.shape
-    
-    # Convert to grayscale and apply preprocessing
-    gray = cv2.cvtColor(img_cv, cv2.COLOR_BGR2GRAY)
-    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
-    
-    # Adaptive thresholding for better edge detection
-    thresh = cv2.adaptiveThreshold(blurred, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                                 cv2.THRESH_BINARY_INV, 11, 2)
-    
-    # Find contours
-    contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    
-    # Analyze layout features
-    layout_features = {
-        'bounding_boxes': [],
-        'text_blocks': [],
-        'grid_patterns': [],
-        'spacing_patterns': [],
-        'element_ratios': []
-    }
-    
-    # Process significant contours
-    min_contour_area = 500
-    for contour in contours:
-        area = cv2.contourArea(contour)
-        if area > min_contour_area:
-            x, y, w, h = cv2.boundingRect(contour)
-            box = {'x': x, 'y': y, 'w': w, 'h': h, 'area': int(area)}
-            layout_features['bounding_boxes'].append(box)
-            
-            # Calculate aspect ratio
-            aspect_ratio = w / h if h > 0 else 0
-            layout_features['element_ratios'].append(aspect_ratio)
-    
-    # Sort boxes by area
-    layout_features['bounding_boxes'].sort(key=lambda b: b['area'], reverse=True)
-    
-    # Analyze grid patterns
-    if len(layout_features['bounding_boxes']) >= 3:
-        # Check for vertical alignment
-        vertical_centers = [b['x'] + b['w']/2 for b in layout_features['bounding_boxes']]
-        vertical_centers.sort()
-        vertical_spacing = [vertical_centers[i+1] - vertical_centers[i] 
-                          for i in range(len(vertical_centers)-1)]
-        
-        # Check for horizontal alignment
-        horizontal_centers = [b['y'] + b['h']/2 for b in layout_features['bounding_boxes']]
-        horizontal_centers.sort()
-        horizontal_spacing = [horizontal_centers[i+1] - horizontal_centers[i] 
-                            for i in range(len(horizontal_centers)-1)]
-        
-        # Store spacing patterns
-        layout_features['spacing_patterns'] = {
-            'vertical': vertical_spacing,
-            'horizontal': horizontal_spacing
-        }
-    
-    # Perform OCR with improved settings
+app.config['RELUME_CATALOG'] = os.environ.get('RELUME_CATALOG', RELUME_DATA_FILE)
+app.config['CATALOG_RELOAD_INTERVAL'] = float(os.environ.get('CATALOG_RELOAD_INTERVAL', 2.0))
+catalog_store = CatalogStore(app.config['RELUME_CATALOG'], reload_interval=app.config['CATALOG_RELOAD_INTERVAL'])
+
+# Matching mode: 'rules' scores the catalog ranges; 'vectors' ranks components
+# by similarity to reference screenshots (`python vectors.py build ...`).
+# Falls back to rules if the vector index cannot be loaded.
+app.config['MATCH_MODE'] = os.environ.get('MATCH_MODE', 'rules')
+app.config['VECTOR_INDEX'] = os.environ.get('VECTOR_INDEX', 'relume_vectors')
+app.config['VECTOR_MIN_SIMILARITY'] = float(os.environ.get('VECTOR_MIN_SIMILARITY', 0.5))
+vector_index = None
+if app.config['MATCH_MODE'] == 'vectors':
+    try:
+        vector_index = load_vector_index(app.config['VECTOR_INDEX'])
+        print(f"Loaded vector index with {len(vector_index)} components from {app.config['VECTOR_INDEX']}")
+    except Exception as e:
+        print(f"ERROR loading vector index {app.config['VECTOR_INDEX']}: {e} (using rule matching)")
+
+# Analysis results keyed by upload bytes + catalog version. The disk tier is
+# optional (ANALYSIS_CACHE_DIR), survives restarts and is capped like the
+# upload folder (least recently used entries are deleted first).
+app.config['ANALYSIS_CACHE_SIZE'] = int(os.environ.get('ANALYSIS_CACHE_SIZE', 256))
+app.config['ANALYSIS_CACHE_DIR'] = os.environ.get('ANALYSIS_CACHE_DIR') or None
+app.config['ANALYSIS_CACHE_DISK_MAX_FILES'] = int(os.environ.get('ANALYSIS_CACHE_DISK_MAX_FILES', 4096))
+app.config['ANALYSIS_CACHE_DISK_MAX_BYTES'] = int(os.environ.get('ANALYSIS_CACHE_DISK_MAX_BYTES', 256 * 1024 * 1024))
+analysis_cache = AnalysisCache(
+    max_entries=app.config['ANALYSIS_CACHE_SIZE'],
+    disk_dir=app.config['ANALYSIS_CACHE_DIR'],
+    disk_max_entries=app.config['ANALYSIS_CACHE_DISK_MAX_FILES'],
+    disk_max_bytes=app.config['ANALYSIS_CACHE_DISK_MAX_BYTES']
+)
+
+# Near-duplicate reuse (see near_duplicates.py): an upload whose perceptual
+# hash is within NEAR_DUPLICATE_DISTANCE bits (of 512) of one of the last
+# NEAR_DUPLICATE_ENTRIES analysed uploads, at the same size, reuses its
+# analysis. 0 entries disables.
+app.config['NEAR_DUPLICATE_ENTRIES'] = int(os.environ.get('NEAR_DUPLICATE_ENTRIES', 512))
+app.config['NEAR_DUPLICATE_DISTANCE'] = int(os.environ.get('NEAR_DUPLICATE_DISTANCE', 10))
+near_duplicates = NearDuplicateIndex(
+    max_entries=app.config['NEAR_DUPLICATE_ENTRIES'],
+    max_distance=app.config['NEAR_DUPLICATE_DISTANCE']
+)
+
+# /upload/batch fans analysis out across a process pool (OpenCV + OCR are CPU-bound).
+# Workers are started from a forkserver, not forked from this multi-threaded
+# process (a lock held by another thread at fork time would stay locked in
+# the child). They import pool_worker.py, not this app; each job carries the
+# analysis settings and the matcher version to use.
+app.config['BATCH_WORKERS'] = int(os.environ.get('BATCH_WORKERS', os.cpu_count() or 1))
+app.config['BATCH_MAX_FILES'] = int(os.environ.get('BATCH_MAX_FILES', 100))
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+# /upload/page: maximum number of sections analysed per page; the rest of a
+# longer page is analysed together with the last one
+app.config['PAGE_MAX_SECTIONS'] = int(os.environ.get('PAGE_MAX_SECTIONS', 30))
+
+# /jobs: bounded queue of pending analyses served by background worker threads
+app.config['JOB_WORKERS'] = int(os.environ.get('JOB_WORKERS', 2))
+app.config['JOB_QUEUE_SIZE'] = int(os.environ.get('JOB_QUEUE_SIZE', 16))
+
+# Width of the geometric (blur/threshold/contours) pass; wider uploads are
+# downsampled to it. 0 analyses at full resolution.
+app.config['ANALYSIS_WORKING_WIDTH'] = int(os.environ.get('ANALYSIS_WORKING_WIDTH', 0))
+
+# Print the per-component score breakdown for every match (debug only)
+app.config['SCORING_TRACE'] = os.environ.get('SCORING_TRACE', '').lower() in ('1', 'true', 'yes')
+
+# OCR backend: 'auto' (warm tesserocr if installed, else pytesseract), 'tesserocr' or 'tesseract'.
+# OCR_REGIONS restricts recognition to candidate regions from the contour pass.
+app.config['OCR_BACKEND'] = os.environ.get('OCR_BACKEND', 'auto')
+app.config['OCR_REGIONS'] = os.environ.get('OCR_REGIONS', '').lower() in ('1', 'true', 'yes')
+
+# Admission control (see admission.py): request size cap, decoded pixel cap
+# (OVERSIZE_IMAGES 'downscale' decodes at 1/2, 1/4 or 1/8 scale, 'reject'
+# refuses), and a cap on the estimated memory of all analyses running at
+# once in this process; requests wait up to ADMISSION_TIMEOUT seconds for room.
+# PNG, JPEG, BMP and WebP (and GIF on OpenCV builds that decode it) are sized
+# before decoding; TIFF, PNM and the other OpenCV formats are capped after
+# decoding; anything else, or an admitted file OpenCV then fails to decode,
+# gets a 415.
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('MAX_UPLOAD_BYTES', 64 * 1024 * 1024))
+app.config['MAX_IMAGE_PIXELS'] = int(os.environ.get('MAX_IMAGE_PIXELS', 40_000_000))
+app.config['OVERSIZE_IMAGES'] = os.environ.get('OVERSIZE_IMAGES', 'downscale')
+app.config['ANALYSIS_MEMORY_BUDGET'] = int(os.environ.get('ANALYSIS_MEMORY_BUDGET', 2 * 1024 ** 3))
+app.config['ADMISSION_TIMEOUT'] = float(os.environ.get('ADMISSION_TIMEOUT', 5.0))
+memory_budget = MemoryBudget(app.config['ANALYSIS_MEMORY_BUDGET'])
+
+
+def decode_image_bytes(data, reduce_factor=1, max_pixels=None):
+    """analysis.decode_image held to `max_pixels` (default MAX_IMAGE_PIXELS) under OVERSIZE_IMAGES."""
+    return decode_image(data, reduce_factor, max_pixels or app.config['MAX_IMAGE_PIXELS'],
+                        app.config['OVERSIZE_IMAGES'])
+
+
+def admit_upload(data, wait_while=None):
+    """Size an upload from its header and reserve its analysis memory.
+
+    Returns (reduce_factor, reservation); release the reservation once the
+    analysis is finished. Raises AdmissionError (a ValueError with a
+    client-facing message and HTTP status) for oversized, unreadable or
+    currently unaffordable images. See MemoryBudget.reserve for `wait_while`.
+    """
     try:
-        img_rgb = cv2.cvtColor(img_cv, cv2.COLOR_BGR2RGB)
-        img_pil = Image.fromarray(img_rgb)
-        
-        # Configure Tesseract for better text detection
-        custom_config = r'--oem 3 --psm 6 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789.,!?()[]{}:;"\''
-        ocr_data = pytesseract.image_to_data(img_pil, config=custom_config, output_type=pytesseract.Output.DICT)
-        
-        # Process OCR results
-        detected_blocks = set()
-        min_ocr_confidence = 50
-        for i in range(len(ocr_data['level'])):
-            confidence = int(ocr_data['conf'][i])
-            text = ocr_data['text'][i].strip()
-            if confidence >= min_ocr_confidence and text:
-                block_num = ocr_data['block_num'][i]
-                detected_blocks.add(block_num)
-                
-                # Store text block information
-                text_block = {
-                    'text': text,
-                    'confidence': confidence,
-                    'position': {
-                        'x': ocr_data['left'][i],
-                        'y': ocr_data['top'][i],
-                        'w': ocr_data['width'][i],
-                        'h': ocr_data['height'][i]
-                    }
-                }
-                layout_features['text_blocks'].append(text_block)
-    except Exception as e_ocr:
-        print(f"Error during OCR processing: {e_ocr}")
-    
-    return layout_features
+        reduce_factor, estimate = plan_decode(data, app.config['MAX_IMAGE_PIXELS'], app.config['OVERSIZE_IMAGES'],
+                                              app.config['ANALYSIS_WORKING_WIDTH'])
+        reservation = memory_budget.reserve(estimate, timeout=app.config['ADMISSION_TIMEOUT'], wait_while=wait_while)
+    except AdmissionError as e:
+        ADMISSION_REJECTIONS.inc(status=e.status)
+        raise
+    if reduce_factor > 1:
+        print(f"Downscaling oversized upload by {reduce_factor}x at decode")
+    return reduce_factor, reservation
+
+
+def admission_error_response(error):
+    response = jsonify({'error': str(error)})
+    if error.status == 503:
+        response.headers['Retry-After'] = '2'
+    return response, error.status
+
+
+def prune_upload_folder(folder, max_files, max_bytes):
+    """Delete the oldest persisted uploads until the folder is within both caps."""
+    entries = []
+    for name in os.listdir(folder):
+        path = os.path.join(folder, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    entries.sort()
+    total_bytes = sum(size for _, size, _ in entries)
+    while entries and (len(entries) > max_files or total_bytes > max_bytes):
+        _, size, path = entries.pop(0)
+        try:
+            os.remove(path)
+            total_bytes -= size
+        except OSError as e:
+            print(f"Error pruning upload {path}: {e}")
+
+
+def persist_upload(filename, data):
+    """Keep a copy of the upload on disk (PERSIST_UPLOADS) and enforce the retention caps."""
+    folder = app.config['UPLOAD_FOLDER']
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+    with open(os.path.join(folder, filename), 'wb') as f:
+        f.write(data)
+    prune_upload_folder(folder, app.config['UPLOAD_RETENTION_MAX_FILES'],
+                        app.config['UPLOAD_RETENTION_MAX_BYTES'])
+
+
+def analyze_image(img_cv, ocr_backend=None, ocr_regions=None, progress=None, working_width=None):
+    """analysis.analyze_image with OCR_BACKEND, OCR_REGIONS and ANALYSIS_WORKING_WIDTH as defaults."""
+    if ocr_backend is None:
+        ocr_backend = get_ocr_backend(app.config['OCR_BACKEND'])
+    if ocr_regions is None:
+        ocr_regions = app.config['OCR_REGIONS']
+    if working_width is None:
+        working_width = app.config['ANALYSIS_WORKING_WIDTH']
+    return analysis.analyze_image(img_cv, ocr_backend=ocr_backend, ocr_regions=ocr_regions, progress=progress,
+                                  working_width=working_width)
+
+
+def build_analysis_result(img_cv, top_k=None, progress=None):
+    """analysis.build_analysis_result with the active matcher and this app's settings."""
+    matcher = vector_index if vector_index is not None else catalog_store.current()
+    return analysis.build_analysis_result(img_cv, matcher, analysis_settings(), top_k=top_k, progress=progress)
+
+
+def analysis_settings():
+    """This app's values for the settings in analysis.DEFAULT_SETTINGS; sent with every pool job."""
+    return {name: app.config[name] for name in DEFAULT_SETTINGS}
+
+
+def matcher_spec():
+    """(kind, path, version) of the active matcher, for pool workers to load the same one."""
+    if vector_index is not None:
+        return 'vectors', app.config['VECTOR_INDEX'], vector_index.version
+    return 'catalog', catalog_store.path, catalog_store.current().version
+
+
+def matcher_version(spec=None):
+    """Version of the active matcher (or `spec`) and the analysis settings; part of every cache key.
+
+    Changing any setting in analysis.DEFAULT_SETTINGS, e.g. across a restart
+    with a shared ANALYSIS_CACHE_DIR, starts a fresh set of keys.
+    """
+    kind, _, version = spec or matcher_spec()
+    if kind == 'vectors':
+        version = f"vectors-{version}"
+    settings = json.dumps(list(analysis_settings().values()))
+    return f"{version}-{hashlib.sha256(settings.encode('utf-8')).hexdigest()[:12]}"
+
+
+def analyze_or_reuse(img_cv, top_k=None, progress=None):
+    """build_analysis_result, or the stored analysis of a recent near-duplicate upload.
+
+    Returns (analysis_result, reused_distance); the distance is None when
+    the image was analysed.
+    """
+    scope = f"{matcher_version()}:top_k={top_k}"
+    size = img_cv.shape[:2]
+    with time_stage('hash'):
+        image_hash = dhash(img_cv)
+    reused = near_duplicates.find(image_hash, scope, size)
+    if reused is not None:
+        return reused
+    analysis_result = build_analysis_result(img_cv, top_k=top_k, progress=progress)
+    near_duplicates.add(image_hash, scope, size, analysis_result)
+    return analysis_result, None
+
+
+def reuse_fields(reused_distance):
+    """Response flags for analyze_or_reuse: 'reused', plus the hash distance when reused."""
+    if reused_distance is None:
+        return {'reused': False}
+    return {'reused': True, 'reused_distance': reused_distance}
+
+
+def get_process_pool():
+    """Lazily create the shared analysis process pool."""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            context = multiprocessing.get_context('forkserver')
+            # Workers fork from a server that has already imported the analysis modules
+            context.set_forkserver_preload(['pool_worker'])
+            _process_pool = ProcessPoolExecutor(max_workers=app.config['BATCH_WORKERS'], mp_context=context)
+        return _process_pool
+
+
+def reset_process_pool():
+    """Drop a broken pool so the next batch starts a fresh one."""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+
+
+def run_analysis_job(payload, progress):
+    """JobQueue handler for /jobs: decode, analyse and match one upload."""
+    key = cache_key(payload['data'], matcher_version(), f"top_k={payload['top_k']}")
+    analysis_result = analysis_cache.get(key)
+    if analysis_result is not None:
+        return {'filename': payload['filename'], 'analysis': analysis_result, 'cached': True, 'reused': False}
+
+    progress('decode')
+    reduce_factor, reservation = admit_upload(payload['data'])
+    with reservation:
+        img_cv = decode_image_bytes(payload['data'], reduce_factor)
+        if img_cv is None:
+            raise ValueError('Failed to decode image file')
+
+        analysis_result, reused_distance = analyze_or_reuse(img_cv, top_k=payload['top_k'], progress=progress)
+    analysis_cache.put(key, analysis_result)
+    return {'filename': payload['filename'], 'analysis': analysis_result, 'cached': False,
+            **reuse_fields(reused_distance)}
+
+
+job_queue = JobQueue(
+    run_analysis_job,
+    workers=app.config['JOB_WORKERS'],
+    max_queued=app.config['JOB_QUEUE_SIZE']
+)
+
+# Readiness (/ready): filled in by warm_up() once OpenCV, OCR and the
+# catalog have each handled a sample frame in this process
+readiness = {'ready': False, 'checks': {}, 'checked_at': None}
+WARM_UP_RETRY_SECONDS = 10
+_warm_up_lock = threading.Lock()
+_warm_up_thread = None
+_warm_up_thread_lock = threading.Lock()
+
+
+def _warm_up_frame():
+    img = np.full((240, 640, 3), 255, np.uint8)
+    cv2.rectangle(img, (20, 20), (300, 220), (40, 40, 40), 2)
+    cv2.putText(img, 'Warm up', (340, 130), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (20, 20, 20), 2, cv2.LINE_AA)
+    return img
+
+
+def _run_check(checks, name, check):
+    start = time.perf_counter()
+    try:
+        details = check() or {}
+    except Exception as e:
+        checks[name] = {'ok': False, 'error': str(e)}
+        print(f"Warm-up check '{name}' failed: {e}")
+    else:
+        checks[name] = {'ok': True, 'seconds': round(time.perf_counter() - start, 4), **details}
+
+
+def warm_up():
+    """Run each pipeline stage once so the first real request does not pay for it.
+
+    Loads the OCR backend and its language model, exercises the OpenCV
+    decode/contour path and scores the catalog. Results are recorded in
+    `readiness`; returns True when every check passed.
+    """
+    with _warm_up_lock:
+        img = _warm_up_frame()
+
+        def check_opencv():
+            ok, buf = cv2.imencode('.png', img)
+            decoded = decode_image_bytes(buf.tobytes())
+            gray = cv2.cvtColor(decoded, cv2.COLOR_BGR2GRAY)
+            _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+            contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            if not ok or not contours:
+                raise RuntimeError('OpenCV round trip produced no contours')
+            return {'version': cv2.__version__}
+
+        def check_ocr():
+            backend = get_ocr_backend(app.config['OCR_BACKEND'])
+            backend.image_to_data(cv2.cvtColor(img, cv2.COLOR_BGR2GRAY))
+            return {'backend': backend.name}
+
+        def check_catalog():
+            catalog = catalog_store.current()
+            if len(catalog) == 0:
+                raise RuntimeError(f"No components loaded from {catalog_store.path}")
+            empty_layout = {'bounding_boxes': np.zeros((0, 5), dtype=np.int64), 'text_blocks': [],
+                            'spacing_patterns': [], 'element_ratios': np.zeros(0)}
+            find_best_match(catalog, empty_layout, 'balanced')
+            return {'components': len(catalog), 'version': catalog.version}
+
+        checks = {}
+        _run_check(checks, 'opencv', check_opencv)
+        _run_check(checks, 'ocr', check_ocr)
+        _run_check(checks, 'catalog', check_catalog)
+        readiness['checks'] = checks
+        readiness['ready'] = all(check['ok'] for check in checks.values())
+        readiness['checked_at'] = time.monotonic()
+        return readiness['ready']
+
+
+def start_warm_up():
+    """Run warm_up() in a background thread unless one is already running."""
+    global _warm_up_thread
+    with _warm_up_thread_lock:
+        if _warm_up_thread is None or not _warm_up_thread.is_alive():
+            _warm_up_thread = threading.Thread(target=warm_up, name='warm-up', daemon=True)
+            _warm_up_thread.start()
+
+
+def payload_response(payload, status=200):
+    """Serialise a result payload in the format and encoding the client accepts."""
+    mimetype = negotiate_mimetype(request.accept_mimetypes)
+    body, content_encoding = encode_body(payload, mimetype, request.accept_encodings['gzip'] > 0)
+    response = Response(body, status=status, mimetype=mimetype)
+    if content_encoding:
+        response.headers['Content-Encoding'] = content_encoding
+    response.vary.update(('Accept', 'Accept-Encoding'))
+    return response
+
+
+def shape_job_info(job_info, profile, fields):
+    result = job_info.get('result')
+    if result and 'analysis' in result:
+        job_info = {**job_info, 'result': {**result, 'analysis': shape_analysis(result['analysis'], profile, fields)}}
+    return job_info
 
 
 @app.route('/')
@@ -284,70 +442,60 @@ def upload_file():
     if file.filename == '':
         return jsonify({'error': 'No selected file'}), 400
 
+    try:
+        profile, fields = parse_shape_args(request.values)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
     if file:
         filename = secure_filename(file.filename)
-        save_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        top_k = request.values.get('top_k', type=int)
 
         try:
-            file.save(save_path)
-            print(f"File saved: {filename}")
-            img_cv = cv2.imread(save_path)
-
-            if img_cv is None:
-                print(f"Error: OpenCV could not load image: {save_path}")
-                return jsonify({'error': 'Failed to process image file on server'}), 500
-            
-            # Enhanced image analysis
-            layout_features = analyze_image(img_cv)
-            
-            # Calculate dominant side
-            left_box_count = 0
-            right_box_count = 0
-            center_x = img_cv.shape[1] / 2
-            
-            for box in layout_features['bounding_boxes']:
-                if (box['x'] + box['w'] / 2) < center_x:
-                    left_box_count += 1
-                else:
-                    right_box_count += 1
-            
-            total_boxes = left_box_count + right_box_count
-            guessed_dominant_side = "balanced"
-            if total_boxes > 0:
-                left_ratio = left_box_count / total_boxes
-                if left_ratio > 0.65:
-                    guessed_dominant_side = "left"
-                elif left_ratio < 0.35:
-                    guessed_dominant_side = "right"
-
-            # Find best matching component using enhanced matching
-            match_info = find_best_match(
-                relume_components,
-                layout_features,
-                guessed_dominant_side
-            )
-
-            match_name = "No suitable match found"
-            match_link = "#"
-            if match_info:
-                match_name = match_info.get('name', match_name)
-                match_link = match_info.get('link', match_link)
-
-            analysis_result = {
-                'significant_box_count': len(layout_features['bounding_boxes']),
-                'layout_features': {
-                    'left_box_count': left_box_count,
-                    'right_box_count': right_box_count,
-                    'text_block_count': len(layout_features['text_blocks']),
-                    'spacing_patterns': layout_features['spacing_patterns'],
-                    'element_ratios': layout_features['element_ratios'],
-                    'guessed_dominant_side': guessed_dominant_side
-                },
-                'componentName': match_name,
-                'componentLink': match_link
-            }
-            
-            return jsonify({'message': 'Analysis complete', 'filename': filename, 'analysis': analysis_result}), 200
+            # Identical bytes + catalog version -> reuse the stored analysis without decoding
+            file_bytes = file.read()
+            key = cache_key(file_bytes, matcher_version(), f"top_k={top_k}")
+            analysis_result = analysis_cache.get(key)
+            if analysis_result is not None:
+                print(f"Analysis cache hit: {filename}")
+                return payload_response({'message': 'Analysis complete', 'filename': filename,
+                                         'analysis': shape_analysis(analysis_result, profile, fields),
+                                         'cached': True, 'reused': False})
+
+            try:
+                reduce_factor, reservation = admit_upload(file_bytes)
+            except AdmissionError as e:
+                print(f"Upload refused by admission control: {filename}: {e}")
+                return admission_error_response(e)
+
+            with reservation:
+                # Decode from the request buffer; no disk round trip
+                try:
+                    img_cv = decode_image_bytes(file_bytes, reduce_factor)
+                except AdmissionError as e:
+                    ADMISSION_REJECTIONS.inc(status=e.status)
+                    print(f"Upload refused by admission control: {filename}: {e}")
+                    return admission_error_response(e)
+
+                if img_cv is None:
+                    print(f"Error: OpenCV could not decode image: {filename}")
+                    return jsonify({'error': 'Unsupported or corrupt image file'}), 415
+
+                # Only uploads that were admitted and decoded are kept
+                if app.config['PERSIST_UPLOADS']:
+                    persist_upload(filename, file_bytes)
+                    print(f"File saved: {filename}")
+
+                # A near-duplicate of a recent upload reuses its analysis
+                analysis_result, reused_distance = analyze_or_reuse(img_cv, top_k=top_k)
+                del img_cv
+            analysis_cache.put(key, analysis_result)
+            if reused_distance is not None:
+                print(f"Near-duplicate reused ({reused_distance} bits apart): {filename}")
+
+            return payload_response({'message': 'Analysis complete', 'filename': filename,
+                                     'analysis': shape_analysis(analysis_result, profile, fields),
+                                     'cached': False, **reuse_fields(reused_distance)})
 
         except Exception as e:
             print(f"Error processing file: {e}")
@@ -356,5 +504,305 @@ def upload_file():
     else:
         return jsonify({'error': 'Invalid file object received'}), 500
 
+
+@app.route('/upload/batch', methods=['POST'])
+def upload_batch():
+    files = request.files.getlist('files') or request.files.getlist('file')
+    files = [f for f in files if f and f.filename != '']
+    if not files:
+        return jsonify({'error': 'No files part'}), 400
+    if len(files) > app.config['BATCH_MAX_FILES']:
+        return jsonify({'error': f"Too many files (max {app.config['BATCH_MAX_FILES']})"}), 400
+
+    try:
+        profile, fields = parse_shape_args(request.values)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    top_k = request.values.get('top_k', type=int)
+    results = [None] * len(files)
+    pending = []
+    # One matcher for the whole batch; workers are told which version to load
+    spec, settings = matcher_spec(), analysis_settings()
+    version = matcher_version(spec)
+
+    for index, file in enumerate(files):
+        filename = secure_filename(file.filename)
+        file_bytes = file.read()
+        key = cache_key(file_bytes, version, f"top_k={top_k}")
+        analysis_result = analysis_cache.get(key)
+        if analysis_result is not None:
+            results[index] = {'filename': filename, 'analysis': shape_analysis(analysis_result, profile, fields),
+                              'cached': True}
+        else:
+            pending.append((index, filename, key, file_bytes))
+
+    # Files are admitted one by one as memory frees up; each reservation is
+    # released when its worker finishes. While earlier files of this batch
+    # are still running, later ones wait for them instead of timing out.
+    futures = []
+
+    def batch_running():
+        return any(not future.done() for _, _, _, future in futures)
+
+    try:
+        pool = get_process_pool()
+        for index, filename, key, file_bytes in pending:
+            try:
+                reduce_factor, reservation = admit_upload(file_bytes, wait_while=batch_running)
+            except AdmissionError as e:
+                results[index] = {'filename': filename, 'error': str(e)}
+                continue
+            try:
+                future = pool.submit(pool_worker.analyze_upload, file_bytes, spec, settings, top_k, reduce_factor)
+            except Exception:
+                reservation.release()
+                raise
+            future.add_done_callback(lambda _, reservation=reservation: reservation.release())
+            futures.append((index, filename, key, future))
+    except Exception as e:
+        print(f"Error starting batch analysis: {e}")
+        traceback.print_exc()
+        reset_process_pool()
+        return jsonify({'error': 'Failed to start batch analysis on server'}), 500
+
+    # Per-file failures are reported in place and do not fail the batch
+    for index, filename, key, future in futures:
+        try:
+            analysis_result, worker_version, stages = future.result()
+            record_stages(stages)
+            if worker_version == spec[2]:  # not if the catalog changed again before the worker loaded it
+                analysis_cache.put(key, analysis_result)
+            results[index] = {'filename': filename, 'analysis': shape_analysis(analysis_result, profile, fields),
+                              'cached': False}
+        except ValueError as e:
+            results[index] = {'filename': filename, 'error': str(e)}
+        except BrokenProcessPool as e:
+            print(f"Batch worker died while processing {filename}: {e}")
+            reset_process_pool()
+            results[index] = {'filename': filename, 'error': 'Analysis worker crashed'}
+        except Exception as e:
+            print(f"Error processing file {filename}: {e}")
+            results[index] = {'filename': filename, 'error': 'Failed to process file on server'}
+
+    return payload_response({'message': 'Batch analysis complete', 'results': results})
+
+
+@app.route('/upload/page', methods=['POST'])
+def upload_page():
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file part'}), 400
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({'error': 'No selected file'}), 400
+
+    try:
+        profile, fields = parse_shape_args(request.values)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    filename = secure_filename(file.filename)
+    top_k = request.values.get('top_k', type=int)
+    file_bytes = file.read()
+    try:
+        reduce_factor, reservation = admit_upload(file_bytes)
+    except AdmissionError as e:
+        print(f"Page refused by admission control: {filename}: {e}")
+        return admission_error_response(e)
+
+    try:
+        img_cv = decode_image_bytes(file_bytes, reduce_factor)
+    except AdmissionError as e:
+        reservation.release()
+        ADMISSION_REJECTIONS.inc(status=e.status)
+        print(f"Page refused by admission control: {filename}: {e}")
+        return admission_error_response(e)
+    del file_bytes
+    if img_cv is None:
+        reservation.release()
+        print(f"Error: OpenCV could not decode image: {filename}")
+        return jsonify({'error': 'Unsupported or corrupt image file'}), 415
+
+    page_height, page_width = img_cv.shape[:2]
+    try:
+        detected_bounds = find_section_bounds(img_cv)
+        section_bounds = cap_sections(detected_bounds, app.config['PAGE_MAX_SECTIONS'])
+        spec, settings = matcher_spec(), analysis_settings()
+        pool = get_process_pool()
+        futures = {
+            pool.submit(pool_worker.analyze_section, np.ascontiguousarray(img_cv[y0:y1]), spec, settings, top_k):
+                (index, y0, y1)
+            for index, (y0, y1) in enumerate(section_bounds)
+        }
+    except Exception as e:
+        print(f"Error starting page analysis: {e}")
+        traceback.print_exc()
+        reset_process_pool()
+        reservation.release()
+        return jsonify({'error': 'Failed to start page analysis on server'}), 500
+    del img_cv
+
+    # NDJSON: one header line, then one line per section as soon as it is
+    # matched (completion order, so check 'index'), then a summary line
+    def stream():
+        started = time.perf_counter()
+        yield json.dumps({'type': 'page', 'filename': filename, 'width': page_width, 'height': page_height,
+                          'downscale': reduce_factor, 'section_count': len(section_bounds),
+                          'detected_section_count': len(detected_bounds)}) + '\n'
+        for future in as_completed(futures):
+            index, y0, y1 = futures[future]
+            section = {'type': 'section', 'index': index, 'bounds': {'y': y0, 'h': y1 - y0}}
+            try:
+                analysis_result, _, stages = future.result()
+                record_stages(stages)
+                section['analysis'] = shape_analysis(analysis_result, profile, fields)
+            except BrokenProcessPool as e:
+                print(f"Page worker died while processing section {index}: {e}")
+                reset_process_pool()
+                section['error'] = 'Analysis worker crashed'
+            except Exception as e:
+                print(f"Error processing section {index} of {filename}: {e}")
+                section['error'] = 'Failed to process section on server'
+            yield json.dumps(section) + '\n'
+        yield json.dumps({'type': 'done', 'elapsed_ms': round((time.perf_counter() - started) * 1000, 1)}) + '\n'
+
+    response = Response(stream(), mimetype='application/x-ndjson',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # The page's memory stays reserved until the stream is finished or dropped
+    response.call_on_close(reservation.release)
+    return response
+
+
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file part'}), 400
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({'error': 'No selected file'}), 400
+
+    payload = {
+        'filename': secure_filename(file.filename),
+        'data': file.read(),
+        'top_k': request.values.get('top_k', type=int),
+    }
+    try:
+        job = job_queue.submit(payload)
+    except QueueFull as e:
+        print(f"Rejecting job: {e}")
+        response = jsonify({'error': 'Server busy, too many queued analyses. Retry shortly.'})
+        response.headers['Retry-After'] = '2'
+        return response, 429
+
+    return jsonify({
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': f"/jobs/{job.id}",
+        'events_url': f"/jobs/{job.id}/events"
+    }), 202
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    try:
+        profile, fields = parse_shape_args(request.values)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    job_info = job_queue.snapshot(job_id)
+    if job_info is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return payload_response(shape_job_info(job_info, profile, fields))
+
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    try:
+        profile, fields = parse_shape_args(request.values)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if job_queue.get(job_id) is None:
+        return jsonify({'error': 'Unknown job'}), 404
+
+    def stream():
+        version = -1
+        while True:
+            new_version, job_info = job_queue.wait_for_change(job_id, version, timeout=15)
+            if job_info is None:
+                yield f"event: error\ndata: {json.dumps({'error': 'Unknown job'})}\n\n"
+                return
+            if new_version == version:
+                yield ": keep-alive\n\n"
+                continue
+            version = new_version
+            job_info = shape_job_info(job_info, profile, fields)
+            yield f"event: {job_info['status']}\ndata: {json.dumps(job_info)}\n\n"
+            if job_info['status'] in ('done', 'error'):
+                return
+
+    return Response(stream_with_context(stream()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    catalog_store.start_watching()  # no-op once this process has a watcher
+
+
+@app.after_request
+def record_request_metrics(response):
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    REQUESTS_TOTAL.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    if 'request_start' in g:
+        REQUEST_SECONDS.observe(time.perf_counter() - g.request_start, endpoint=endpoint)
+    return response
+
+
+REGISTRY.callback('relume_analysis_cache_events_total', 'Analysis cache hits, disk hits, misses and evictions.',
+                  lambda: {event: analysis_cache.stats[event]
+                           for event in ('hits', 'disk_hits', 'misses', 'evictions', 'disk_evictions')},
+                  metric_type='counter', label_name='event')
+REGISTRY.callback('relume_analysis_cache_entries', 'Entries in the in-memory analysis cache.', lambda: len(analysis_cache))
+REGISTRY.callback('relume_near_duplicate_events_total', 'Near-duplicate index hits, misses and evictions.',
+                  lambda: dict(near_duplicates.stats), metric_type='counter', label_name='event')
+REGISTRY.callback('relume_job_queue_depth', 'Analysis jobs waiting for a worker.', lambda: job_queue.stats()['queued'])
+REGISTRY.callback('relume_admission_in_flight_bytes', 'Estimated memory reserved by running analyses.',
+                  lambda: memory_budget.in_flight)
+REGISTRY.callback('relume_catalog_components', 'Components in the loaded catalog.', lambda: len(catalog_store.current()))
+REGISTRY.callback('relume_catalog_reloads_total', 'Catalog reloads and failed reload attempts.',
+                  lambda: dict(catalog_store.stats), metric_type='counter', label_name='event')
+
+
+@app.route('/ready', methods=['GET'])
+def ready():
+    """Readiness probe: 200 once warm_up() has passed in this worker, 503 until then."""
+    checked_at = readiness['checked_at']
+    if not readiness['ready'] and (checked_at is None or time.monotonic() - checked_at >= WARM_UP_RETRY_SECONDS):
+        start_warm_up()  # first probe, or a retry after failed checks
+    if readiness['ready']:
+        status = 'ready'
+    else:
+        status = 'unavailable' if readiness['checks'] else 'starting'
+    body = {'status': status, 'checks': readiness['checks'], 'pid': os.getpid()}
+    return jsonify(body), 200 if readiness['ready'] else 503
+
+
+@app.errorhandler(413)
+def request_too_large(error):
+    ADMISSION_REJECTIONS.inc(status=413)
+    limit_mb = app.config['MAX_CONTENT_LENGTH'] / (1024 * 1024)
+    return jsonify({'error': f"Upload too large; the limit is {limit_mb:g} MB per request"}), 413
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify(dict(analysis_cache.snapshot(), near_duplicates=near_duplicates.snapshot())), 200
+
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,259 @@
+"""Performance benchmarks for feature extraction, matching and the /upload endpoint.
+
+Usage (from the repository root):
+
+    python -m benchmarks.run_benchmarks --output benchmarks/baselines/local.json
+    python -m benchmarks.run_benchmarks --baseline benchmarks/baselines/local.json
+
+With --baseline, cases whose p50 latency regressed by more than
+--tolerance (default 25%) are reported and the exit status is 1.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+
+import numpy as np
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from benchmarks.synthetic import LAYOUT_KINDS, encode_png, generate_catalog, render_layout
+
+PROFILES = {
+    'quick': {'scales': (1, 2), 'elements': (3,), 'catalog_sizes': (10, 1000), 'iterations': 5},
+    'full': {'scales': (1, 2, 4), 'elements': (3, 9, 18), 'catalog_sizes': (10, 100, 1000, 10000, 50000),
+             'iterations': 20},
+}
+
+
+def _null_ocr_backend():
+    from ocr_backends import NullOcrBackend
+
+    return NullOcrBackend()
+
+
+def _rss_kb():
+    with open('/proc/self/status') as f:
+        fields = dict(line.split(':', 1) for line in f)
+    return int(fields['VmRSS'].split()[0]), int(fields['VmHWM'].split()[0])
+
+
+def reset_peak_rss():
+    """Reset this process's peak RSS and return the current RSS in KB; None where unsupported.
+
+    Uses /proc/self/clear_refs (Linux 4.0+), so the peak read afterwards
+    covers only what ran since, not the whole benchmark process.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return _rss_kb()[0]
+    except OSError:
+        return None
+
+
+def measure(fn, iterations, warmup=1):
+    """Run `fn` repeatedly and summarise latency, throughput and peak memory.
+
+    Latency is timed without tracing; peak Python/NumPy memory comes from
+    one extra run under tracemalloc. The process peak RSS is reset before
+    each case, so `peak_rss_kb` and `rss_growth_kb` (peak minus RSS at the
+    start of the case) belong to this case alone.
+    """
+    rss_start = reset_peak_rss()
+    with redirect_stdout(io.StringIO()):
+        for _ in range(warmup):
+            fn()
+
+        samples = []
+        started = time.perf_counter()
+        for _ in range(iterations):
+            t0 = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - t0)
+        elapsed = time.perf_counter() - started
+
+        tracemalloc.start()
+        fn()
+        _, python_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    peak_rss = _rss_kb()[1] if rss_start is not None else None
+    samples_ms = np.array(samples) * 1000
+    return {
+        'iterations': iterations,
+        'throughput_per_s': round(iterations / elapsed, 3) if elapsed > 0 else None,
+        'mean_ms': round(float(samples_ms.mean()), 3),
+        'p50_ms': round(float(np.percentile(samples_ms, 50)), 3),
+        'p99_ms': round(float(np.percentile(samples_ms, 99)), 3),
+        # tracemalloc sees Python and NumPy allocations; OpenCV's own buffers
+        # only show up in the peak RSS
+        'python_peak_bytes': python_peak,
+        'peak_rss_kb': peak_rss,
+        'rss_growth_kb': peak_rss - rss_start if peak_rss is not None else None,
+    }
+
+
+def bench_extraction(profile, ocr):
+    import app
+
+    backend = None if ocr else _null_ocr_backend()
+    results = {}
+    for kind in LAYOUT_KINDS:
+        for scale in profile['scales']:
+            for elements in profile['elements']:
+                img = render_layout(kind, scale=scale, elements=elements)
+                name = f"extract/{kind}/{scale}x/{elements}el"
+                results[name] = measure(lambda: app.analyze_image(img, ocr_backend=backend), profile['iterations'])
+                results[name]['pixels'] = int(img.shape[0] * img.shape[1])
+    return results
+
+
+def bench_matching(profile):
+    import app
+    from catalog import CatalogIndex
+    from matching import compile_catalog, find_best_match
+
+    features = app.analyze_image(render_layout('hero', elements=6), ocr_backend=_null_ocr_backend())
+    results = {}
+    for size in profile['catalog_sizes']:
+        for indexed in (False, True):
+            catalog = compile_catalog(generate_catalog(size))
+            if indexed:
+                catalog.index = CatalogIndex(catalog)
+            name = f"match{'-indexed' if indexed else ''}/catalog={size}"
+            results[name] = measure(lambda: find_best_match(catalog, features, 'left', top_k=5),
+                                    profile['iterations'] * 5)
+            results[name]['catalog_size'] = size
+
+    # Nearest-neighbour mode: random reference vectors (search cost does not depend on their values)
+    from vectors import VECTOR_DIM, VectorIndex, layout_vector
+
+    query = layout_vector(features, 1440, 900)
+    rng = np.random.default_rng(0)
+    for size in profile['catalog_sizes']:
+        vectors = rng.standard_normal((size, VECTOR_DIM)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        index = VectorIndex(generate_catalog(size), vectors)
+        name = f"match-vectors/catalog={size}"
+        results[name] = measure(lambda: index.search(query, k=5), profile['iterations'] * 5)
+        results[name]['catalog_size'] = size
+    return results
+
+
+def bench_endpoint(profile, ocr):
+    import app
+
+    client = app.app.test_client()
+    payloads = {kind: encode_png(render_layout(kind, elements=6)) for kind in LAYOUT_KINDS}
+    results = {}
+    original_get_ocr_backend = app.get_ocr_backend
+    try:
+        if not ocr:
+            null_backend = _null_ocr_backend()
+            app.get_ocr_backend = lambda name: null_backend
+        for kind, png in payloads.items():
+            def upload():
+                # Measure real work, not exact-cache or near-duplicate hits
+                app.analysis_cache.clear()
+                app.near_duplicates.clear()
+                response = client.post('/upload', data={'file': (io.BytesIO(png), f"{kind}.png")},
+                                       content_type='multipart/form-data')
+                assert response.status_code == 200, response.get_data(as_text=True)
+
+            results[f"endpoint/upload/{kind}"] = measure(upload, profile['iterations'])
+    finally:
+        app.get_ocr_backend = original_get_ocr_backend
+    return results
+
+
+def run(profile_name='quick', ocr=False, suites=('extract', 'match', 'endpoint')):
+    import cv2
+
+    profile = PROFILES[profile_name]
+    results = {}
+    if 'extract' in suites:
+        results.update(bench_extraction(profile, ocr))
+    if 'match' in suites:
+        results.update(bench_matching(profile))
+    if 'endpoint' in suites:
+        results.update(bench_endpoint(profile, ocr))
+
+    return {
+        'meta': {
+            'profile': profile_name,
+            'ocr': ocr,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'opencv': cv2.__version__,
+            'machine': platform.machine(),
+            'cpu_count': os.cpu_count(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': results,
+    }
+
+
+def compare(report, baseline, tolerance):
+    """Cases whose p50 latency grew by more than `tolerance` relative to the baseline."""
+    regressions = []
+    for name, current in report['results'].items():
+        previous = baseline.get('results', {}).get(name)
+        if not previous or not previous.get('p50_ms'):
+            continue
+        change = current['p50_ms'] / previous['p50_ms'] - 1
+        if change > tolerance:
+            regressions.append((name, previous['p50_ms'], current['p50_ms'], change))
+    return regressions
+
+
+def print_report(report):
+    print(f"{'case':45} {'p50 ms':>10} {'p99 ms':>10} {'ops/s':>10} {'py peak KB':>11} {'RSS +KB':>9}")
+    for name, result in report['results'].items():
+        rss_growth = result['rss_growth_kb']
+        print(f"{name:45} {result['p50_ms']:>10.2f} {result['p99_ms']:>10.2f} "
+              f"{result['throughput_per_s']:>10.1f} {result['python_peak_bytes'] / 1024:>11.0f} "
+              f"{rss_growth if rss_growth is not None else '-':>9}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark layout analysis, matching and /upload.')
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='quick')
+    parser.add_argument('--suite', action='append', choices=('extract', 'match', 'endpoint'),
+                        help='Only run the given suite (repeatable). Default: all.')
+    parser.add_argument('--ocr', action='store_true', help='Include OCR (needs tesseract); off by default.')
+    parser.add_argument('--output', help='Write the JSON report here (e.g. a new baseline).')
+    parser.add_argument('--baseline', help='Compare against a previously saved JSON report.')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed p50 slowdown (0.25 = 25%%).')
+    args = parser.parse_args(argv)
+
+    report = run(args.profile, ocr=args.ocr, suites=tuple(args.suite or ('extract', 'match', 'endpoint')))
+    print_report(report)
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved report to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        for name, before, after, change in regressions:
+            print(f"REGRESSION {name}: p50 {before:.2f} ms -> {after:.2f} ms (+{change:.0%})")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
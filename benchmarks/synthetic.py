@@ -0,0 +1,134 @@
+"""Synthetic Figma-like layouts and component catalogs for benchmarks and tests."""
+import random
+
+import cv2
+import numpy as np
+
+DESIGN_WIDTH = 1440
+DESIGN_HEIGHT = 900
+LAYOUT_KINDS = ('hero', 'grid', 'cta')
+
+_WORDS = ('Build', 'faster', 'with', 'Relume', 'components', 'Design', 'ship', 'launch', 'today',
+          'Features', 'Pricing', 'Start', 'free', 'trial', 'Learn', 'more', 'Get', 'started')
+
+
+class _Canvas:
+    """Draws in 1x design coordinates onto an image exported at `scale`x."""
+
+    def __init__(self, scale, height=DESIGN_HEIGHT, background=(255, 255, 255)):
+        self.scale = scale
+        self.img = np.full((height * scale, DESIGN_WIDTH * scale, 3), background, np.uint8)
+
+    def rect(self, x0, y0, x1, y1, color=(40, 40, 40), thickness=-1):
+        s = self.scale
+        cv2.rectangle(self.img, (x0 * s, y0 * s), (x1 * s, y1 * s), color,
+                      thickness if thickness < 0 else thickness * s)
+
+    def text(self, x, y, words, size=0.9, color=(20, 20, 20)):
+        s = self.scale
+        cv2.putText(self.img, ' '.join(words), (x * s, y * s), cv2.FONT_HERSHEY_SIMPLEX, size * s, color,
+                    max(1, 2 * s), cv2.LINE_AA)
+
+
+def render_layout(kind, scale=1, elements=6, seed=0, with_text=True):
+    """Render a synthetic section as a BGR image.
+
+    kind: 'hero' (text left, image right), 'grid' (cards in three columns)
+    or 'cta' (centred heading and buttons). `elements` controls how many
+    copy lines / cards / buttons are drawn; `scale` is the export scale
+    (2 and 4 mimic Figma 2x/4x exports).
+    """
+    rng = random.Random(seed)
+
+    def words(count):
+        return [rng.choice(_WORDS) for _ in range(count)]
+
+    if kind == 'hero':
+        canvas = _Canvas(scale)
+        for i in range(elements):
+            y = 180 + i * (480 // max(elements, 1))
+            if with_text:
+                canvas.text(100, y + 30, words(3), size=1.1 if i == 0 else 0.8)
+            else:
+                canvas.rect(100, y, 600, y + 36)
+        canvas.rect(100, 700, 260, 750, (200, 80, 30))  # primary button
+        canvas.rect(290, 700, 450, 750, (30, 80, 200), thickness=2)  # secondary button
+        canvas.rect(760, 120, 1340, 780, (120, 160, 200))  # image
+        return canvas.img
+
+    if kind == 'grid':
+        columns = 3
+        rows = max(1, -(-elements // columns))
+        card_height = 320
+        canvas = _Canvas(scale, height=max(DESIGN_HEIGHT, 160 + rows * (card_height + 40)))
+        if with_text:
+            canvas.text(560, 90, words(2), size=1.2)
+        for i in range(elements):
+            x = 100 + (i % columns) * 430
+            y = 140 + (i // columns) * (card_height + 40)
+            canvas.rect(x, y, x + 380, y + card_height, (180, 180, 180), thickness=2)
+            canvas.rect(x + 20, y + 20, x + 360, y + 180, (90, 120, 160))
+            if with_text:
+                canvas.text(x + 20, y + 230, words(2), size=0.8)
+                canvas.text(x + 20, y + 270, words(3), size=0.6)
+            else:
+                canvas.rect(x + 20, y + 200, x + 300, y + 230)
+        return canvas.img
+
+    if kind == 'cta':
+        canvas = _Canvas(scale, height=600)
+        if with_text:
+            canvas.text(480, 220, words(3), size=1.4)
+            canvas.text(540, 290, words(4), size=0.8)
+        else:
+            canvas.rect(420, 180, 1020, 240)
+            canvas.rect(520, 270, 920, 300)
+        buttons = max(1, min(elements, 4))
+        start_x = 720 - buttons * 90
+        for i in range(buttons):
+            x = start_x + i * 180
+            canvas.rect(x, 360, x + 160, 420, (200, 80, 30) if i == 0 else (60, 60, 60), thickness=-1 if i == 0 else 2)
+        return canvas.img
+
+    raise ValueError(f"Unknown layout kind: {kind}")
+
+
+def encode_png(img):
+    ok, buf = cv2.imencode('.png', img)
+    if not ok:
+        raise ValueError('Failed to encode synthetic layout')
+    return buf.tobytes()
+
+
+_CATALOG_TEMPLATES = (
+    ('hero', 'Text_Left_Image_Right', 'left'),
+    ('hero', 'Text_Right_Image_Left', 'right'),
+    ('hero', 'Hero_Centered_Text', 'center'),
+    ('feature', 'Feature_Grid_3_Col', 'balanced'),
+    ('feature', 'Feature_Grid_4_Col', 'balanced'),
+    ('cta', 'CTA_Centered', 'center'),
+    ('cta', 'CTA_Split', 'left'),
+    ('header', 'Centered_Text_Only', 'center'),
+)
+
+
+def generate_catalog(size, seed=0):
+    """A relume_data.json-shaped catalog with `size` random component variants."""
+    rng = random.Random(seed)
+    components = []
+    for i in range(size):
+        family, layout_type, side = rng.choice(_CATALOG_TEMPLATES)
+        min_boxes = rng.randint(1, 20)
+        min_text_blocks = rng.randint(0, 8)
+        components.append({
+            'id': f"{family}-{i}",
+            'name': f"{layout_type.replace('_', ' ')} (Variant {i})",
+            'link': f"#{family}-{i}",
+            'layout_type': layout_type,
+            'dominant_side': side,
+            'min_boxes': min_boxes,
+            'max_boxes': min_boxes + rng.randint(2, 40),
+            'min_text_blocks': min_text_blocks,
+            'max_text_blocks': min_text_blocks + rng.randint(1, 16),
+        })
+    return components
@@ -0,0 +1,236 @@
+"""Offline bulk matching: analyse every image under a directory and write one JSONL record per image.
+
+Usage (from the repository root):
+
+    python bulk_match.py exports/ --output matches.jsonl --workers 8 --top-k 3
+
+Images are analysed in a process pool with analysis.analyze_image and
+matched with find_best_match against the catalog (or, with --vectors, by
+nearest neighbour against a vector index). Workers import the analysis and
+matching modules only, not the Flask app. Records are appended and flushed as
+soon as each image finishes, in completion order. Re-running with the same
+--output resumes: images that already have a successful record for the
+current catalog version are skipped, so an interrupted run picks up where
+it stopped and a catalog change re-matches everything.
+"""
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp', '.bmp')
+
+_worker = {}
+
+
+def find_images(root):
+    """Image paths under `root` relative to it, in a stable (sorted) order."""
+    found = []
+    for directory, subdirectories, files in os.walk(root):
+        subdirectories.sort()
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                found.append(os.path.relpath(os.path.join(directory, name), root))
+    return found
+
+
+def load_matcher(catalog_path, vectors_path=None):
+    """(matcher, version): an indexed catalog, or a vector index when `vectors_path` is given."""
+    if vectors_path:
+        from vectors import load_vector_index
+        index = load_vector_index(vectors_path)
+        return index, f"vectors-{index.version}"
+    from catalog import load_catalog
+    catalog = load_catalog(catalog_path)
+    return catalog, catalog.version
+
+
+def completed_entries(output_path, version):
+    """Paths with a successful record for `version` in an existing output file."""
+    completed = set()
+    if not output_path or output_path == '-' or not os.path.exists(output_path):
+        return completed
+    with open(output_path, 'r') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # a line cut short by an interrupted run
+            if record.get('version') == version and 'error' not in record:
+                completed.add(record['path'])
+    return completed
+
+
+def _init_worker(catalog_path, vectors_path, ocr_backend, max_pixels, min_similarity, ocr_regions=False,
+                 working_width=0):
+    from ocr_backends import get_ocr_backend
+
+    _worker['matcher'], _worker['version'] = load_matcher(catalog_path, vectors_path)
+    _worker['ocr_backend'] = get_ocr_backend(ocr_backend or 'auto')
+    _worker['max_pixels'] = max_pixels
+    _worker['min_similarity'] = min_similarity
+    _worker['ocr_regions'] = ocr_regions
+    _worker['working_width'] = working_width
+
+
+def match_file(root, path, top_k):
+    """Analyse and match one image; runs in a pool worker and returns its JSONL record."""
+    from admission import plan_decode
+    from analysis import analyze_image, decode_image, guess_dominant_side
+    from matching import find_best_match
+    from vectors import VectorIndex, layout_vector
+
+    started = time.perf_counter()
+    record = {'path': path, 'version': _worker['version']}
+    try:
+        with open(os.path.join(root, path), 'rb') as f:
+            data = f.read()
+        reduce_factor, _ = plan_decode(data, _worker['max_pixels'])
+        img_cv = decode_image(data, reduce_factor, _worker['max_pixels'])
+        if img_cv is None:
+            raise ValueError('Failed to decode image file')
+
+        layout_features = analyze_image(img_cv, ocr_backend=_worker['ocr_backend'], ocr_regions=_worker['ocr_regions'],
+                                        working_width=_worker['working_width'])
+        _, _, guessed_dominant_side = guess_dominant_side(layout_features, img_cv.shape[1])
+        matcher = _worker['matcher']
+        if isinstance(matcher, VectorIndex):
+            ranked = matcher.search(layout_vector(layout_features, img_cv.shape[1], img_cv.shape[0]), k=top_k,
+                                    min_similarity=_worker['min_similarity'])
+        else:
+            ranked = find_best_match(matcher, layout_features, guessed_dominant_side, top_k=top_k)
+    except Exception as e:
+        record['error'] = str(e) or type(e).__name__
+        record['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        return record
+
+    best = ranked[0] if ranked else (None, None)
+    record.update({
+        'component_id': best[0].get('id') if best[0] else None,
+        'componentName': best[0].get('name') if best[0] else None,
+        'componentLink': best[0].get('link', '#') if best[0] else None,
+        'score': best[1],
+        'width': int(img_cv.shape[1]),
+        'height': int(img_cv.shape[0]),
+        'downscale': reduce_factor,
+        'box_count': len(layout_features['bounding_boxes']),
+        'text_block_count': len(layout_features['text_blocks']),
+        'guessed_dominant_side': guessed_dominant_side,
+    })
+    if top_k > 1:
+        record['alternatives'] = [{'id': component.get('id'), 'name': component.get('name'), 'score': score}
+                                  for component, score in ranked]
+    record['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    return record
+
+
+def summarize_run(elapsed, latencies_ms, matched, errors, skipped):
+    processed = matched + errors
+    summary = {
+        'processed': processed,
+        'matched': matched,
+        'errors': errors,
+        'skipped': skipped,
+        'elapsed_s': round(elapsed, 2),
+        'images_per_s': round(processed / elapsed, 2) if elapsed > 0 else None,
+    }
+    if latencies_ms:
+        latencies = np.array(latencies_ms)
+        summary.update(p50_ms=round(float(np.percentile(latencies, 50)), 1),
+                       p95_ms=round(float(np.percentile(latencies, 95)), 1))
+    return summary
+
+
+def run(root, output, catalog_path='relume_data.json', vectors_path=None, workers=None, top_k=1,
+        ocr_backend=None, max_pixels=40_000_000, log=sys.stderr, min_similarity=0.5, ocr_regions=False,
+        working_width=0):
+    """Match every image under `root`, appending records to `output` ('-' for stdout); returns the summary."""
+    _, version = load_matcher(catalog_path, vectors_path)
+    images = find_images(root)
+    completed = completed_entries(output, version)
+    pending = [path for path in images if path not in completed]
+    print(f"{len(images)} images under {root}; {len(images) - len(pending)} already matched "
+          f"for version {version}, {len(pending)} to go", file=log)
+
+    if output == '-':
+        out = sys.stdout
+    else:
+        out = open(output, 'a+')
+        if out.tell() > 0:
+            out.seek(out.tell() - 1)
+            if out.read(1) != '\n':
+                out.write('\n')  # an interrupted run left a partial last line
+    matched = errors = 0
+    latencies_ms = []
+    started = time.perf_counter()
+    pool = ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1, initializer=_init_worker,
+                               initargs=(catalog_path, vectors_path, ocr_backend, max_pixels, min_similarity,
+                                         ocr_regions, working_width))
+    try:
+        futures = [pool.submit(match_file, root, path, max(top_k, 1)) for path in pending]
+        for future in as_completed(futures):
+            record = future.result()
+            out.write(json.dumps(record) + '\n')
+            out.flush()
+            latencies_ms.append(record['elapsed_ms'])
+            if 'error' in record:
+                errors += 1
+                print(f"Error matching {record['path']}: {record['error']}", file=log)
+            else:
+                matched += 1
+    except KeyboardInterrupt:
+        print('Interrupted; re-run with the same --output to resume', file=log)
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        if out is not sys.stdout:
+            out.close()
+        summary = summarize_run(time.perf_counter() - started, latencies_ms, matched, errors,
+                                len(images) - len(pending))
+        print(f"Summary: {json.dumps(summary)}", file=log)
+    return summary
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Match every image under a directory and write JSONL records.')
+    parser.add_argument('root', help='Directory of exported frames (searched recursively)')
+    parser.add_argument('--output', '-o', default='-', help="JSONL file to append to (default '-': stdout)")
+    parser.add_argument('--catalog', default=os.environ.get('RELUME_CATALOG', 'relume_data.json'),
+                        help='JSON or binary catalog to match against')
+    parser.add_argument('--vectors', help='Match by nearest neighbour against this vector index instead')
+    parser.add_argument('--min-similarity', type=float,
+                        default=float(os.environ.get('VECTOR_MIN_SIMILARITY', 0.5)),
+                        help='With --vectors, report no match below this cosine similarity '
+                             '(default: VECTOR_MIN_SIMILARITY, as in the app)')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--top-k', type=int, default=1, help='Ranked alternatives per image')
+    parser.add_argument('--ocr-backend', choices=('auto', 'tesserocr', 'tesseract'),
+                        default=os.environ.get('OCR_BACKEND', 'auto'),
+                        help='OCR backend (default: OCR_BACKEND, as in the app)')
+    parser.add_argument('--max-pixels', type=int, default=40_000_000,
+                        help='Larger images are decoded at 1/2, 1/4 or 1/8 scale')
+    parser.add_argument('--ocr-regions', action='store_true',
+                        default=os.environ.get('OCR_REGIONS', '').lower() in ('1', 'true', 'yes'),
+                        help='Only recognise candidate text regions (default: OCR_REGIONS, as in the app)')
+    parser.add_argument('--working-width', type=int, default=int(os.environ.get('ANALYSIS_WORKING_WIDTH', 0)),
+                        help='Width of the geometric pass; 0 for full resolution '
+                             '(default: ANALYSIS_WORKING_WIDTH, as in the app)')
+    args = parser.parse_args(argv)
+
+    try:
+        summary = run(args.root, args.output, args.catalog, args.vectors, args.workers, args.top_k,
+                      args.ocr_backend, args.max_pixels, min_similarity=args.min_similarity,
+                      ocr_regions=args.ocr_regions, working_width=args.working_width)
+    except KeyboardInterrupt:
+        return 130
+    return 1 if summary['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,271 @@
+"""Relume component catalog: loading, candidate index, hot reload and binary form.
+
+A binary catalog is a directory holding one `.npy` file per base column
+(see matching.CATALOG_COLUMNS) plus `catalog.json` with the component
+dicts, side vocabulary and version. The column files are opened with
+mmap_mode='r', so forked or separately started workers share the pages.
+
+    python catalog.py compile relume_data.json relume_catalog
+"""
+import functools
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+import weakref
+
+import numpy as np
+
+from matching import (CATALOG_COLUMNS, MAX_RANGE_SCORE, CompiledCatalog, compile_catalog,
+                      max_range_free_score, side_alignment_score)
+
+BINARY_META_FILE = 'catalog.json'
+BINARY_FORMAT_VERSION = 1
+
+
+class _RangeIndex:
+    """Stabbing queries ("which ranges contain q") over [min, max] intervals.
+
+    Ranges are sorted by their lower bound; a query bisects to the ranges
+    starting at or below q and keeps those whose upper bound reaches q.
+    """
+
+    def __init__(self, indices, mins, maxs):
+        order = np.argsort(mins, kind='stable')
+        self.indices = indices[order]
+        self.mins = mins[order]
+        self.maxs = maxs[order]
+
+    def containing(self, value):
+        stop = np.searchsorted(self.mins, value, side='right')
+        return self.indices[:stop][self.maxs[:stop] >= value]
+
+
+class CatalogIndex:
+    """Candidate index over a compiled catalog.
+
+    Components are partitioned by dominant side, and each partition keeps a
+    range index over its box and text block ranges. `candidates` returns
+    the components whose score can still reach the threshold, using an
+    upper bound on every partial score, so pruning never changes a match.
+    """
+
+    def __init__(self, catalog):
+        self.partitions = []
+        for side, code in catalog.side_vocab.items():
+            indices = np.flatnonzero(catalog.side_codes == code)
+            if indices.size == 0:
+                continue
+            self.partitions.append((
+                side,
+                indices,
+                _RangeIndex(indices, catalog.min_boxes[indices], catalog.max_boxes[indices]),
+                _RangeIndex(indices, catalog.min_text_blocks[indices], catalog.max_text_blocks[indices]),
+            ))
+
+    def candidates(self, summary, guessed_dominant_side, threshold):
+        """Catalog indices of components that may score at least `threshold`."""
+        box_count, text_block_count = summary[0], summary[1]
+        range_free_score = max_range_free_score(summary, guessed_dominant_side)
+
+        found = []
+        for side, indices, boxes, text_blocks in self.partitions:
+            # Score still needed from the box and text block ranges
+            needed = threshold - side_alignment_score(side, guessed_dominant_side) - range_free_score
+            if needed <= 0:
+                found.append(indices)
+            elif needed <= MAX_RANGE_SCORE:
+                found.append(np.union1d(boxes.containing(box_count), text_blocks.containing(text_block_count)))
+            elif needed <= 2 * MAX_RANGE_SCORE:
+                found.append(np.intersect1d(boxes.containing(box_count), text_blocks.containing(text_block_count)))
+        if not found:
+            return np.zeros(0, dtype=np.intp)
+        return np.sort(np.concatenate(found))
+
+
+def save_binary(catalog, path):
+    """Write a compiled catalog as a binary catalog directory at `path`.
+
+    The directory is written next to `path` and renamed into place, so
+    readers never see a half-written catalog.
+    """
+    catalog = compile_catalog(catalog)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    for name, values in catalog.columns().items():
+        np.save(os.path.join(tmp_path, f"{name}.npy"), np.ascontiguousarray(values))
+    meta = {
+        'format': BINARY_FORMAT_VERSION,
+        'version': catalog.version,
+        'side_vocab': catalog.side_vocab,
+        'components': catalog.components,
+    }
+    with open(os.path.join(tmp_path, BINARY_META_FILE), 'w') as f:
+        json.dump(meta, f)
+
+    swap_directory(tmp_path, path)
+
+
+def swap_directory(tmp_path, path):
+    """Move a fully written directory into place, replacing any previous one."""
+    old_path = None
+    if os.path.exists(path):
+        old_path = f"{path}.old-{os.getpid()}"
+        os.rename(path, old_path)
+    os.rename(tmp_path, path)
+    if old_path:
+        shutil.rmtree(old_path, ignore_errors=True)
+
+
+def load_binary(path, mmap=True):
+    """Load a binary catalog directory; columns are memory-mapped by default."""
+    with open(os.path.join(path, BINARY_META_FILE), 'r') as f:
+        meta = json.load(f)
+    if meta.get('format') != BINARY_FORMAT_VERSION:
+        raise ValueError(f"Unsupported binary catalog format: {meta.get('format')}")
+
+    columns = {}
+    for name, dtype in CATALOG_COLUMNS:
+        values = np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r' if mmap else None)
+        if values.dtype != dtype or len(values) != len(meta['components']):
+            raise ValueError(f"Binary catalog column {name} does not match its metadata")
+        columns[name] = values
+    return CompiledCatalog.from_columns(meta['components'], columns, meta['side_vocab'], meta['version'])
+
+
+def load_catalog(path):
+    """Load and index a catalog from a JSON component list or a binary catalog directory."""
+    if os.path.isdir(path):
+        catalog = load_binary(path)
+    else:
+        with open(path, 'r') as f:
+            catalog = compile_catalog(json.load(f))
+    catalog.index = CatalogIndex(catalog)
+    return catalog
+
+
+def _reset_store_after_fork(store_ref):
+    # Registered per CatalogStore with a weak reference, so the fork hook
+    # does not keep a discarded store (and its catalog) alive
+    store = store_ref()
+    if store is not None:
+        store._after_fork()
+
+
+def _file_signature(path):
+    # A binary catalog is replaced as a whole directory; its metadata file changes with it
+    if os.path.isdir(path):
+        path = os.path.join(path, BINARY_META_FILE)
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class CatalogStore:
+    """Holds the current catalog and swaps in a rebuilt one when the file changes.
+
+    `current()` returns an immutable snapshot; a request keeps the catalog it
+    started with even if a reload happens meanwhile. A failed reload (e.g. a
+    half-saved JSON file) is logged and the previous catalog stays active.
+
+    With `reload_interval` > 0, `start_watching()` polls the file from a
+    background thread. Forked worker processes do not inherit that thread,
+    so there `current()` checks the file itself, at most once per interval.
+    """
+
+    def __init__(self, path, reload_interval=0):
+        self.path = path
+        self.reload_interval = reload_interval
+        self.stats = {'reloads': 0, 'reload_errors': 0}
+        self._catalog = compile_catalog([])
+        self._signature = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        self._watcher = None
+        self._watcher_pid = None
+        self._stop = threading.Event()
+        # A fork can happen while the watcher holds the lock; give children a fresh one
+        os.register_at_fork(after_in_child=functools.partial(_reset_store_after_fork, weakref.ref(self)))
+        self.reload(force=True)
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        self._last_check = time.monotonic()
+
+    def current(self):
+        if self.reload_interval > 0 and self._watcher_pid != os.getpid():
+            now = time.monotonic()
+            if now - self._last_check >= self.reload_interval:
+                self._last_check = now
+                self.reload()
+        return self._catalog
+
+    def reload(self, force=False):
+        """Rebuild the catalog if the file changed; returns True when a new catalog was swapped in."""
+        with self._lock:
+            try:
+                signature = _file_signature(self.path)
+            except OSError as e:
+                if force:
+                    print(f"ERROR loading {self.path}: {e}")
+                return False
+            if not force and signature == self._signature:
+                return False
+            # Remember the signature even if loading fails, so a broken file is reported once
+            self._signature = signature
+            try:
+                catalog = load_catalog(self.path)
+            except Exception as e:
+                self.stats['reload_errors'] += 1
+                print(f"ERROR loading {self.path}: {e} (keeping {len(self._catalog)} components)")
+                return False
+            self._catalog = catalog
+            self.stats['reloads'] += 1
+            print(f"Successfully loaded {len(catalog)} components from {self.path} (version {catalog.version})")
+            return True
+
+    def start_watching(self):
+        """Start the polling thread in this process; cheap to call again once it runs."""
+        if self.reload_interval <= 0 or self._watcher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._watcher_pid == os.getpid():
+                return  # started by another thread meanwhile
+            self._stop.clear()
+            self._watcher = threading.Thread(target=self._watch, name='catalog-watcher', daemon=True)
+            self._watcher_pid = os.getpid()
+            self._watcher.start()
+
+    def stop_watching(self):
+        self._stop.set()
+        if self._watcher is not None and self._watcher_pid == os.getpid():
+            self._watcher.join()
+        self._watcher = None
+        self._watcher_pid = None
+
+    def _watch(self):
+        while not self._stop.wait(self.reload_interval):
+            self.reload()
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Relume catalog tools.')
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    compile_parser = subcommands.add_parser('compile', help='Precompile a JSON catalog into a binary catalog.')
+    compile_parser.add_argument('source', help='Component list (relume_data.json)')
+    compile_parser.add_argument('output', help='Binary catalog directory to write')
+    args = parser.parse_args(argv)
+
+    with open(args.source, 'r') as f:
+        catalog = compile_catalog(json.load(f))
+    save_binary(catalog, args.output)
+    print(f"Wrote {len(catalog)} components (version {catalog.version}) to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
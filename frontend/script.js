@@ -4,6 +4,8 @@ const imagePreview = document.getElementById('imagePreview');
 const analyseButton = document.getElementById('analyseButton');
 const resultArea = document.getElementById('resultArea');
 
+const API_BASE_URL = 'http://127.0.0.1:5000';
+
 const allowedImageTypes = ['image/png', 'image/jpeg', 'image/jpg'];
 
 let currentFile = null;
@@ -84,7 +86,7 @@ function handleAnalyseClick(event) {
     const formData = new FormData();
     formData.append('file', currentFile, currentFile.name);
 
-    fetch('http://127.0.0.1:5000/upload', {
+    fetch(`${API_BASE_URL}/jobs`, {
         method: 'POST',
         body: formData,
     })
@@ -98,6 +100,10 @@ function handleAnalyseClick(event) {
         }
         return response.json();
     })
+    .then(job => {
+        console.log('Analysis job queued:', job.job_id);
+        return waitForJob(job);
+    })
     .then(data => {
         console.log('Parsed data successfully:', data);
 
@@ -127,4 +133,44 @@ function handleAnalyseClick(event) {
         analyseButton.innerText = 'Analyse Design';
         analyseButton.disabled = false;
     });
-}
\ No newline at end of file
+}
+
+const stageLabels = {
+    decode: 'Decoding image',
+    contours: 'Detecting layout',
+    ocr: 'Reading text',
+    match: 'Matching components',
+};
+
+// Follow a queued job over server-sent events until it finishes; resolves with the job result
+function waitForJob(job) {
+    return new Promise((resolve, reject) => {
+        // Only the component name and link are shown; skip the rest of the analysis
+        const events = new EventSource(`${API_BASE_URL}${job.events_url}?fields=componentName,componentLink`);
+
+        const handleUpdate = (event) => {
+            if (!event.data) {
+                return; // connection-level 'error' events carry no payload
+            }
+            const jobInfo = JSON.parse(event.data);
+            if (jobInfo.status === 'done') {
+                events.close();
+                resolve(jobInfo.result);
+            } else if (jobInfo.status === 'error' || !jobInfo.status) {
+                events.close();
+                reject(new Error(jobInfo.error || 'Analysis failed'));
+            } else if (jobInfo.stage) {
+                analyseButton.innerText = `${stageLabels[jobInfo.stage] || 'Analysing'}...`;
+            } else {
+                analyseButton.innerText = 'Waiting in queue...';
+            }
+        };
+
+        ['queued', 'running', 'done', 'error'].forEach(name => events.addEventListener(name, handleUpdate));
+        events.onerror = () => {
+            if (events.readyState === EventSource.CLOSED) {
+                reject(new Error('Lost connection to the analysis server'));
+            }
+        };
+    });
+}
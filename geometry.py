@@ -0,0 +1,38 @@
+import numpy as np
+
+# Column layout of the N x 5 box arrays produced by analyze_image
+BOX_COLUMNS = ('x', 'y', 'w', 'h', 'area')
+BOX_X, BOX_Y, BOX_W, BOX_H, BOX_AREA = range(5)
+
+
+def contour_stats(contours):
+    """Bounding rects and areas for all contours in one vectorized pass.
+
+    Equivalent to calling cv2.boundingRect and cv2.contourArea on each
+    contour. Returns (rects, areas): an N x 4 int64 array of (x, y, w, h)
+    and an N float64 array of polygon areas.
+    """
+    if len(contours) == 0:
+        return np.zeros((0, 4), dtype=np.int64), np.zeros(0, dtype=np.float64)
+
+    lengths = np.fromiter((len(c) for c in contours), dtype=np.int64, count=len(contours))
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    points = np.concatenate(contours).reshape(-1, 2).astype(np.int64)
+    xs, ys = points[:, 0], points[:, 1]
+
+    # Bounding rects (inclusive pixel extents, like cv2.boundingRect)
+    min_x, max_x = np.minimum.reduceat(xs, starts), np.maximum.reduceat(xs, starts)
+    min_y, max_y = np.minimum.reduceat(ys, starts), np.maximum.reduceat(ys, starts)
+    rects = np.stack([min_x, min_y, max_x - min_x + 1, max_y - min_y + 1], axis=1)
+
+    # Shoelace formula; each contour's last point wraps to its first
+    next_index = np.arange(1, len(points) + 1)
+    next_index[starts + lengths - 1] = starts
+    cross = xs * ys[next_index] - xs[next_index] * ys
+    areas = np.abs(np.add.reduceat(cross, starts)) / 2.0
+    return rects, areas
+
+
+def center_spacing(centers):
+    """Gaps between consecutive sorted centre coordinates."""
+    return np.diff(np.sort(centers))
@@ -0,0 +1,159 @@
+import queue
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+
+# Stage names reported while a job runs, in pipeline order
+JOB_STAGES = ('decode', 'contours', 'ocr', 'match')
+
+
+class QueueFull(Exception):
+    """Raised by JobQueue.submit when no more jobs can be accepted."""
+
+
+class Job:
+    def __init__(self, payload):
+        self.id = uuid.uuid4().hex
+        self.payload = payload
+        self.status = 'queued'
+        self.stage = None
+        self.stages_completed = []
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        # Bumped on every change so event streams can wait for the next one
+        self.version = 0
+
+    @property
+    def finished(self):
+        return self.status in ('done', 'error')
+
+    def to_dict(self):
+        progress = 1.0 if self.status == 'done' else len(self.stages_completed) / len(JOB_STAGES)
+        job_info = {
+            'job_id': self.id,
+            'status': self.status,
+            'stage': self.stage,
+            'stages_completed': list(self.stages_completed),
+            'progress': round(progress, 2),
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
+        }
+        if self.status == 'done':
+            job_info['result'] = self.result
+        if self.status == 'error':
+            job_info['error'] = self.error
+        return job_info
+
+
+class JobQueue:
+    """Bounded in-process job queue served by a fixed set of worker threads.
+
+    `handler(payload, progress)` does the work and returns a JSON-serialisable
+    result; it calls `progress(stage)` as it enters each stage. At most
+    `max_queued` jobs wait at once, beyond that `submit` raises QueueFull.
+    Finished jobs are kept for polling until `max_finished` newer ones have
+    completed.
+    """
+
+    def __init__(self, handler, workers=2, max_queued=16, max_finished=256):
+        self.handler = handler
+        self.workers = workers
+        self.max_finished = max_finished
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._jobs = {}
+        self._finished = OrderedDict()
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._threads = []
+
+    def _start_workers(self):
+        # Caller holds the lock; threads start on first submit, not at import
+        if self._threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, payload):
+        job = Job(payload)
+        with self._lock:
+            self._start_workers()
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                raise QueueFull(f"Job queue is full ({self._queue.maxsize} waiting)")
+            self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def snapshot(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.to_dict() if job else None
+
+    def wait_for_change(self, job_id, seen_version, timeout=None):
+        """Block until the job changes past `seen_version`; returns (version, snapshot)."""
+        with self._changed:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return seen_version, None
+            self._changed.wait_for(lambda: job.version != seen_version, timeout=timeout)
+            return job.version, job.to_dict()
+
+    def _update(self, job, **changes):
+        with self._changed:
+            for name, value in changes.items():
+                setattr(job, name, value)
+            job.updated_at = time.time()
+            job.version += 1
+            if job.finished:
+                # Drop the upload bytes and retire old finished jobs
+                job.payload = None
+                self._finished[job.id] = job
+                while len(self._finished) > self.max_finished:
+                    old_id, _ = self._finished.popitem(last=False)
+                    self._jobs.pop(old_id, None)
+            self._changed.notify_all()
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+
+            def progress(stage, job=job):
+                completed = list(job.stages_completed)
+                if job.stage and job.stage not in completed:
+                    completed.append(job.stage)
+                self._update(job, stage=stage, stages_completed=completed)
+
+            self._update(job, status='running')
+            try:
+                result = self.handler(job.payload, progress)
+                completed = list(job.stages_completed)
+                if job.stage and job.stage not in completed:
+                    completed.append(job.stage)
+                self._update(job, status='done', result=result, stages_completed=completed)
+            except Exception as e:
+                print(f"Error running job {job.id}: {e}")
+                traceback.print_exc()
+                # ValueErrors describe bad input; anything else stays server-side
+                error = str(e) if isinstance(e, ValueError) else 'Failed to process file on server'
+                self._update(job, status='error', error=error)
+            finally:
+                self._queue.task_done()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'queued': self._queue.qsize(),
+                'max_queued': self._queue.maxsize,
+                'workers': self.workers,
+                'tracked_jobs': len(self._jobs),
+            }
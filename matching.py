@@ -0,0 +1,322 @@
+import hashlib
+import json
+
+import numpy as np
+
+MIN_MATCH_SCORE_THRESHOLD = 5.0  # Increased threshold for better quality matches
+DIRECTIONAL_SIDES = ('left', 'right')
+CENTERED_SIDES = ('center', 'balanced')
+# Below this size a full batched scan is cheaper than querying the index
+INDEX_MIN_COMPONENTS = 8192
+
+
+# Base columns of a compiled catalog (everything else is derived from these)
+CATALOG_COLUMNS = (
+    ('side_codes', np.int32),
+    ('min_boxes', np.float64),
+    ('max_boxes', np.float64),
+    ('min_text_blocks', np.float64),
+    ('max_text_blocks', np.float64),
+    ('is_hero', np.bool_),
+    ('is_cta', np.bool_),
+    ('is_grid', np.bool_),
+)
+
+
+def catalog_version(components):
+    """Content hash of a component list; used to invalidate cached analysis results."""
+    return hashlib.sha256(json.dumps(components, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:16]
+
+
+class CompiledCatalog:
+    """Columnar (NumPy) view of the Relume component list.
+
+    Built once per catalog so that scoring an upload is a handful of array
+    operations instead of a Python loop over every component dict. `index`
+    is an optional candidate index (see catalog.CatalogIndex) used by
+    find_best_match to skip components that cannot reach the threshold.
+    """
+
+    def __init__(self, components):
+        components = list(components)
+        sides = [c.get('dominant_side', 'unknown').lower() for c in components]
+        types = [c.get('layout_type', '').lower() for c in components]
+
+        # Side codes: each distinct side string gets a small integer
+        side_vocab = {side: code for code, side in enumerate(dict.fromkeys(sides))}
+        columns = {
+            'side_codes': [side_vocab[s] for s in sides],
+            # Box / text block ranges
+            'min_boxes': [c.get('min_boxes', 0) for c in components],
+            'max_boxes': [c.get('max_boxes', 1000) for c in components],
+            'min_text_blocks': [c.get('min_text_blocks', 0) for c in components],
+            'max_text_blocks': [c.get('max_text_blocks', 100) for c in components],
+            # Type flags (substring semantics, same as the original per-component checks)
+            'is_hero': ['hero' in t for t in types],
+            'is_cta': ['cta' in t for t in types],
+            'is_grid': ['grid' in t for t in types],
+        }
+        self._init_columns(components, columns, side_vocab, catalog_version(components))
+
+    @classmethod
+    def from_columns(cls, components, columns, side_vocab, version):
+        """Build from precompiled base columns (e.g. memory-mapped arrays)."""
+        catalog = cls.__new__(cls)
+        catalog._init_columns(list(components), columns, side_vocab, version)
+        return catalog
+
+    def _init_columns(self, components, columns, side_vocab, version):
+        self.components = components
+        self.version = version
+        self.side_vocab = dict(side_vocab)
+        self.index = None
+        for name, dtype in CATALOG_COLUMNS:
+            setattr(self, name, np.asarray(columns[name], dtype=dtype))
+
+        center_codes = [code for side, code in self.side_vocab.items() if side == 'center']
+        centered_codes = [code for side, code in self.side_vocab.items() if side in CENTERED_SIDES]
+        self.side_is_center = np.isin(self.side_codes, center_codes)
+        self.side_is_centered = np.isin(self.side_codes, centered_codes)
+
+        self.box_mid = (self.min_boxes + self.max_boxes) / 2
+        self.box_quarter = (self.max_boxes - self.min_boxes) / 4
+        self.text_mid = (self.min_text_blocks + self.max_text_blocks) / 2
+        self.text_quarter = (self.max_text_blocks - self.min_text_blocks) / 4
+
+    def columns(self):
+        return {name: getattr(self, name) for name, _ in CATALOG_COLUMNS}
+
+    def take(self, indices):
+        """Sub-catalog of the components at `indices` (kept in catalog order)."""
+        indices = np.sort(np.asarray(indices, dtype=np.intp))
+        columns = {name: values[indices] for name, values in self.columns().items()}
+        components = [self.components[i] for i in indices.tolist()]
+        return CompiledCatalog.from_columns(components, columns, self.side_vocab, self.version)
+
+    def __len__(self):
+        return len(self.components)
+
+
+def compile_catalog(components):
+    if isinstance(components, CompiledCatalog):
+        return components
+    return CompiledCatalog(components)
+
+
+def _layout_summary(layout_features):
+    """Per-layout values that do not depend on the component being scored."""
+    box_count = len(layout_features['bounding_boxes'])
+    text_block_count = len(layout_features['text_blocks'])
+
+    grid_score = 0
+    if layout_features['spacing_patterns']:
+        vertical_spacing = np.asarray(layout_features['spacing_patterns']['vertical'], dtype=np.float64)
+        horizontal_spacing = np.asarray(layout_features['spacing_patterns']['horizontal'], dtype=np.float64)
+
+        # Check for consistent spacing patterns
+        if vertical_spacing.size >= 2 and np.all(np.abs(vertical_spacing - vertical_spacing[0]) < 10):
+            grid_score += 0.75
+        if horizontal_spacing.size >= 2 and np.all(np.abs(horizontal_spacing - horizontal_spacing[0]) < 10):
+            grid_score += 0.75
+
+    avg_ratio = None
+    element_ratios = np.asarray(layout_features['element_ratios'], dtype=np.float64)
+    if element_ratios.size:
+        # Built-in sum, not NumPy's pairwise sum: the ratio bands below have
+        # inclusive edges and must see exactly the same average as before
+        avg_ratio = sum(element_ratios.tolist()) / element_ratios.size
+
+    return box_count, text_block_count, grid_score, avg_ratio
+
+
+def side_alignment_score(component_side, guessed_dominant_side):
+    """Side Alignment Score (step 1 of scoring) for a single catalog side value."""
+    if guessed_dominant_side == 'balanced' and component_side in CENTERED_SIDES:
+        return 2.5
+    if guessed_dominant_side == component_side:
+        return 3.0 if guessed_dominant_side in DIRECTIONAL_SIDES else 2.5
+    return 0.0
+
+
+# Most a component can gain from being inside its box (or text block) range:
+# 2 for the range, 0.5 near the midpoint and 0.5 for the hero bonus
+MAX_RANGE_SCORE = 3.0
+
+
+def max_range_free_score(summary, guessed_dominant_side):
+    """Upper bound on grid + ratio + type adjustment scores over all component types.
+
+    Together with the side score and MAX_RANGE_SCORE this bounds a
+    component's total without looking at its box / text block ranges.
+    """
+    box_count, _, layout_grid_score, avg_ratio = summary
+    directional_guess = guessed_dominant_side in DIRECTIONAL_SIDES
+    in_band = lambda low, high: avg_ratio is not None and low <= avg_ratio <= high
+
+    # The spacing bonus checks the raw 'grid' substring, so any type may get it
+    grid_score = layout_grid_score + (0.5 if layout_grid_score > 1 else 0)
+
+    hero = grid_score + (1.5 if in_band(0.5, 2.0) else 0) + 0.5
+    cta = (grid_score + (1.0 if in_band(1.0, 3.0) else 0)
+           + (0.25 if box_count <= 5 else 0) - (0.5 if directional_guess else 0))
+    grid = (grid_score + (1.5 if in_band(0.8, 1.2) else 0)
+            + (0.5 if layout_grid_score > 0 else 0) + (0.5 if box_count >= 3 else 0))
+    other = layout_grid_score
+    return max(hero, cta, grid, other)
+
+
+def score_catalog(catalog, layout_features, guessed_dominant_side, summary=None):
+    """Score every component of a compiled catalog in one batched pass.
+
+    Returns a dict of per-component score arrays ('total' plus each partial
+    score) together with the per-layout box and text block counts.
+    """
+    catalog = compile_catalog(catalog)
+    if summary is None:
+        summary = _layout_summary(layout_features)
+    box_count, text_block_count, layout_grid_score, avg_ratio = summary
+
+    is_hero = catalog.is_hero
+    is_cta = catalog.is_cta & ~is_hero
+    is_grid = catalog.is_grid & ~is_hero & ~catalog.is_cta
+    directional_guess = guessed_dominant_side in DIRECTIONAL_SIDES
+    guessed_code = catalog.side_vocab.get(guessed_dominant_side, -1)
+    same_side = catalog.side_codes == guessed_code
+
+    # 1. Side Alignment Score (weight: 2.5)
+    exact_side_score = 2.5 + (0.5 if directional_guess else 0)
+    if guessed_dominant_side == 'balanced':
+        side_score = np.where(catalog.side_is_centered, 2.5, np.where(same_side, exact_side_score, 0.0))
+    else:
+        side_score = np.where(same_side, exact_side_score, 0.0)
+
+    # 2. Box Count Score (weight: 2)
+    box_in_range = (catalog.min_boxes <= box_count) & (box_count <= catalog.max_boxes)
+    geo_box_score = (
+        2.0
+        + np.where(np.abs(box_count - catalog.box_mid) <= catalog.box_quarter, 0.5, 0.0)
+        + np.where(catalog.is_hero & (box_count >= 8), 0.5, 0.0)
+    )
+    geo_box_score = np.where(box_in_range, geo_box_score, 0.0)
+
+    # 3. Text Block Score (weight: 2)
+    text_in_range = (catalog.min_text_blocks <= text_block_count) & (text_block_count <= catalog.max_text_blocks)
+    ocr_block_score = (
+        2.0
+        + np.where(np.abs(text_block_count - catalog.text_mid) <= catalog.text_quarter, 0.5, 0.0)
+        + np.where(catalog.is_hero & (text_block_count >= 2), 0.5,
+                   np.where(catalog.is_cta & (text_block_count <= 2), 0.25, 0.0))
+    )
+    ocr_block_score = np.where(text_in_range, ocr_block_score, 0.0)
+
+    # 4. Grid Pattern Score (weight: 1.5)
+    grid_score = np.full(len(catalog), float(layout_grid_score))
+    if layout_grid_score > 1:
+        grid_score = np.where(catalog.is_grid, grid_score + 0.5, grid_score)
+
+    # 5. Element Ratio Score (weight: 1.5)
+    ratio_score = np.zeros(len(catalog))
+    if avg_ratio is not None:
+        if 0.5 <= avg_ratio <= 2.0:  # Hero sections often have balanced ratios
+            ratio_score = np.where(is_hero, 1.5, ratio_score)
+        if 1.0 <= avg_ratio <= 3.0:  # CTAs often have wider elements
+            ratio_score = np.where(is_cta, 1.0, ratio_score)
+        if 0.8 <= avg_ratio <= 1.2:  # Grids often have square-like elements
+            ratio_score = np.where(is_grid, 1.5, ratio_score)
+
+    # 6. Component Type Specific Adjustments
+    type_adjustment = np.zeros(len(catalog))
+    hero_adjustment = np.where(catalog.side_is_center & directional_guess, -1.0, np.where(same_side, 0.5, 0.0))
+    type_adjustment = np.where(is_hero, hero_adjustment, type_adjustment)
+    cta_adjustment = (0.25 if box_count <= 5 else 0.0) - (0.5 if directional_guess else 0.0)
+    type_adjustment = np.where(is_cta, cta_adjustment, type_adjustment)
+    grid_adjustment = (0.5 if layout_grid_score > 0 else 0.0) + (0.5 if box_count >= 3 else 0.0)
+    type_adjustment = np.where(is_grid, grid_adjustment, type_adjustment)
+
+    total = side_score + geo_box_score + ocr_block_score + grid_score + ratio_score + type_adjustment
+
+    return {
+        'total': total,
+        'side': side_score,
+        'geo_box': geo_box_score,
+        'ocr_block': ocr_block_score,
+        'grid': grid_score,
+        'ratio': ratio_score,
+        'box_count': box_count,
+        'text_block_count': text_block_count,
+    }
+
+
+def rank_components(catalog, scores, min_score=MIN_MATCH_SCORE_THRESHOLD):
+    """Indices of components scoring at least `min_score`, best first.
+
+    Ties are broken the same way as the single best match: prefer components
+    whose box range midpoint is closest to the detected box count, then
+    catalog order.
+    """
+    catalog = compile_catalog(catalog)
+    candidates = np.flatnonzero(scores['total'] >= min_score)
+    if candidates.size == 0:
+        return candidates
+    mid_distance = np.abs(scores['box_count'] - catalog.box_mid[candidates])
+    order = np.lexsort((candidates, mid_distance, -scores['total'][candidates]))
+    return candidates[order]
+
+
+def find_best_match(components, layout_features, guessed_dominant_side, top_k=None, trace=False):
+    """Find the best matching component for the detected layout.
+
+    `components` may be a plain component list or a `CompiledCatalog`; pass a
+    compiled catalog to avoid rebuilding the arrays on every call. With
+    `top_k`, returns up to `top_k` ranked `(component, score)` pairs above the
+    match threshold instead of a single component. `trace` prints the
+    per-component score breakdown (debug only; nothing is formatted when off).
+    """
+    catalog = compile_catalog(components)
+    min_match_score_threshold = MIN_MATCH_SCORE_THRESHOLD
+
+    if trace:
+        print(f"Matching based on: Layout Features={layout_features}, GuessedSide='{guessed_dominant_side}'")
+
+    summary = _layout_summary(layout_features)
+    if catalog.index is not None and len(catalog) >= INDEX_MIN_COMPONENTS:
+        # Only score components whose score bound can reach the threshold
+        catalog = catalog.take(catalog.index.candidates(summary, guessed_dominant_side, min_match_score_threshold))
+
+    if len(catalog) == 0:
+        if trace:
+            print("No suitable match found (no candidate components)")
+        return [] if top_k is not None else None
+
+    scores = score_catalog(catalog, layout_features, guessed_dominant_side, summary=summary)
+    if trace:
+        print_score_trace(catalog, scores)
+
+    ranked = rank_components(catalog, scores, min_match_score_threshold)
+
+    # No matches found
+    if ranked.size == 0:
+        if trace:
+            print(f"No suitable match found (Best score: {scores['total'].max()} < Threshold: {min_match_score_threshold})")
+        return [] if top_k is not None else None
+
+    best_match = catalog.components[ranked[0]]
+    if trace:
+        print(f"Final Best Match (Score {scores['total'][ranked[0]]}): {best_match['name']}")
+
+    if top_k is not None:
+        return [(catalog.components[i], float(scores['total'][i])) for i in ranked[:top_k]]
+    return best_match
+
+
+def print_score_trace(catalog, scores):
+    """Per-component score breakdown, one line per component."""
+    box_count = scores['box_count']
+    text_block_count = scores['text_block_count']
+    for i, component in enumerate(catalog.components):
+        min_boxes, max_boxes = catalog.min_boxes[i], catalog.max_boxes[i]
+        min_text_blocks, max_text_blocks = catalog.min_text_blocks[i], catalog.max_text_blocks[i]
+        print(f"  - Scoring '{component.get('name')}': Side='{component.get('dominant_side', 'unknown').lower()}'(Wt=2.5, Score={scores['side'][i]}), "
+              f"GeoBoxRange=[{min_boxes:g}-{max_boxes:g}](In={min_boxes <= box_count <= max_boxes}, Wt=2, Score={scores['geo_box'][i]}), "
+              f"OcrBoxRange=[{min_text_blocks:g}-{max_text_blocks:g}](In={min_text_blocks <= text_block_count <= max_text_blocks}, "
+              f"Wt=2, Score={scores['ocr_block'][i]}), GridScore={scores['grid'][i]}, RatioScore={scores['ratio'][i]}. Total Score={scores['total'][i]}")
@@ -0,0 +1,217 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from sub-millisecond matching up to slow OCR runs
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(label_names, label_values, extra=()):
+    pairs = list(zip(label_names, label_values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.label_names)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def render(self, constant_labels=()):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.label_names, key, constant_labels)} "
+                             f"{_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.label_names)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, upper_bound in enumerate(self.buckets):
+                if value <= upper_bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.label_names)
+        with self._lock:
+            series = self._series.get(key)
+            return series[-1] if series else 0
+
+    def render(self, constant_labels=()):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                for upper_bound, bucket_count in zip(self.buckets + (float('inf'),), series[:-2] + [series[-1]]):
+                    labels = _format_labels(self.label_names, key,
+                                            list(constant_labels) + [('le', _format_value(upper_bound))])
+                    lines.append(f"{self.name}_bucket{labels} {bucket_count}")
+                labels = _format_labels(self.label_names, key, constant_labels)
+                lines.append(f"{self.name}_sum{labels} {_format_value(series[-2])}")
+                lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+
+class CallbackMetric:
+    """Gauge or counter whose current values are read from `callback()` at scrape time.
+
+    `callback` returns a number, or a dict mapping a single label value to a number.
+    """
+
+    def __init__(self, name, help_text, callback, metric_type='gauge', label_name=None):
+        self.name = name
+        self.help_text = help_text
+        self.callback = callback
+        self.metric_type = metric_type
+        self.label_name = label_name
+
+    def render(self, constant_labels=()):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.metric_type}"]
+        values = self.callback()
+        if isinstance(values, dict):
+            for label_value, value in sorted(values.items()):
+                labels = _format_labels((self.label_name,), (label_value,), constant_labels)
+                lines.append(f"{self.name}{labels} {_format_value(value)}")
+        else:
+            lines.append(f"{self.name}{_format_labels((), (), constant_labels)} {_format_value(values)}")
+        return lines
+
+
+class MetricsRegistry:
+    """Metrics rendered together by /metrics.
+
+    `set_constant_labels` adds labels to every series, e.g. the worker slot
+    under serve.py, where each worker process keeps its own registry.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._constant_labels = ()
+        self._lock = threading.Lock()
+
+    def set_constant_labels(self, **labels):
+        with self._lock:
+            self._constant_labels = tuple(sorted(labels.items()))
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, label_names=()):
+        return self.register(Counter(name, help_text, label_names))
+
+    def histogram(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help_text, label_names, buckets))
+
+    def callback(self, name, help_text, callback, metric_type='gauge', label_name=None):
+        return self.register(CallbackMetric(name, help_text, callback, metric_type, label_name))
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics)
+            constant_labels = self._constant_labels
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render(constant_labels))
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'relume_analysis_stage_seconds', 'Time spent in each analysis pipeline stage.', ('stage',)
+)
+REQUESTS_TOTAL = REGISTRY.counter(
+    'relume_http_requests_total', 'HTTP requests handled.', ('endpoint', 'method', 'status')
+)
+REQUEST_SECONDS = REGISTRY.histogram(
+    'relume_http_request_duration_seconds', 'HTTP request latency.', ('endpoint',)
+)
+ADMISSION_REJECTIONS = REGISTRY.counter(
+    'relume_admission_rejections_total', 'Uploads refused by admission control, by HTTP status.', ('status',)
+)
+
+
+_collected = threading.local()
+
+
+@contextmanager
+def time_stage(stage):
+    """Context manager recording one pipeline stage (decode, hash, blur_threshold, contours, ocr, match)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        STAGE_SECONDS.observe(seconds, stage=stage)
+        stages = getattr(_collected, 'stages', None)
+        if stages is not None:
+            stages.append((stage, seconds))
+
+
+@contextmanager
+def collect_stages():
+    """Also collect the stages timed in this thread as a list of (stage, seconds).
+
+    Pool workers have their own registry, which /metrics never renders; they
+    return the collected timings with each result and the parent records
+    them with record_stages.
+    """
+    previous = getattr(_collected, 'stages', None)
+    _collected.stages = stages = []
+    try:
+        yield stages
+    finally:
+        _collected.stages = previous
+
+
+def record_stages(stages):
+    """Observe (stage, seconds) pairs collected in another process."""
+    for stage, seconds in stages:
+        STAGE_SECONDS.observe(seconds, stage=stage)
@@ -0,0 +1,150 @@
+"""Near-duplicate lookup for uploads: perceptual hashes in a BK-tree over recent analyses.
+
+Re-exports of the same frame (a one-pixel nudge, different compression, a
+renamed file) miss the exact-bytes analysis cache. Each analysed upload is
+indexed by a difference hash (dHash) of its downscaled grayscale image; a
+new upload whose hash is within a small Hamming distance of an indexed one,
+with the same pixel dimensions and analysis scope (matcher version and
+options), reuses that analysis instead of running analyze_image and OCR.
+"""
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+# HASH_SIZE x HASH_SIZE horizontal plus as many vertical gradient bits. UI
+# frames are mostly flat regions and stacked bars (copy lines, cards), so
+# both directions are needed to tell layouts apart.
+HASH_SIZE = 16
+HASH_BITS = 2 * HASH_SIZE * HASH_SIZE
+# Brightness steps smaller than this (0-255 scale) count as flat, so
+# compression noise in blank areas does not flip bits
+GRADIENT_MARGIN = 2.0
+
+
+def dhash(img_cv, hash_size=HASH_SIZE):
+    """Difference hash of a decoded BGR or grayscale image as a 2 * `hash_size`**2-bit int.
+
+    Compares neighbouring cells of the image shrunk to (hash_size + 1) x
+    hash_size, left to right, and to hash_size x (hash_size + 1), top to bottom.
+    """
+    gray = img_cv if img_cv.ndim == 2 else cv2.cvtColor(img_cv, cv2.COLOR_BGR2GRAY)
+    wide = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA).astype(np.float32)
+    tall = cv2.resize(gray, (hash_size, hash_size + 1), interpolation=cv2.INTER_AREA).astype(np.float32)
+    bits = np.concatenate([
+        ((wide[:, 1:] - wide[:, :-1]) > GRADIENT_MARGIN).ravel(),
+        ((tall[1:] - tall[:-1]) > GRADIENT_MARGIN).ravel(),
+    ])
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+
+class BKTree:
+    """Burkhard-Keller tree over integer hashes under Hamming distance.
+
+    `find(value, max_distance)` visits only subtrees whose edge distance is
+    within `max_distance` of the query's distance to their parent (triangle
+    inequality). Nodes cannot be removed; NearDuplicateIndex leaves evicted
+    items in place and rebuilds the tree once they outnumber live ones.
+    """
+
+    def __init__(self):
+        self._root = None
+        self.size = 0
+
+    def add(self, value, item):
+        node = [value, item, {}]
+        self.size += 1
+        if self._root is None:
+            self._root = node
+            return
+        current = self._root
+        while True:
+            distance = hamming(value, current[0])
+            child = current[2].get(distance)
+            if child is None:
+                current[2][distance] = node
+                return
+            current = child
+
+    def find(self, value, max_distance):
+        """[(distance, item)] for every node within `max_distance`, nearest first."""
+        found = []
+        stack = [self._root] if self._root is not None else []
+        while stack:
+            node_value, item, children = stack.pop()
+            distance = hamming(value, node_value)
+            if distance <= max_distance:
+                found.append((distance, item))
+            for edge, child in children.items():
+                if distance - max_distance <= edge <= distance + max_distance:
+                    stack.append(child)
+        found.sort(key=lambda pair: pair[0])
+        return found
+
+
+class NearDuplicateIndex:
+    """Bounded index of recently analysed uploads, searchable by perceptual hash.
+
+    Holds up to `max_entries` entries; the least recently added or reused
+    are evicted first. A lookup matches only entries with the same
+    `scope` and image size, within `max_distance` differing hash bits.
+    """
+
+    def __init__(self, max_entries=512, max_distance=10):
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self._entries = OrderedDict()  # id -> (hash, scope, size, value)
+        self._tree = BKTree()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def _rebuild(self):
+        # Caller holds the lock; drops evicted entries' nodes from the tree
+        self._tree = BKTree()
+        for entry_id, (value, _, _, _) in self._entries.items():
+            self._tree.add(value, entry_id)
+
+    def add(self, image_hash, scope, size, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (image_hash, scope, tuple(size), value)
+            self._tree.add(image_hash, entry_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+            if self._tree.size > 2 * max(len(self._entries), 1):
+                self._rebuild()
+
+    def find(self, image_hash, scope, size):
+        """(value, distance) of the nearest matching entry, or None."""
+        with self._lock:
+            for distance, entry_id in self._tree.find(image_hash, self.max_distance):
+                entry = self._entries.get(entry_id)
+                if entry is not None and entry[1] == scope and entry[2] == tuple(size):
+                    self._entries.move_to_end(entry_id)
+                    self.stats['hits'] += 1
+                    return entry[3], distance
+            self.stats['misses'] += 1
+            return None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tree = BKTree()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats, entries=len(self._entries), max_entries=self.max_entries,
+                        max_distance=self.max_distance)
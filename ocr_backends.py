@@ -0,0 +1,307 @@
+import os
+import queue
+import shlex
+import threading
+from contextlib import contextmanager
+
+import cv2
+import numpy as np
+
+from geometry import contour_stats
+
+# Configure Tesseract for better text detection (psm 6: single uniform block, oem 3: default engine).
+# pytesseract splits the config with shlex, so the whitelist (which contains
+# both quote characters) must be shell-quoted.
+TESSERACT_WHITELIST = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789.,!?()[]{}:;"\''
+TESSERACT_CONFIG = f"--oem 3 --psm 6 -c {shlex.quote('tessedit_char_whitelist=' + TESSERACT_WHITELIST)}"
+OCR_DATA_KEYS = ('level', 'block_num', 'conf', 'text', 'left', 'top', 'width', 'height')
+# Blank margin around each region crop in the composite image recognised in region mode
+REGION_GAP = 16
+
+
+def _empty_ocr_data():
+    return {key: [] for key in OCR_DATA_KEYS}
+
+
+class OcrBackend:
+    """Base OCR backend.
+
+    `image_to_data` returns a dict shaped like
+    `pytesseract.image_to_data(..., output_type=Output.DICT)` so callers can
+    swap backends without changing how text blocks are extracted. Images are
+    uint8 arrays, grayscale (what analyze_image passes) or RGB. With
+    `regions` (a list of (x, y, w, h) rects), only those parts of the frame
+    are recognised; positions are reported in full-frame coordinates.
+
+    By default the region crops are stacked into one composite image and
+    recognised in a single `recognize` call (one tesseract run for the CLI
+    backend, however many regions there are); each region's words come
+    back as their own block.
+    """
+
+    name = 'base'
+
+    def recognize(self, img):
+        raise NotImplementedError
+
+    def image_to_data(self, img, regions=None):
+        if regions is None:
+            return self.recognize(img)
+        if not regions:
+            return _empty_ocr_data()
+
+        composite, tops = composite_regions(img, regions)
+        ocr_data = self.recognize(composite)
+        # Each word belongs to the region whose strip holds its vertical centre
+        centers = np.asarray(ocr_data['top'], dtype=np.float64) + np.asarray(ocr_data['height']) / 2
+        strips = np.clip(np.searchsorted(tops, centers, side='right') - 1, 0, len(regions) - 1)
+        for i, strip in enumerate(strips.tolist()):
+            x, y, _, _ = regions[strip]
+            ocr_data['left'][i] += x - REGION_GAP
+            ocr_data['top'][i] += y - int(tops[strip])
+            ocr_data['block_num'][i] = strip + 1
+        return ocr_data
+
+
+def composite_regions(img, regions, gap=REGION_GAP):
+    """Stack the (x, y, w, h) `regions` of `img` top to bottom on a white canvas, `gap` pixels apart.
+
+    Returns (composite, tops) where tops[i] is the row region i starts at;
+    every crop starts at column `gap`.
+    """
+    heights = np.array([h for _, _, _, h in regions])
+    tops = gap + np.concatenate(([0], np.cumsum(heights + gap)[:-1]))
+    width = max(w for _, _, w, _ in regions) + 2 * gap
+    composite = np.full((int(tops[-1] + heights[-1] + gap), width) + img.shape[2:], 255, dtype=img.dtype)
+    for (x, y, w, h), top in zip(regions, tops.tolist()):
+        composite[top:top + h, gap:gap + w] = img[y:y + h, x:x + w]
+    return composite, tops
+
+
+class NullOcrBackend(OcrBackend):
+    """Recognises nothing, so the geometric pass can be measured or tested on its own."""
+
+    name = 'null'
+
+    def recognize(self, img):
+        return _empty_ocr_data()
+
+
+class TesseractCliBackend(OcrBackend):
+    """pytesseract: spawns a tesseract process (and reloads the model) per call."""
+
+    name = 'tesseract'
+
+    def __init__(self):
+        # Imported on first use so that importing the app (and tooling) stays fast
+        import pytesseract
+        from PIL import Image
+        self._pytesseract = pytesseract
+        self._image = Image
+
+    def recognize(self, img):
+        img_pil = self._image.fromarray(img)
+        return self._pytesseract.image_to_data(img_pil, config=TESSERACT_CONFIG,
+                                               output_type=self._pytesseract.Output.DICT)
+
+
+class RecognizerPool:
+    """Bounded pool of recognizers shared by all threads.
+
+    `checkout()` lends out an idle recognizer, creates a new one while fewer
+    than `max_size` exist, and otherwise waits for one to be returned. The
+    most recently returned recognizer is lent out first.
+    """
+
+    def __init__(self, factory, max_size):
+        self._factory = factory
+        self.max_size = max(1, max_size)
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def checkout(self):
+        try:
+            recognizer = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self._created < self.max_size
+                if create:
+                    self._created += 1
+            if create:
+                try:
+                    recognizer = self._factory()
+                except BaseException:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                recognizer = self._idle.get()
+        try:
+            yield recognizer
+        finally:
+            self._idle.put(recognizer)
+
+    def __len__(self):
+        return self._created
+
+
+class TesserocrBackend(OcrBackend):
+    """In-process libtesseract via tesserocr, kept warm across requests.
+
+    TessBaseAPI is not thread safe, so each call checks a recognizer out of a
+    pool of at most `max_recognizers` (default: CPU count). The language model
+    is loaded once per recognizer, not per request thread.
+    """
+
+    name = 'tesserocr'
+
+    def __init__(self, max_recognizers=None):
+        import tesserocr  # Optional dependency
+        _, languages = tesserocr.get_languages()
+        if 'eng' not in languages:
+            raise RuntimeError('tesserocr found no eng traineddata (set TESSDATA_PREFIX)')
+        from PIL import Image
+        self._tesserocr = tesserocr
+        self._image = Image
+        self._recognizers = RecognizerPool(self._create_api, max_recognizers or os.cpu_count() or 1)
+
+    def _create_api(self):
+        tesserocr = self._tesserocr
+        api = tesserocr.PyTessBaseAPI(psm=tesserocr.PSM.SINGLE_BLOCK, oem=tesserocr.OEM.DEFAULT)
+        api.SetVariable('tessedit_char_whitelist', TESSERACT_WHITELIST)
+        return api
+
+    def _words(self, api, ocr_data):
+        RIL = self._tesserocr.RIL
+        api.Recognize()
+        iterator = api.GetIterator()
+        if iterator is None:
+            return ocr_data
+        block_num = 0
+        while True:
+            if iterator.IsAtBeginningOf(RIL.BLOCK):
+                block_num += 1
+            text = iterator.GetUTF8Text(RIL.WORD)
+            box = iterator.BoundingBox(RIL.WORD)
+            if text is not None and box is not None:
+                left, top, right, bottom = box
+                ocr_data['level'].append(5)
+                ocr_data['block_num'].append(block_num)
+                ocr_data['conf'].append(iterator.Confidence(RIL.WORD))
+                ocr_data['text'].append(text)
+                ocr_data['left'].append(left)
+                ocr_data['top'].append(top)
+                ocr_data['width'].append(right - left)
+                ocr_data['height'].append(bottom - top)
+            if not iterator.Next(RIL.WORD):
+                break
+        return ocr_data
+
+    def recognize(self, img):
+        with self._recognizers.checkout() as api:
+            api.SetImage(self._image.fromarray(img))
+            return self._words(api, _empty_ocr_data())
+
+    def image_to_data(self, img, regions=None):
+        if regions is None:
+            return self.recognize(img)
+
+        # Set the page once and move the recognition rectangle; word boxes
+        # come back in full-frame coordinates
+        merged = _empty_ocr_data()
+        block_offset = 0
+        with self._recognizers.checkout() as api:
+            api.SetImage(self._image.fromarray(img))
+            for x, y, w, h in regions:
+                api.SetRectangle(x, y, w, h)
+                ocr_data = self._words(api, _empty_ocr_data())
+                ocr_data['block_num'] = [block + block_offset for block in ocr_data['block_num']]
+                for key in OCR_DATA_KEYS:
+                    merged[key].extend(ocr_data[key])
+                if ocr_data['block_num']:
+                    block_offset = max(ocr_data['block_num'])
+        return merged
+
+
+OCR_BACKENDS = {
+    TesseractCliBackend.name: TesseractCliBackend,
+    TesserocrBackend.name: TesserocrBackend,
+}
+
+_backend_instances = {}
+_backend_lock = threading.Lock()
+
+
+def get_ocr_backend(name='auto'):
+    """Return a shared backend instance.
+
+    'auto' prefers the warm tesserocr backend and falls back to the
+    pytesseract CLI backend when tesserocr or its language data is missing.
+    """
+    with _backend_lock:
+        if name in _backend_instances:
+            return _backend_instances[name]
+
+        candidates = ['tesserocr', 'tesseract'] if name == 'auto' else [name]
+        backend = None
+        for candidate in candidates:
+            if candidate not in OCR_BACKENDS:
+                raise ValueError(f"Unknown OCR backend: {candidate}")
+            try:
+                backend = OCR_BACKENDS[candidate]()
+                break
+            except (ImportError, RuntimeError) as e:
+                print(f"OCR backend '{candidate}' unavailable: {e}")
+        if backend is None:
+            backend = TesseractCliBackend()
+
+        _backend_instances[name] = backend
+        return backend
+
+
+def find_text_regions(thresh, padding=4, min_height=8, min_area=100):
+    """Candidate text regions from the thresholded image of the contour pass.
+
+    Glyphs are merged into word/line blobs with a wide horizontal dilation;
+    each blob's padded bounding rect is returned as (x, y, w, h). Padded
+    rects that overlap are merged, so no word is recognised twice.
+    """
+    height, width = thresh.shape[:2]
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (15, 3))
+    merged = cv2.dilate(thresh, kernel, iterations=1)
+    contours, _ = cv2.findContours(merged, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    rects, _ = contour_stats(contours)
+    x, y, w, h = rects.T
+    keep = (h >= min_height) & (w * h >= min_area)
+    x0 = np.maximum(x[keep] - padding, 0)
+    y0 = np.maximum(y[keep] - padding, 0)
+    x1 = np.minimum(x[keep] + w[keep] + padding, width)
+    y1 = np.minimum(y[keep] + h[keep] + padding, height)
+
+    boxes = _merge_overlapping(np.stack([x0, y0, x1, y1], axis=1).tolist())
+
+    # Reading order, top-to-bottom then left-to-right
+    boxes.sort(key=lambda box: (box[1], box[0]))
+    return [(bx0, by0, bx1 - bx0, by1 - by0) for bx0, by0, bx1, by1 in boxes]
+
+
+def _merge_overlapping(boxes):
+    """Replace overlapping (x0, y0, x1, y1) boxes by their union until none overlap."""
+    changed = True
+    while changed:
+        changed = False
+        merged = []
+        for box in boxes:
+            for other in merged:
+                if box[0] < other[2] and other[0] < box[2] and box[1] < other[3] and other[1] < box[3]:
+                    other[:] = [min(box[0], other[0]), min(box[1], other[1]),
+                                max(box[2], other[2]), max(box[3], other[3])]
+                    changed = True
+                    break
+            else:
+                merged.append(list(box))
+        boxes = merged
+    return boxes
@@ -0,0 +1,125 @@
+"""Response profiles, field selection and content negotiation for analysis payloads.
+
+Analyses are cached in their full form and shaped per request:
+
+- profile=compact (default) replaces the per-contour `element_ratios` and
+  `spacing_patterns` lists with summary statistics and fixed-bin
+  histograms, so the payload size no longer grows with the contour count;
+- profile=full returns everything (debugging);
+- fields=a,b.c keeps only the listed (dotted) keys of the analysis.
+
+Bodies are JSON, or MessagePack when the client prefers
+application/msgpack and the optional `msgpack` package is installed, and
+are gzip-compressed when the client sends Accept-Encoding: gzip.
+"""
+import gzip
+import json
+
+import numpy as np
+
+PROFILES = ('compact', 'full')
+DEFAULT_PROFILE = 'compact'
+
+# Histogram bins: counts[i] covers [edges[i], edges[i + 1]); the last bin is open-ended.
+# Ratio edges follow the scorer's hero / CTA / grid bands.
+RATIO_BIN_EDGES = (0.0, 0.25, 0.5, 0.8, 1.2, 2.0, 3.0, 5.0)
+SPACING_BIN_EDGES = (0, 8, 16, 32, 64, 128, 256, 512)
+
+JSON_MIMETYPE = 'application/json'
+MSGPACK_MIMETYPES = ('application/msgpack', 'application/x-msgpack')
+GZIP_MIN_BYTES = 1024
+
+try:
+    import msgpack  # Optional dependency
+except ImportError:
+    msgpack = None
+
+
+def summarize(values, edges):
+    """Count, min / max / mean / median and a fixed-bin histogram of a list of numbers."""
+    values = np.asarray(values, dtype=np.float64)
+    counts, _ = np.histogram(values, bins=np.append(np.asarray(edges, dtype=np.float64), np.inf))
+    summary = {'count': int(values.size), 'min': None, 'max': None, 'mean': None, 'median': None}
+    if values.size:
+        summary.update(min=float(values.min()), max=float(values.max()),
+                       mean=round(float(values.mean()), 4), median=float(np.median(values)))
+    summary['histogram'] = {'edges': list(edges), 'counts': counts.tolist()}
+    return summary
+
+
+def compact_analysis(analysis):
+    """Analysis with the per-contour lists replaced by their summaries."""
+    layout = dict(analysis.get('layout_features', {}))
+    ratios = layout.pop('element_ratios', [])
+    spacing = layout.pop('spacing_patterns', []) or {}
+    layout['element_ratio_summary'] = summarize(ratios, RATIO_BIN_EDGES)
+    layout['spacing_summary'] = {axis: summarize(spacing.get(axis, []), SPACING_BIN_EDGES)
+                                 for axis in ('vertical', 'horizontal')}
+    return {**analysis, 'layout_features': layout}
+
+
+def _field_tree(fields):
+    # 'a.b' and 'a.c' -> {'a': {'b': None, 'c': None}}; None selects the whole value
+    tree = {}
+    for field in fields:
+        node = tree
+        parts = field.split('.')
+        for part in parts[:-1]:
+            child = node.setdefault(part, {})
+            if child is None:
+                break  # a parent is already selected whole
+            node = child
+        else:
+            node[parts[-1]] = None
+    return tree
+
+
+def _select(data, tree):
+    selected = {}
+    for key, subtree in tree.items():
+        if key not in data:
+            continue
+        if subtree is None or not isinstance(data[key], dict):
+            selected[key] = data[key]
+        else:
+            selected[key] = _select(data[key], subtree)
+    return selected
+
+
+def select_fields(analysis, fields):
+    """Keep only the given dotted keys of `analysis`; unknown keys are ignored."""
+    return _select(analysis, _field_tree(fields))
+
+
+def parse_shape_args(values):
+    """(profile, fields) from request args; raises ValueError for an unknown profile."""
+    profile = values.get('profile', DEFAULT_PROFILE)
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown profile '{profile}' (expected one of: {', '.join(PROFILES)})")
+    fields = [field.strip() for field in values.get('fields', '').split(',') if field.strip()]
+    return profile, fields or None
+
+
+def shape_analysis(analysis, profile=DEFAULT_PROFILE, fields=None):
+    if profile == 'compact':
+        analysis = compact_analysis(analysis)
+    if fields:
+        analysis = select_fields(analysis, fields)
+    return analysis
+
+
+def negotiate_mimetype(accept_mimetypes):
+    """JSON, or MessagePack when the client prefers it and msgpack is installed."""
+    offers = [JSON_MIMETYPE] + (list(MSGPACK_MIMETYPES) if msgpack is not None else [])
+    return accept_mimetypes.best_match(offers, default=JSON_MIMETYPE) or JSON_MIMETYPE
+
+
+def encode_body(payload, mimetype, accept_gzip):
+    """(body bytes, content encoding or None) for a payload in the negotiated format."""
+    if mimetype in MSGPACK_MIMETYPES:
+        body = msgpack.packb(payload, use_bin_type=True)
+    else:
+        body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    if accept_gzip and len(body) >= GZIP_MIN_BYTES:
+        return gzip.compress(body, compresslevel=6), 'gzip'
+    return body, None
@@ -0,0 +1,54 @@
+"""Jobs for the /upload/batch and /upload/page process pool.
+
+Pool workers are started from a forkserver and import this module, not the
+Flask app, so no catalog watcher, job threads, caches or vector index come
+up in them. Every job carries the analysis settings and names the matcher
+it must use as (kind, path, version); a worker loads that matcher on first
+use and again when the version changes, and never polls the catalog itself.
+
+Jobs return their stage timings (metrics.collect_stages) with the result,
+so the parent's /metrics covers work done in the pool.
+"""
+from analysis import analyze_image_bytes, build_analysis_result
+from catalog import load_catalog
+from metrics import collect_stages
+from vectors import load_vector_index
+
+_matchers = {}  # (kind, path) -> (matcher, version)
+
+
+def load_matcher(kind, path, version):
+    """(matcher, version) for a job, loaded once per worker and reloaded when `version` changes.
+
+    The returned version differs from the one asked for when the file
+    changed again after the job was submitted (or fails to load, in which
+    case the last good matcher is kept); callers should not cache the result.
+    """
+    cached = _matchers.get((kind, path))
+    if cached is not None and cached[1] == version:
+        return cached
+    try:
+        matcher = load_vector_index(path) if kind == 'vectors' else load_catalog(path)
+    except Exception as e:
+        if cached is None:
+            raise
+        print(f"ERROR loading {path} in pool worker: {e} (keeping version {cached[1]})")
+        return cached
+    _matchers[(kind, path)] = (matcher, matcher.version)
+    return _matchers[(kind, path)]
+
+
+def analyze_upload(data, matcher_spec, settings, top_k=None, reduce_factor=1):
+    """Decode and analyse one upload; returns (analysis_result, matcher_version, stages)."""
+    matcher, version = load_matcher(*matcher_spec)
+    with collect_stages() as stages:
+        analysis_result = analyze_image_bytes(data, matcher, settings, top_k=top_k, reduce_factor=reduce_factor)
+    return analysis_result, version, stages
+
+
+def analyze_section(img_cv, matcher_spec, settings, top_k=None):
+    """Analyse one decoded page section; returns (analysis_result, matcher_version, stages)."""
+    matcher, version = load_matcher(*matcher_spec)
+    with collect_stages() as stages:
+        analysis_result = build_analysis_result(img_cv, matcher, settings, top_k=top_k)
+    return analysis_result, version, stages
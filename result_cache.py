@@ -0,0 +1,162 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+def cache_key(data, catalog_version, variant=''):
+    """Content-addressed key: hash of the uploaded bytes plus the catalog version."""
+    digest = hashlib.sha256(data).hexdigest()
+    return f"{digest}:{catalog_version}:{variant}"
+
+
+class AnalysisCache:
+    """Two-tier cache for /upload analysis payloads.
+
+    The memory tier is an LRU bounded by `max_entries`. When `disk_dir` is
+    set, entries are also written there as JSON so they survive restarts;
+    disk hits are promoted back into memory. The disk tier is held to
+    `disk_max_entries` files and `disk_max_bytes`, least recently used
+    first, so entries orphaned by catalog changes age out.
+
+    Pruning works from an in-process index of the disk files with running
+    totals, so a put costs O(1) plus the evictions it causes. The directory
+    is listed on start-up and again every `disk_rescan_interval` seconds to
+    pick up files written by other processes sharing it.
+    """
+
+    def __init__(self, max_entries=256, disk_dir=None, disk_max_entries=4096, disk_max_bytes=256 * 1024 * 1024,
+                 disk_rescan_interval=300.0):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.disk_max_entries = disk_max_entries
+        self.disk_max_bytes = disk_max_bytes
+        self.disk_rescan_interval = disk_rescan_interval
+        self._entries = OrderedDict()
+        self._disk_entries = OrderedDict()  # path -> size, least recently used first
+        self._disk_bytes = 0
+        self._next_disk_scan = 0.0
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0, 'disk_evictions': 0}
+
+        if self.disk_dir:
+            if not os.path.exists(self.disk_dir):
+                os.makedirs(self.disk_dir)
+            self._prune_disk()
+
+    def _disk_path(self, key):
+        name = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.disk_dir, f"{name}.json")
+
+    def _scan_disk(self):
+        """Rebuild the disk index from the directory, ordered by modification time."""
+        entries = []
+        for name in os.listdir(self.disk_dir):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.disk_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        entries.sort()
+        with self._lock:
+            self._disk_entries = OrderedDict((path, size) for _, size, path in entries)
+            self._disk_bytes = sum(size for _, size, _ in entries)
+            self._next_disk_scan = time.monotonic() + self.disk_rescan_interval
+
+    def _track_disk(self, path, size):
+        # Caller holds the lock; marks `path` as the most recently used file
+        self._disk_bytes += size - self._disk_entries.pop(path, 0)
+        self._disk_entries[path] = size
+
+    def _prune_disk(self):
+        """Delete the least recently used disk entries until the tier is within both caps."""
+        if time.monotonic() >= self._next_disk_scan:
+            self._scan_disk()
+        while True:
+            with self._lock:
+                if len(self._disk_entries) <= self.disk_max_entries and self._disk_bytes <= self.disk_max_bytes:
+                    return
+                path, size = self._disk_entries.popitem(last=False)
+                self._disk_bytes -= size
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue  # already pruned by another process
+            except OSError as e:
+                print(f"Error pruning analysis cache entry {path}: {e}")
+                continue
+            with self._lock:
+                self.stats['disk_evictions'] += 1
+
+    def _store_memory(self, key, value):
+        # Caller holds the lock
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return self._entries[key]
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            try:
+                with open(path, 'r') as f:
+                    value = json.load(f)
+                    size = os.fstat(f.fileno()).st_size
+                os.utime(path)  # recently used entries survive pruning after a restart
+            except (OSError, ValueError):
+                value = None
+            if value is not None:
+                with self._lock:
+                    self.stats['hits'] += 1
+                    self.stats['disk_hits'] += 1
+                    self._store_memory(key, value)
+                    self._track_disk(path, size)
+                return value
+
+        with self._lock:
+            self.stats['misses'] += 1
+        return None
+
+    def put(self, key, value):
+        if self.max_entries > 0:
+            with self._lock:
+                self._store_memory(key, value)
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                with open(tmp_path, 'w') as f:
+                    json.dump(value, f)
+                    size = f.tell()
+                os.replace(tmp_path, path)
+            except OSError as e:
+                print(f"Error writing analysis cache entry: {e}")
+                return
+            with self._lock:
+                self._track_disk(path, size)
+            self._prune_disk()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats, entries=len(self._entries), max_entries=self.max_entries)
@@ -0,0 +1,86 @@
+import cv2
+import numpy as np
+
+# Thresholds are in 1x design pixels and scaled by frame width / DESIGN_WIDTH
+DESIGN_WIDTH = 1440
+MIN_SECTION_GAP = 96
+MIN_SECTION_HEIGHT = 160
+
+
+def _runs(mask):
+    """(start, end) index pairs of consecutive True runs in a 1-D bool array."""
+    padded = np.concatenate(([False], mask, [False]))
+    edges = np.flatnonzero(np.diff(padded.astype(np.int8)))
+    return edges.reshape(-1, 2)
+
+
+def find_section_bounds(img_cv, min_gap=MIN_SECTION_GAP, min_height=MIN_SECTION_HEIGHT,
+                        ink_fraction=0.002, edge_fraction=0.9):
+    """Split a tall frame into horizontal sections; returns [(y0, y1), ...] top to bottom.
+
+    Rows of the thresholded image with (almost) no ink are whitespace; rows
+    inked across nearly the full width are background band edges. A page is
+    cut in the middle of every whitespace band at least `min_gap` tall and
+    at every band edge. Blank sections are dropped and sections shorter than
+    `min_height` are merged into the following one (a heading usually
+    belongs to the content below it).
+    """
+    height, width = img_cv.shape[:2]
+    scale = width / DESIGN_WIDTH
+    min_gap = max(1, int(round(min_gap * scale)))
+    min_height = max(1, int(round(min_height * scale)))
+
+    gray = cv2.cvtColor(img_cv, cv2.COLOR_BGR2GRAY)
+    thresh = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV, 11, 2)
+    occupancy = np.count_nonzero(thresh, axis=1) / width
+
+    band_edge = occupancy >= edge_fraction
+    separator = (occupancy <= ink_fraction) | band_edge
+
+    cuts = [0]
+    for start, end in _runs(separator):
+        if start == 0 or end == height:
+            continue  # page margins, not section breaks
+        edge_rows = np.flatnonzero(band_edge[start:end])
+        if edge_rows.size:
+            cuts.append(int(start + edge_rows[0]))  # cut exactly at the background change
+        elif end - start >= min_gap:
+            cuts.append(int(start + end) // 2)
+    cuts.append(height)
+
+    sections = []
+    for y0, y1 in zip(cuts[:-1], cuts[1:]):
+        # Ignore rows that are only band edges when deciding if a section has content
+        content = (occupancy[y0:y1] > ink_fraction) & ~band_edge[y0:y1]
+        if y1 > y0 and content.any():
+            sections.append([y0, y1])
+
+    merged = []
+    pending_start = None
+    for y0, y1 in sections:
+        if pending_start is not None:
+            y0 = pending_start
+            pending_start = None
+        if y1 - y0 < min_height:
+            pending_start = y0
+            continue
+        merged.append([y0, y1])
+    if pending_start is not None:
+        if merged:
+            merged[-1][1] = sections[-1][1]
+        else:
+            merged.append([pending_start, sections[-1][1]])
+
+    return [tuple(bounds) for bounds in merged] or [(0, height)]
+
+
+def cap_sections(bounds, max_sections):
+    """At most `max_sections` bounds: any beyond the cap are merged into the last one kept.
+
+    The page stays fully covered; only the tail is analysed as one section.
+    """
+    if max_sections <= 0 or len(bounds) <= max_sections:
+        return list(bounds)
+    capped = list(bounds[:max_sections])
+    capped[-1] = (capped[-1][0], bounds[-1][1])
+    return capped
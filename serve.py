@@ -0,0 +1,122 @@
+"""Production entry point: preload once in a parent process, then fork warm workers.
+
+Usage (from the repository root):
+
+    python serve.py --host 0.0.0.0 --port 5000 --workers 4
+
+The parent imports the app (OpenCV, NumPy, the compiled catalog), runs
+app.warm_up() and freezes the garbage collector before forking, so workers
+start warm and share the catalog pages copy-on-write. Every worker serves
+the shared listening socket with a threaded WSGI server and warms up again
+before accepting connections; /ready reports each worker's state. The
+parent restarts workers that exit and forwards SIGINT / SIGTERM.
+
+The parent starts no threads: each worker starts its own catalog watcher
+after the fork. Metrics are kept per worker, so every /metrics series
+carries a `worker` label, the worker's slot (0 .. --workers - 1, reused
+when a worker is restarted). A scrape is answered by whichever worker
+accepts the connection; sum over `worker` across scrapes.
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+
+
+def serve_worker(sock, host, port, slot):
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+    from werkzeug.serving import make_server
+    import app as app_module
+
+    app_module.REGISTRY.set_constant_labels(worker=slot)
+    app_module.catalog_store.start_watching()
+    # Cheap after the parent's warm-up; re-checks OpenCV and OCR in this process
+    app_module.warm_up()
+    server = make_server(host, port, app_module.app, threaded=True, fd=sock.fileno())
+    server.serve_forever()
+
+
+def spawn_worker(sock, host, port, slot):
+    pid = os.fork()
+    if pid == 0:
+        exit_code = 0
+        try:
+            serve_worker(sock, host, port, slot)
+        except KeyboardInterrupt:
+            pass
+        except BaseException:
+            traceback.print_exc()
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+    return pid
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve the Relume matcher with preloaded, forked workers.')
+    parser.add_argument('--host', default=os.environ.get('HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 5000)))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('WEB_WORKERS', os.cpu_count() or 1)))
+    parser.add_argument('--backlog', type=int, default=128)
+    args = parser.parse_args(argv)
+    workers = max(1, args.workers)
+
+    # Each worker lazily starts its own /upload/batch process pool; split the CPUs between them
+    os.environ.setdefault('BATCH_WORKERS', str(max(1, (os.cpu_count() or 1) // workers)))
+
+    sock = socket.create_server((args.host, args.port), backlog=args.backlog)
+    sock.set_inheritable(True)
+
+    started = time.perf_counter()
+    import app as app_module
+    if not app_module.warm_up():
+        print(f"Warm-up checks failed, /ready will report 503: {app_module.readiness['checks']}")
+    print(f"Preloaded app in {time.perf_counter() - started:.2f}s")
+
+    # Objects created so far are never collected; keeps GC passes from
+    # touching (and un-sharing) the preloaded pages in the workers
+    gc.collect()
+    gc.freeze()
+
+    children = {}  # pid -> worker slot
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for slot in range(workers):
+        children[spawn_worker(sock, args.host, args.port, slot)] = slot
+    print(f"Serving on http://{args.host}:{args.port} with {workers} workers (parent pid {os.getpid()})")
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        slot = children.pop(pid, None)
+        if not stopping and slot is not None:
+            print(f"Worker {pid} exited with status {status}; restarting")
+            time.sleep(1)  # avoid a tight restart loop if workers keep crashing
+            children[spawn_worker(sock, args.host, args.port, slot)] = slot
+
+    sock.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
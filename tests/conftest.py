@@ -0,0 +1,16 @@
+# tests/conftest.py
+import sys
+import os
+
+import pytest
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from ocr_backends import NullOcrBackend
+
+
+@pytest.fixture
+def no_text_backend():
+    """An OCR backend that finds no text, for tests of the geometric pass."""
+    return NullOcrBackend()
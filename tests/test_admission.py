@@ -0,0 +1,177 @@
+# tests/test_admission.py
+import sys
+import os
+import io
+import struct
+import threading
+
+import cv2
+import numpy as np
+from PIL import Image
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+import app as app_module
+from app import app
+from admission import (ANALYSIS_BYTES_PER_PIXEL, FRAME_BYTES_PER_PIXEL, OPENCV_DECODES_GIF, WORKING_BYTES_PER_PIXEL,
+                       AdmissionError, MemoryBudget, cap_decoded, plan_decode, read_image_size)
+
+
+def encode(ext, width=320, height=200, params=()):
+    img = np.full((height, width, 3), 255, np.uint8)
+    cv2.rectangle(img, (20, 20), (width // 2, height // 2), (0, 0, 0), -1)
+    ok, buf = cv2.imencode(ext, img, list(params))
+    assert ok
+    return buf.tobytes()
+
+
+def test_read_image_size_from_headers():
+    assert read_image_size(encode('.png')) == ('PNG', 320, 200)
+    assert read_image_size(encode('.jpg')) == ('JPEG', 320, 200)
+    assert read_image_size(encode('.bmp')) == ('BMP', 320, 200)
+    assert read_image_size(encode('.webp')) == ('WebP', 320, 200)
+    assert read_image_size(encode('.webp', params=(cv2.IMWRITE_WEBP_QUALITY, 101))) == ('WebP', 320, 200)  # lossless
+    assert read_image_size(b'GIF89a' + struct.pack('<HH', 640, 480) + b'\x00' * 8) == ('GIF', 640, 480)
+    assert read_image_size(b'not an image') is None
+    assert read_image_size(encode('.png')[:20]) is None, "Truncated headers should not be trusted"
+
+    # EXIF/ICC/XMP segments can push the JPEG frame header well past the first 64 KB
+    jpeg = encode('.jpg')
+    app1 = b'\xff\xe1' + struct.pack('>H', 65000) + b'\x00' * 64998
+    assert read_image_size(jpeg[:2] + app1 + app1 + jpeg[2:]) == ('JPEG', 320, 200)
+
+
+def test_plan_decode_downscales_or_rejects():
+    png = encode('.png', width=4000, height=3000)
+    assert plan_decode(png, max_pixels=20_000_000) == (1, len(png) + 12_000_000 * ANALYSIS_BYTES_PER_PIXEL)
+    factor, _ = plan_decode(png, max_pixels=2_000_000)
+    assert factor == 4, "Smallest reduction that fits: 1000x750"
+    _, estimate = plan_decode(png, max_pixels=20_000_000, working_width=1000)
+    assert estimate == len(png) + 12_000_000 * FRAME_BYTES_PER_PIXEL + 750_000 * WORKING_BYTES_PER_PIXEL
+
+    for policy, max_pixels in (('reject', 2_000_000), ('downscale', 100_000)):
+        try:
+            plan_decode(png, max_pixels=max_pixels, policy=policy)
+        except AdmissionError as e:
+            assert e.status == 413 and '4000x3000' in str(e)
+        else:
+            raise AssertionError(f"{policy} with {max_pixels} px should reject")
+
+    try:
+        plan_decode(b'not an image', max_pixels=1_000_000)
+    except AdmissionError as e:
+        assert e.status == 415 and 'TIFF' in str(e)
+    else:
+        raise AssertionError('Unrecognised data should be rejected')
+
+
+def test_unsized_formats_are_capped_after_decoding():
+    tiff = encode('.tiff', width=4000, height=3000)
+    factor, estimate = plan_decode(tiff, max_pixels=2_000_000)
+    assert factor == 1 and estimate > 2_000_000 * ANALYSIS_BYTES_PER_PIXEL, "Worst-case reservation"
+    assert plan_decode(encode('.ppm'), max_pixels=2_000_000)[0] == 1
+
+    img = cv2.imdecode(np.frombuffer(tiff, np.uint8), cv2.IMREAD_COLOR)
+    capped = cap_decoded(img, 2_000_000)
+    assert capped.shape[0] * capped.shape[1] <= 2_000_000 and abs(capped.shape[1] / capped.shape[0] - 4 / 3) < 0.01
+    assert cap_decoded(capped, 2_000_000) is capped
+    try:
+        cap_decoded(img, 2_000_000, policy='reject')
+    except AdmissionError as e:
+        assert e.status == 413
+    else:
+        raise AssertionError('reject should refuse an oversized decode')
+
+
+def test_memory_budget_waits_then_rejects():
+    budget = MemoryBudget(100)
+    first = budget.reserve(60)
+    try:
+        budget.reserve(60, timeout=0.05)
+    except AdmissionError as e:
+        assert e.status == 503
+    else:
+        raise AssertionError('Budget should be exhausted')
+
+    threading.Timer(0.05, first.release).start()
+    with budget.reserve(60, timeout=2):
+        assert budget.in_flight == 60
+    assert budget.in_flight == 0
+    with budget.reserve(500, timeout=0):
+        assert budget.in_flight == 100, "Oversized reservations run alone"
+
+
+def test_memory_budget_waits_for_the_callers_own_work():
+    budget = MemoryBudget(100)
+    own = budget.reserve(100)
+    threading.Timer(0.2, own.release).start()
+    with budget.reserve(100, timeout=0.01, wait_while=lambda: not own._released):
+        assert budget.in_flight == 100, "No deadline while the caller's own reservation is held"
+
+    other = budget.reserve(100)
+    try:
+        budget.reserve(100, timeout=0.05, wait_while=lambda: False)
+    except AdmissionError as e:
+        assert e.status == 503, "Contention from other requests still times out"
+    else:
+        raise AssertionError('Budget should be exhausted')
+    other.release()
+
+
+def test_batch_files_wait_for_earlier_files_of_the_same_batch(monkeypatch):
+    app_module.analysis_cache.clear()
+    monkeypatch.setitem(app.config, 'BATCH_WORKERS', 2)
+    monkeypatch.setitem(app.config, 'ADMISSION_TIMEOUT', 0.0)
+    monkeypatch.setattr(app_module.memory_budget, 'max_bytes', 1024)  # one file at a time
+    files = [(io.BytesIO(encode('.png', width=300 + i)), f"frame{i}.png") for i in range(3)]
+    response = app.test_client().post('/upload/batch', data={'files': files}, content_type='multipart/form-data')
+    results = response.get_json()['results']
+    assert all('analysis' in result for result in results), results
+    assert app_module.memory_budget.in_flight == 0
+    app_module.reset_process_pool()
+
+
+def post(data, name='frame.png'):
+    return app.test_client().post('/upload', data={'file': (io.BytesIO(data), name)},
+                                  content_type='multipart/form-data')
+
+
+def test_upload_admission_errors(monkeypatch):
+    app_module.analysis_cache.clear()
+    png = encode('.png', width=1600, height=1000)
+    monkeypatch.setitem(app.config, 'MAX_IMAGE_PIXELS', 500_000)
+
+    monkeypatch.setitem(app.config, 'OVERSIZE_IMAGES', 'reject')
+    response = post(png)
+    assert response.status_code == 413 and '1600x1000' in response.get_json()['error']
+
+    monkeypatch.setitem(app.config, 'OVERSIZE_IMAGES', 'downscale')
+    response = post(png)
+    assert response.status_code == 200 and response.get_json()['analysis']['significant_box_count'] == 1
+    assert app_module.memory_budget.in_flight == 0, "Reservations must be released after the analysis"
+
+    assert post(b'not an image').status_code == 415
+    gif = io.BytesIO()
+    Image.new('RGB', (320, 200), 'white').save(gif, 'GIF')
+    response = post(gif.getvalue(), name='frame.gif')
+    if OPENCV_DECODES_GIF:
+        assert response.status_code == 200
+    else:
+        assert response.status_code == 415 and 'GIF' in response.get_json()['error']
+    truncated = encode('.png', width=1600, height=1000)[:200]
+    assert post(truncated, name='truncated.png').status_code == 415, "Admitted but undecodable"
+    response = post(encode('.tiff', width=1600, height=1000), name='frame.tiff')
+    assert response.status_code == 200 and response.get_json()['analysis']['significant_box_count'] == 1
+    monkeypatch.setitem(app.config, 'OVERSIZE_IMAGES', 'reject')
+    assert post(encode('.tiff', width=1000, height=1600), name='tall.tiff').status_code == 413
+    monkeypatch.setitem(app.config, 'OVERSIZE_IMAGES', 'downscale')
+
+    monkeypatch.setitem(app.config, 'ADMISSION_TIMEOUT', 0.0)
+    with app_module.memory_budget.reserve(app_module.memory_budget.max_bytes):
+        response = post(encode('.png', width=300))
+    assert response.status_code == 503 and response.headers['Retry-After']
+
+    monkeypatch.setitem(app.config, 'MAX_CONTENT_LENGTH', 1024)
+    response = post(png)
+    assert response.status_code == 413 and 'limit' in response.get_json()['error']
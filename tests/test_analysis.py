@@ -11,7 +11,15 @@ sys.path.insert(0, project_root)
 # --- End Path Setup ---
 
 # Import the function we want to test from app.py
-from app import find_best_match
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from admission import analysis_bytes
+from app import analyze_image, find_best_match, guess_dominant_side
+from matching import compile_catalog
+from ocr_backends import NullOcrBackend, OcrBackend
 
 # Define mock component data for testing (based on your relume_data.json)
 # Using slightly adjusted ranges based on test results
@@ -93,4 +101,74 @@ def test_find_best_match_scenarios():
         'element_ratios': [1.0] * 100
     }
     result6 = find_best_match(MOCK_COMPONENTS, layout_features6, guessed_dominant_side='left')
-    assert result6 is None, "Test Case 6 Failed: Should not find a match"
\ No newline at end of file
+    assert result6 is None, "Test Case 6 Failed: Should not find a match"
+
+
+# Test ranked alternatives from a precompiled catalog
+def test_find_best_match_top_k():
+    catalog = compile_catalog(MOCK_COMPONENTS)
+    layout_features = {
+        'bounding_boxes': [{'x': 0, 'y': 0, 'w': 100, 'h': 100}] * 12,  # Mock 12 boxes
+        'text_blocks': [{'text': 'test', 'confidence': 80}] * 2,  # Mock 2 text blocks
+        'spacing_patterns': {'vertical': [], 'horizontal': []},
+        'element_ratios': [1.0] * 12
+    }
+    best = find_best_match(catalog, layout_features, guessed_dominant_side='right')
+    ranked = find_best_match(catalog, layout_features, guessed_dominant_side='right', top_k=3)
+
+    assert 1 <= len(ranked) <= 3, f"Expected up to 3 ranked matches, got {len(ranked)}"
+    assert ranked[0][0] is best, "Top ranked match should be the single best match"
+    scores = [score for _, score in ranked]
+    assert scores == sorted(scores, reverse=True), f"Matches should be ranked by score, got {scores}"
+    assert all(score >= 5.0 for score in scores), "Alternatives should all clear the match threshold"
+
+    # Nothing clears the threshold -> empty list instead of None
+    layout_features['bounding_boxes'] = [{'x': 0, 'y': 0, 'w': 100, 'h': 100}] * 100
+    layout_features['text_blocks'] = [{'text': 'test', 'confidence': 80}] * 100
+    assert find_best_match(catalog, layout_features, guessed_dominant_side='left', top_k=3) == []
+
+
+# --- Working-resolution (pyramid) mode vs full resolution on synthetic 2x/4x exports ---
+def render_hero(scale):
+    """Text-left / image-right hero at 1440x900 design size, exported at `scale`x."""
+    img = np.full((900 * scale, 1440 * scale, 3), 255, np.uint8)
+
+    def rect(x0, y0, x1, y1, color=(40, 40, 40)):
+        cv2.rectangle(img, (x0 * scale, y0 * scale), (x1 * scale, y1 * scale), color, -1)
+
+    for i in range(4):
+        rect(100, 200 + i * 70, 600, 240 + i * 70)  # heading / copy lines
+    rect(100, 520, 260, 570, (200, 80, 30))  # button
+    rect(760, 150, 1340, 750, (120, 160, 200))  # image
+    return img
+
+
+def test_working_resolution_matches_full_resolution(no_text_backend):
+    for scale in (2, 4):
+        img = render_hero(scale)
+        full = analyze_image(img, ocr_backend=no_text_backend, working_width=0)
+        reduced = analyze_image(img, ocr_backend=no_text_backend, working_width=1440)
+
+        assert len(reduced['bounding_boxes']) == len(full['bounding_boxes']), f"Box count differs at {scale}x"
+        assert guess_dominant_side(reduced, img.shape[1]) == guess_dominant_side(full, img.shape[1])
+        # Boxes (x, y, w, h, area rows) are reported in full-resolution pixels, within one working pixel
+        position_error = np.abs(full['bounding_boxes'][:, :4] - reduced['bounding_boxes'][:, :4])
+        assert position_error.max() <= 2 * scale, f"Box positions differ at {scale}x"
+        assert find_best_match(MOCK_COMPONENTS, reduced, 'left') is find_best_match(MOCK_COMPONENTS, full, 'left')
+
+
+def test_analysis_peak_memory_fits_the_admission_estimate():
+    class GrayOnlyBackend(OcrBackend):
+        def recognize(self, img):
+            assert img.ndim == 2, "OCR should get the gray frame (PIL wraps it without a copy)"
+            return NullOcrBackend().recognize(img)
+
+    img = np.vstack([render_hero(2)] * 3)
+    height, width = img.shape[:2]
+    for working_width in (0, 1440):
+        tracemalloc.start()
+        analyze_image(img, ocr_backend=GrayOnlyBackend(), ocr_regions=False, working_width=working_width)
+        peak = tracemalloc.get_traced_memory()[1] + img.nbytes
+        tracemalloc.stop()
+        estimate = analysis_bytes(width, height, working_width)
+        assert peak <= 1.05 * estimate, f"working_width={working_width}: peak {peak} over estimate {estimate}"
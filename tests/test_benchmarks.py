@@ -0,0 +1,53 @@
+# tests/test_benchmarks.py
+import sys
+import os
+
+import numpy as np
+import pytest
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from app import analyze_image
+from benchmarks.run_benchmarks import compare, measure, reset_peak_rss
+from benchmarks.synthetic import LAYOUT_KINDS, generate_catalog, render_layout
+from matching import compile_catalog
+
+
+def test_synthetic_layouts_scale_and_produce_boxes():
+    for kind in LAYOUT_KINDS:
+        small = render_layout(kind, scale=1, elements=6, with_text=False)
+        large = render_layout(kind, scale=2, elements=6, with_text=False)
+        assert large.shape[0] == 2 * small.shape[0] and large.shape[1] == 2 * small.shape[1]
+        assert len(analyze_image(small, ocr_regions=False)['bounding_boxes']) >= 3, f"{kind} should have boxes"
+
+
+def test_generated_catalog_matches_relume_schema():
+    components = generate_catalog(50, seed=1)
+    assert len(components) == 50
+    assert components == generate_catalog(50, seed=1), "Catalogs should be reproducible for a seed"
+    for component in components:
+        assert component['min_boxes'] <= component['max_boxes']
+        assert component['min_text_blocks'] <= component['max_text_blocks']
+    assert len(compile_catalog(components)) == 50
+
+
+def test_compare_flags_p50_regressions_only_beyond_tolerance():
+    baseline = {'results': {'match/a': {'p50_ms': 1.0}, 'match/b': {'p50_ms': 1.0}}}
+    report = {'results': {'match/a': {'p50_ms': 1.2}, 'match/b': {'p50_ms': 1.5}, 'match/new': {'p50_ms': 9.0}}}
+    regressions = compare(report, baseline, tolerance=0.25)
+    assert [name for name, *_ in regressions] == ['match/b']
+
+
+def test_measure_reports_peak_rss_per_case():
+    if reset_peak_rss() is None:
+        pytest.skip('peak RSS cannot be reset on this platform')
+
+    def allocate(mb):
+        return lambda: np.ones(mb * 1024 * 1024, np.uint8).sum()
+
+    large = measure(allocate(256), iterations=1)
+    small = measure(allocate(8), iterations=1)
+    assert large['rss_growth_kb'] >= 200 * 1024
+    assert small['rss_growth_kb'] < 64 * 1024, "An earlier, larger case must not set this case's peak"
+    assert small['peak_rss_kb'] < large['peak_rss_kb']
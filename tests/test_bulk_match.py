@@ -0,0 +1,91 @@
+# tests/test_bulk_match.py
+import sys
+import os
+import io
+import json
+import subprocess
+
+import cv2
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from analysis import analyze_image, decode_image
+from benchmarks.synthetic import render_layout
+from bulk_match import find_images, run
+from vectors import build_vector_index, save_vector_index
+
+CATALOG = os.path.join(project_root, 'relume_data.json')
+
+
+def write_frames(root):
+    (root / 'landing').mkdir()
+    cv2.imwrite(str(root / 'hero.png'), render_layout('hero', with_text=False))
+    cv2.imwrite(str(root / 'landing' / 'grid.png'), render_layout('grid', with_text=False))
+    cv2.imwrite(str(root / 'landing' / 'cta.jpg'), render_layout('cta', with_text=False))
+    (root / 'broken.png').write_bytes(b'not an image')
+    (root / 'notes.txt').write_text('not a frame')
+
+
+def read_records(path):
+    """Parsed JSONL records, skipping partial lines left by an interrupted run."""
+    records = []
+    for line in path.read_text().splitlines():
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            pass
+    return records
+
+
+def test_bulk_match_streams_records_and_resumes(tmp_path):
+    frames = tmp_path / 'frames'
+    frames.mkdir()
+    write_frames(frames)
+    output = tmp_path / 'matches.jsonl'
+    assert find_images(str(frames)) == ['broken.png', 'hero.png', 'landing/cta.jpg', 'landing/grid.png']
+
+    summary = run(str(frames), str(output), CATALOG, workers=2, top_k=2, log=io.StringIO())
+    records = {record['path']: record for record in read_records(output)}
+    assert summary['processed'] == 4 and summary['matched'] == 3 and summary['errors'] == 1
+    assert 'error' in records['broken.png']
+    assert records['landing/grid.png']['box_count'] > 0 and 'alternatives' in records['hero.png']
+
+    # Simulate an interruption: drop one record and leave a half-written line
+    kept = [line for line in output.read_text().splitlines() if '"landing/cta.jpg"' not in line]
+    output.write_text('\n'.join(kept) + '\n{"path": "landing/cta.jp')
+
+    summary = run(str(frames), str(output), CATALOG, workers=2, log=io.StringIO())
+    assert summary['skipped'] == 2, "Successful records are skipped; errors are retried"
+    assert summary['processed'] == 2
+    paths = [record['path'] for record in read_records(output)]
+    assert sorted(set(paths)) == ['broken.png', 'hero.png', 'landing/cta.jpg', 'landing/grid.png']
+
+
+def test_workers_do_not_import_the_app(tmp_path):
+    cv2.imwrite(str(tmp_path / 'hero.png'), render_layout('hero', with_text=False))
+    code = ("import sys, bulk_match; "
+            f"bulk_match._init_worker({CATALOG!r}, None, None, 40_000_000, 0.5); "
+            f"record = bulk_match.match_file({str(tmp_path)!r}, 'hero.png', 1); "
+            "print('error' in record, sorted(m for m in ('app', 'flask') if m in sys.modules))")
+    output = subprocess.run([sys.executable, '-c', code], cwd=project_root, capture_output=True, text=True,
+                            check=True).stdout
+    assert output.strip().splitlines()[-1] == 'False []', f"Workers should import analysis modules only: {output}"
+
+
+def test_vector_mode_applies_the_similarity_threshold(tmp_path):
+    frames = tmp_path / 'frames'
+    frames.mkdir()
+    write_frames(frames)
+    components = [{'id': kind, 'name': kind.title()} for kind in ('hero', 'grid', 'cta')]
+    index = build_vector_index(components, str(frames), analyze_image, decode_image)
+    vectors_path = str(tmp_path / 'vectors')
+    save_vector_index(index, vectors_path)
+
+    for min_similarity, expect_match in ((0.5, True), (1.01, False)):
+        output = tmp_path / f"matches-{min_similarity}.jsonl"
+        run(str(frames), str(output), vectors_path=vectors_path, workers=2, log=io.StringIO(),
+            min_similarity=min_similarity)
+        records = {record['path']: record for record in read_records(output)}
+        assert (records['hero.png']['componentName'] == 'Hero') is expect_match
+        assert (records['hero.png']['componentName'] is None) is not expect_match
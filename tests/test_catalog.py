@@ -0,0 +1,82 @@
+# tests/test_catalog.py
+import sys
+import os
+import json
+import random
+
+import numpy as np
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from benchmarks.synthetic import generate_catalog
+from catalog import CatalogIndex, CatalogStore, load_binary, load_catalog, save_binary
+from matching import compile_catalog, find_best_match
+
+
+def random_layout(rng):
+    spacing = []
+    if rng.random() < 0.7:
+        spacing = {'vertical': [rng.choice([40, 42, 90]) for _ in range(rng.randint(0, 4))],
+                   'horizontal': [rng.choice([60, 61, 200]) for _ in range(rng.randint(0, 4))]}
+    return {
+        'bounding_boxes': np.zeros((rng.randint(0, 45), 5), dtype=np.int64),
+        'text_blocks': [{}] * rng.randint(0, 20),
+        'grid_patterns': [],
+        'spacing_patterns': spacing,
+        'element_ratios': np.array([rng.choice([0.5, 0.9, 1.0, 1.1, 2.5, 4.0]) for _ in range(rng.randint(0, 5))]),
+    }
+
+
+def test_indexed_matching_equals_full_scan():
+    rng = random.Random(3)
+    components = generate_catalog(10000, seed=7)
+    full = compile_catalog(components)
+    indexed = compile_catalog(components)
+    indexed.index = CatalogIndex(indexed)
+
+    pruned = 0
+    for _ in range(150):
+        layout = random_layout(rng)
+        side = rng.choice(['left', 'right', 'center', 'balanced'])
+        expected = find_best_match(full, layout, side, top_k=10)
+        actual = find_best_match(indexed, layout, side, top_k=10)
+        assert [(c['id'], s) for c, s in actual] == [(c['id'], s) for c, s in expected], \
+            f"Index changed the ranking for {side} / {len(layout['bounding_boxes'])} boxes"
+        assert find_best_match(indexed, layout, side) == find_best_match(full, layout, side)
+
+        summary = (len(layout['bounding_boxes']), len(layout['text_blocks']), 0, None)
+        pruned += len(full) - len(indexed.index.candidates(summary, side, 5.0))
+    assert pruned > 0, "The index should skip components that cannot reach the threshold"
+
+
+def test_binary_catalog_round_trip_is_memory_mapped(tmp_path):
+    catalog = compile_catalog(generate_catalog(100, seed=2))
+    path = str(tmp_path / 'catalog')
+    save_binary(catalog, path)
+
+    loaded = load_binary(path)
+    assert isinstance(loaded.min_boxes.base, np.memmap), "Columns should be views of the memory-mapped files"
+    assert loaded.version == catalog.version and loaded.components == catalog.components
+    for name, values in catalog.columns().items():
+        assert np.array_equal(getattr(loaded, name), values), f"Column {name} differs after round trip"
+    assert load_catalog(path).index is not None
+
+
+def test_store_hot_reloads_and_keeps_old_catalog_on_error(tmp_path):
+    path = tmp_path / 'relume_data.json'
+    path.write_text(json.dumps(generate_catalog(10, seed=1)))
+    store = CatalogStore(str(path))
+    first = store.current()
+    assert len(first) == 10 and first.index is not None
+
+    assert not store.reload(), "Unchanged file should not be reloaded"
+    path.write_text(json.dumps(generate_catalog(25, seed=1)))
+    assert store.reload()
+    assert len(store.current()) == 25 and store.current().version != first.version
+    assert len(first) == 10, "Snapshots held by in-flight requests must not change"
+
+    path.write_text('[{"broken": ')
+    assert not store.reload()
+    assert len(store.current()) == 25, "A broken file should keep the previous catalog"
+    assert store.stats == {'reloads': 2, 'reload_errors': 1}
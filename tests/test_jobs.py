@@ -0,0 +1,84 @@
+# tests/test_jobs.py
+import sys
+import os
+import io
+import threading
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+import app as app_module
+from app import app
+from jobs import JobQueue
+
+
+def wait_until_finished(job_queue, job_id):
+    version = -1
+    while True:
+        version, job_info = job_queue.wait_for_change(job_id, version, timeout=5)
+        assert job_info is not None
+        if job_info['status'] in ('done', 'error'):
+            return job_info
+
+
+def test_job_reports_stage_progress_and_result():
+    def handler(payload, progress):
+        for stage in ('decode', 'contours', 'ocr', 'match'):
+            progress(stage)
+        return {'echo': payload}
+
+    job_queue = JobQueue(handler, workers=1, max_queued=4)
+    job = job_queue.submit('frame')
+    job_info = wait_until_finished(job_queue, job.id)
+
+    assert job_info['status'] == 'done'
+    assert job_info['result'] == {'echo': 'frame'}
+    assert job_info['stages_completed'] == ['decode', 'contours', 'ocr', 'match']
+    assert job_info['progress'] == 1.0
+
+
+def test_job_errors_do_not_leak_internal_messages():
+    def handler(payload, progress):
+        if payload == 'bad-input':
+            raise ValueError('Failed to decode image file')
+        raise RuntimeError('internal detail')
+
+    job_queue = JobQueue(handler, workers=1, max_queued=4)
+    bad_input = wait_until_finished(job_queue, job_queue.submit('bad-input').id)
+    crashed = wait_until_finished(job_queue, job_queue.submit('crash').id)
+    assert bad_input['error'] == 'Failed to decode image file'
+    assert crashed['error'] == 'Failed to process file on server'
+
+
+def test_full_queue_is_rejected_with_429(monkeypatch):
+    release = threading.Event()
+    started = threading.Event()
+
+    def blocking_handler(payload, progress):
+        started.set()
+        release.wait(5)
+        return {}
+
+    job_queue = JobQueue(blocking_handler, workers=1, max_queued=1)
+    monkeypatch.setattr(app_module, 'job_queue', job_queue)
+    client = app.test_client()
+
+    def post():
+        return client.post('/jobs', data={'file': (io.BytesIO(b'image'), 'frame.png')},
+                           content_type='multipart/form-data')
+
+    try:
+        assert post().status_code == 202  # picked up by the only worker
+        assert started.wait(5)
+        assert post().status_code == 202  # waits in the queue
+        response = post()
+        assert response.status_code == 429, "A full queue should push back instead of buffering"
+        assert response.headers['Retry-After']
+    finally:
+        release.set()
+
+
+def test_unknown_job_is_404():
+    client = app.test_client()
+    assert client.get('/jobs/does-not-exist').status_code == 404
+    assert client.get('/jobs/does-not-exist/events').status_code == 404
@@ -0,0 +1,86 @@
+# tests/test_metrics.py
+import sys
+import os
+import io
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+import cv2
+import numpy as np
+
+import app as app_module
+from app import app, find_best_match
+from metrics import STAGE_SECONDS, Histogram, MetricsRegistry
+
+
+def test_histogram_renders_cumulative_prometheus_buckets():
+    histogram = Histogram('demo_seconds', 'Demo latency.', ('stage',), buckets=(0.1, 1.0))
+    histogram.observe(0.05, stage='ocr')
+    histogram.observe(0.5, stage='ocr')
+    histogram.observe(5.0, stage='ocr')
+
+    lines = histogram.render()
+    assert 'demo_seconds_bucket{stage="ocr",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{stage="ocr",le="1.0"} 2' in lines
+    assert 'demo_seconds_bucket{stage="ocr",le="+Inf"} 3' in lines
+    assert 'demo_seconds_count{stage="ocr"} 3' in lines
+
+
+def test_constant_labels_are_added_to_every_series():
+    registry = MetricsRegistry()
+    registry.counter('demo_total', 'Demo events.', ('event',)).inc(event='hit')
+    registry.histogram('demo_seconds', 'Demo latency.', buckets=(1.0,)).observe(0.5)
+    registry.callback('demo_entries', 'Demo entries.', lambda: 3)
+    registry.set_constant_labels(worker=1)
+
+    lines = registry.render().splitlines()
+    assert 'demo_total{event="hit",worker="1"} 1' in lines
+    assert 'demo_seconds_bucket{worker="1",le="1.0"} 1' in lines
+    assert 'demo_entries{worker="1"} 3' in lines
+
+
+def test_metrics_endpoint_reports_stage_timings_and_requests():
+    app_module.analysis_cache.clear()
+    app_module.near_duplicates.clear()
+    img = np.full((200, 400, 3), 255, np.uint8)
+    cv2.rectangle(img, (20, 20), (120, 120), (0, 0, 0), -1)
+    png = cv2.imencode('.png', img)[1].tobytes()
+
+    client = app.test_client()
+    assert client.post('/upload', data={'file': (io.BytesIO(png), 'frame.png')},
+                       content_type='multipart/form-data').status_code == 200
+
+    body = client.get('/metrics').get_data(as_text=True)
+    for stage in ('decode', 'blur_threshold', 'contours', 'ocr', 'match'):
+        assert f'relume_analysis_stage_seconds_count{{stage="{stage}"}}' in body, f"Missing {stage} timings"
+    assert 'relume_http_requests_total{endpoint="/upload",method="POST",status="200"}' in body
+    assert 'relume_analysis_cache_events_total{event="misses"}' in body
+
+
+def test_pool_stage_timings_reach_the_parent_registry(monkeypatch):
+    monkeypatch.setitem(app.config, 'BATCH_WORKERS', 1)
+    app_module.analysis_cache.clear()
+    img = np.full((200, 400, 3), 255, np.uint8)
+    cv2.rectangle(img, (40, 40), (160, 160), (0, 0, 0), -1)
+    png = cv2.imencode('.png', img)[1].tobytes()
+    before = {stage: STAGE_SECONDS.count(stage=stage) for stage in ('decode', 'contours', 'ocr', 'match')}
+
+    response = app.test_client().post('/upload/batch', data={'files': [(io.BytesIO(png), 'pooled.png')]},
+                                      content_type='multipart/form-data')
+    assert response.status_code == 200 and 'analysis' in response.get_json()['results'][0]
+    for stage, count in before.items():
+        assert STAGE_SECONDS.count(stage=stage) == count + 1, f"{stage} timed in the pool should be recorded here"
+    app_module.reset_process_pool()
+
+
+def test_scoring_trace_is_off_by_default(capsys):
+    components = [{'name': 'Hero', 'dominant_side': 'left', 'min_boxes': 1, 'max_boxes': 10,
+                   'min_text_blocks': 0, 'max_text_blocks': 5}]
+    layout_features = {'bounding_boxes': [{}] * 4, 'text_blocks': [], 'spacing_patterns': [], 'element_ratios': [1.0] * 4}
+
+    find_best_match(components, layout_features, 'left')
+    assert capsys.readouterr().out == '', "Matching should not print unless tracing is enabled"
+
+    find_best_match(components, layout_features, 'left', trace=True)
+    assert "Scoring 'Hero'" in capsys.readouterr().out
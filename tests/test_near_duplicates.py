@@ -0,0 +1,92 @@
+# tests/test_near_duplicates.py
+import sys
+import os
+import io
+import random
+
+import cv2
+import numpy as np
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+import app as app_module
+from app import app
+from benchmarks.synthetic import encode_png, render_layout
+from near_duplicates import HASH_BITS, BKTree, NearDuplicateIndex, dhash, hamming
+
+
+def reexports(img):
+    """The same frame nudged one pixel and recompressed as a low-quality JPEG."""
+    nudged = np.roll(img, 1, axis=1)
+    nudged[:, 0] = img[:, 0]
+    jpeg = cv2.imdecode(cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, 40])[1], cv2.IMREAD_COLOR)
+    return nudged, jpeg
+
+
+def test_dhash_separates_layouts_but_not_reexports():
+    max_distance = NearDuplicateIndex().max_distance
+    for kind in ('hero', 'grid', 'cta'):
+        img = render_layout(kind, with_text=False)
+        for copy in reexports(img):
+            assert hamming(dhash(img), dhash(copy)) <= 2, f"{kind} re-export should hash alike"
+        for elements in (3, 5, 9):
+            other = render_layout(kind, elements=elements, with_text=False)
+            if kind != 'cta' or elements < 4:  # cta draws at most 4 buttons
+                assert hamming(dhash(img), dhash(other)) > max_distance, f"{kind} with {elements} elements"
+    assert dhash(render_layout('hero', with_text=False)) < 2 ** HASH_BITS
+
+
+def test_bk_tree_finds_what_a_linear_scan_finds():
+    rng = random.Random(0)
+    base = rng.getrandbits(HASH_BITS)
+    values = [base ^ sum(1 << rng.randrange(HASH_BITS) for _ in range(rng.randrange(40))) for _ in range(300)]
+    tree = BKTree()
+    for item, value in enumerate(values):
+        tree.add(value, item)
+
+    for query in values[:20] + [rng.getrandbits(HASH_BITS)]:
+        expected = sorted((hamming(query, value), item) for item, value in enumerate(values)
+                          if hamming(query, value) <= 12)
+        assert sorted(tree.find(query, 12)) == expected
+
+
+def test_index_matches_scope_and_size_and_evicts_oldest():
+    index = NearDuplicateIndex(max_entries=3, max_distance=4)
+    index.add(0b1111, 'v1:top_k=None', (600, 1440), 'hero')
+    assert index.find(0b0111, 'v1:top_k=None', (600, 1440)) == ('hero', 1)
+    assert index.find(0b0111, 'v2:top_k=None', (600, 1440)) is None, "A catalog change invalidates reuse"
+    assert index.find(0b0111, 'v1:top_k=None', (601, 1440)) is None, "Layout features are in pixels"
+
+    for value in range(1, 8):
+        index.add(value << 8, 'v1:top_k=None', (600, 1440), value)
+    assert len(index) == 3 and index.stats['evictions'] == 5
+    assert index.find(0b1111, 'v1:top_k=None', (600, 1440)) is None
+    assert index.find(7 << 8, 'v1:top_k=None', (600, 1440)) == (7, 0)
+    assert index._tree.size <= 2 * len(index), "Evicted nodes are dropped by rebuilding"
+
+
+def post(img, ext='.png', query=''):
+    data = encode_png(img) if ext == '.png' else cv2.imencode(ext, img)[1].tobytes()
+    return app.test_client().post(f"/upload{query}", data={'file': (io.BytesIO(data), f"frame{ext}")},
+                                  content_type='multipart/form-data').get_json()
+
+
+def test_upload_reuses_analysis_of_near_duplicates():
+    app_module.analysis_cache.clear()
+    app_module.near_duplicates.clear()
+    img = render_layout('grid', elements=6, with_text=False)
+    nudged, _ = reexports(img)
+
+    first = post(img, query='?profile=full')
+    assert not first['cached'] and not first['reused']
+
+    for copy, ext in ((nudged, '.png'), (img, '.jpg')):
+        again = post(copy, ext, query='?profile=full')
+        assert again['reused'] and not again['cached'] and again['reused_distance'] <= 2
+        assert again['analysis'] == first['analysis']
+
+    assert not post(render_layout('grid', elements=9, with_text=False))['reused']
+    assert not post(img, query='?top_k=3')['reused'], "Different options are analysed separately"
+    assert post(img, '.jpg')['cached'], "Reused results are cached under the new bytes too"
+    assert app_module.near_duplicates.stats['hits'] == 2
@@ -0,0 +1,163 @@
+# tests/test_ocr_backends.py
+import sys
+import os
+import shlex
+import shutil
+import threading
+import time
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+import cv2
+import numpy as np
+import pytest
+
+from app import analyze_image
+from ocr_backends import (OCR_BACKENDS, TESSERACT_CONFIG, TESSERACT_WHITELIST, OcrBackend, RecognizerPool,
+                          find_text_regions)
+
+
+class FakeBackend(OcrBackend):
+    """Recognises one word at the top-left of whatever it is given."""
+
+    name = 'fake'
+
+    def __init__(self):
+        self.calls = []
+
+    def recognize(self, img):
+        self.calls.append(img.shape)
+        return {
+            'level': [1, 5], 'block_num': [0, 1], 'conf': [-1, 91], 'text': ['', 'Hello'],
+            'left': [0, 2], 'top': [0, 3], 'width': [img.shape[1], 40], 'height': [img.shape[0], 12],
+        }
+
+
+class InkBackend(OcrBackend):
+    """Recognises each horizontal band of dark pixels as one word boxed around its ink."""
+
+    name = 'ink'
+
+    def __init__(self):
+        self.calls = []
+
+    def recognize(self, img):
+        self.calls.append(img.shape)
+        ink = img < 128
+        rows = np.flatnonzero(ink.any(axis=1))
+        bands = np.split(rows, np.flatnonzero(np.diff(rows) > 1) + 1) if len(rows) else []
+        ocr_data = {key: [] for key in ('level', 'block_num', 'conf', 'text', 'left', 'top', 'width', 'height')}
+        for i, band in enumerate(bands):
+            cols = np.flatnonzero(ink[band[0]:band[-1] + 1].any(axis=0))
+            for key, value in (('level', 5), ('block_num', 1), ('conf', 90), ('text', f"word{i}"),
+                               ('left', int(cols[0])), ('top', int(band[0])),
+                               ('width', int(cols[-1] - cols[0] + 1)), ('height', int(band[-1] - band[0] + 1))):
+                ocr_data[key].append(value)
+        return ocr_data
+
+
+def ink_box(gray, region):
+    x, y, w, h = region
+    rows, cols = np.nonzero(gray[y:y + h, x:x + w] < 128)
+    return x + int(cols.min()), y + int(rows.min())
+
+
+def make_text_image():
+    img = np.full((300, 600, 3), 255, np.uint8)
+    cv2.putText(img, 'Hello world', (50, 100), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 0, 0), 2)
+    cv2.putText(img, 'Get started', (300, 220), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 0), 2)
+    return img
+
+
+def test_analyze_image_uses_pluggable_backend():
+    backend = FakeBackend()
+    features = analyze_image(make_text_image(), ocr_backend=backend, ocr_regions=False)
+    assert backend.calls == [(300, 600)], "Full-frame mode should OCR the whole (gray) image once"
+    assert features['text_blocks'] == [
+        {'text': 'Hello', 'confidence': 91, 'position': {'x': 2, 'y': 3, 'w': 40, 'h': 12}}
+    ]
+
+
+def test_region_mode_ocrs_candidate_regions_in_frame_coordinates():
+    img = make_text_image()
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    thresh = cv2.adaptiveThreshold(cv2.GaussianBlur(gray, (5, 5), 0), 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                   cv2.THRESH_BINARY_INV, 11, 2)
+    regions = find_text_regions(thresh)
+    # 'Hello' and 'world' stay apart; the padded rects of 'Get' and 'started' overlap and merge
+    assert len(regions) == 3, f"Expected one region per word or overlapping word group, got {regions}"
+
+    backend = InkBackend()
+    features = analyze_image(img, ocr_backend=backend, ocr_regions=True)
+    assert len(backend.calls) == 1, "Region mode should OCR all candidate regions in one call"
+    assert backend.calls[0][0] < 300 and backend.calls[0][1] < 600, "Only the regions should be recognised"
+    positions = [(b['position']['x'], b['position']['y']) for b in features['text_blocks']]
+    assert positions == [ink_box(gray, region) for region in regions], "Positions should map back into the full frame"
+
+
+def test_overlapping_regions_are_merged():
+    thresh = np.zeros((200, 400), np.uint8)
+    thresh[40:60, 20:120] = 255
+    thresh[64:84, 60:200] = 255  # padded rect overlaps the first
+    thresh[150:170, 20:120] = 255
+    regions = find_text_regions(thresh)
+    assert len(regions) == 2, f"Overlapping padded rects should merge, got {regions}"
+    x, y, w, h = regions[0]
+    assert x <= 20 and y <= 40 and x + w >= 200 and y + h >= 84, "The merged region covers both blobs"
+
+
+@pytest.mark.parametrize('name', sorted(OCR_BACKENDS))
+def test_region_mode_reads_what_full_frame_reads(name):
+    if name == 'tesseract' and shutil.which('tesseract') is None:
+        pytest.skip('tesseract is not installed')
+    try:
+        backend = OCR_BACKENDS[name]()
+    except (ImportError, RuntimeError) as e:
+        pytest.skip(f"{name} backend unavailable: {e}")
+
+    img = make_text_image()
+    full = analyze_image(img, ocr_backend=backend, ocr_regions=False)['text_blocks']
+    regions = analyze_image(img, ocr_backend=backend, ocr_regions=True)['text_blocks']
+    assert sorted(b['text'] for b in regions) == sorted(b['text'] for b in full)
+    for region_block, full_block in zip(sorted(regions, key=lambda b: b['text']), sorted(full, key=lambda b: b['text'])):
+        assert abs(region_block['position']['x'] - full_block['position']['x']) <= 3
+        assert abs(region_block['position']['y'] - full_block['position']['y']) <= 3
+
+
+def test_tesseract_config_survives_shell_splitting():
+    # pytesseract runs the config through shlex.split before invoking tesseract
+    args = shlex.split(TESSERACT_CONFIG)
+    assert args[:4] == ['--oem', '3', '--psm', '6']
+    assert args[4:] == ['-c', f"tessedit_char_whitelist={TESSERACT_WHITELIST}"]
+    assert '"' in TESSERACT_WHITELIST and "'" in TESSERACT_WHITELIST
+
+
+def test_recognizer_pool_is_shared_and_bounded_across_threads():
+    created = []
+    pool = RecognizerPool(lambda: created.append(object()) or created[-1], max_size=2)
+    in_use = []
+    peak = [0]
+    lock = threading.Lock()
+
+    def request():
+        # Like a threaded WSGI server: every request runs on a fresh thread
+        with pool.checkout() as recognizer:
+            with lock:
+                in_use.append(recognizer)
+                peak[0] = max(peak[0], len(in_use))
+            time.sleep(0.01)
+            with lock:
+                in_use.remove(recognizer)
+
+    for _ in range(3):
+        threads = [threading.Thread(target=request) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert len(created) == 2 and len(pool) == 2, "Recognizers should be reused across request threads"
+    assert peak[0] == 2
+
+    with pool.checkout() as recognizer:
+        assert recognizer in created
@@ -0,0 +1,100 @@
+# tests/test_payloads.py
+import sys
+import os
+import gzip
+import io
+import json
+
+import cv2
+import numpy as np
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+import app as app_module
+from app import app
+from benchmarks.synthetic import encode_png, render_layout
+from payloads import RATIO_BIN_EDGES, compact_analysis, select_fields, summarize
+
+FULL_ANALYSIS = {
+    'significant_box_count': 4,
+    'layout_features': {
+        'left_box_count': 3,
+        'right_box_count': 1,
+        'text_block_count': 0,
+        'spacing_patterns': {'vertical': [10.0, 12.0, 300.0], 'horizontal': [50.0, 50.0, 50.0]},
+        'element_ratios': [0.3, 1.0, 1.1, 7.5],
+        'guessed_dominant_side': 'left',
+    },
+    'componentName': 'Hero',
+    'componentLink': '#hero',
+}
+
+
+def busy_png(rows=12, columns=30):
+    """A screenshot with rows x columns separate boxes."""
+    img = np.full((rows * 40 + 20, columns * 40 + 20, 3), 255, np.uint8)
+    for row in range(rows):
+        for column in range(columns):
+            x, y = 20 + column * 40, 20 + row * 40
+            cv2.rectangle(img, (x, y), (x + 26, y + 26), (30, 30, 30), -1)
+    return encode_png(img)
+
+
+def upload(query='', headers=None, png=None):
+    png = png or encode_png(render_layout('grid', elements=9, with_text=False))
+    return app.test_client().post(f"/upload{query}", data={'file': (io.BytesIO(png), 'grid.png')},
+                                  content_type='multipart/form-data', headers=headers or {})
+
+
+def test_summary_statistics_and_histogram():
+    summary = summarize([0.3, 1.0, 1.1, 7.5], RATIO_BIN_EDGES)
+    assert summary['count'] == 4 and summary['min'] == 0.3 and summary['max'] == 7.5
+    assert summary['histogram']['counts'] == [0, 1, 0, 2, 0, 0, 0, 1], "7.5 belongs in the open last bin"
+    assert summarize([], RATIO_BIN_EDGES)['mean'] is None
+
+
+def test_compact_profile_drops_per_contour_lists():
+    compact = compact_analysis(FULL_ANALYSIS)
+    layout = compact['layout_features']
+    assert 'element_ratios' not in layout and 'spacing_patterns' not in layout
+    assert layout['element_ratio_summary']['count'] == 4
+    assert layout['spacing_summary']['horizontal']['median'] == 50.0
+    assert compact['componentName'] == 'Hero' and FULL_ANALYSIS['layout_features']['element_ratios']
+
+
+def test_field_selection_keeps_dotted_paths():
+    selected = select_fields(FULL_ANALYSIS, ['componentName', 'layout_features.guessed_dominant_side', 'missing'])
+    assert selected == {'componentName': 'Hero', 'layout_features': {'guessed_dominant_side': 'left'}}
+    assert select_fields(FULL_ANALYSIS, ['layout_features', 'layout_features.left_box_count']) == \
+        {'layout_features': FULL_ANALYSIS['layout_features']}
+
+
+def test_upload_profiles_fields_and_gzip():
+    app_module.analysis_cache.clear()
+    compact = upload().get_json()['analysis']
+    full = upload('?profile=full').get_json()['analysis']
+    assert 'element_ratio_summary' in compact['layout_features']
+    assert full['layout_features']['element_ratios'], "The full profile keeps the raw lists"
+
+    # Compact payloads stay the same size however many contours there are
+    busy = upload(png=busy_png()).get_json()['analysis']
+    busy_full = upload('?profile=full', png=busy_png()).get_json()['analysis']
+    assert busy['significant_box_count'] == 360
+    assert abs(len(json.dumps(busy)) - len(json.dumps(compact))) < 200
+    assert len(json.dumps(busy)) * 5 < len(json.dumps(busy_full))
+
+    selected = upload('?fields=componentName,componentLink').get_json()
+    assert set(selected['analysis']) == {'componentName', 'componentLink'} and selected['cached']
+    assert upload('?profile=everything').status_code == 400
+
+    response = upload('?profile=full', headers={'Accept-Encoding': 'gzip'}, png=busy_png())
+    assert response.headers.get('Content-Encoding') == 'gzip' and 'Accept-Encoding' in response.headers['Vary']
+    assert json.loads(gzip.decompress(response.data))['analysis'] == busy_full
+    assert 'Content-Encoding' not in upload(headers={'Accept-Encoding': 'gzip'}).headers, "Small bodies stay plain"
+
+    response = upload(headers={'Accept': 'application/msgpack, application/json;q=0.5'})
+    if app_module.negotiate_mimetype.__globals__['msgpack'] is None:
+        assert response.mimetype == 'application/json', "Without msgpack installed JSON is served"
+    else:
+        assert response.mimetype == 'application/msgpack'
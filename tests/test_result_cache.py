@@ -0,0 +1,71 @@
+# tests/test_result_cache.py
+import sys
+import os
+import time
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from result_cache import AnalysisCache, cache_key
+
+
+def test_cache_key_depends_on_bytes_and_catalog_version():
+    key = cache_key(b'image-bytes', 'v1')
+    assert key == cache_key(b'image-bytes', 'v1'), "Same bytes and catalog should give the same key"
+    assert key != cache_key(b'other-bytes', 'v1'), "Different bytes should give a different key"
+    assert key != cache_key(b'image-bytes', 'v2'), "A new catalog version should invalidate the key"
+
+
+def test_memory_tier_lru_eviction():
+    cache = AnalysisCache(max_entries=2)
+    cache.put('a', {'componentName': 'A'})
+    cache.put('b', {'componentName': 'B'})
+    assert cache.get('a') == {'componentName': 'A'}  # 'a' is now most recently used
+    cache.put('c', {'componentName': 'C'})  # evicts 'b'
+
+    assert cache.get('b') is None, "Least recently used entry should have been evicted"
+    assert cache.get('c') == {'componentName': 'C'}
+    stats = cache.snapshot()
+    assert stats['hits'] == 2 and stats['misses'] == 1 and stats['evictions'] == 1, f"Unexpected stats {stats}"
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    cache = AnalysisCache(max_entries=4, disk_dir=str(tmp_path))
+    cache.put('key', {'componentName': 'Hero'})
+
+    # A fresh cache over the same directory simulates a process restart
+    restarted = AnalysisCache(max_entries=4, disk_dir=str(tmp_path))
+    assert restarted.get('key') == {'componentName': 'Hero'}
+    assert restarted.snapshot()['disk_hits'] == 1
+    assert len(restarted) == 1, "Disk hits should be promoted into the memory tier"
+
+
+def test_disk_tier_is_pruned_least_recently_used_first(tmp_path):
+    cache = AnalysisCache(max_entries=0, disk_dir=str(tmp_path), disk_max_entries=2)
+    cache.put('old', {'componentName': 'Old'})
+    cache.put('used', {'componentName': 'Used'})
+    past = time.time() - 60
+    for name in os.listdir(tmp_path):
+        os.utime(tmp_path / name, (past, past))
+    assert cache.get('used') == {'componentName': 'Used'}  # refreshes its file
+    cache.put('new', {'componentName': 'New'})
+
+    assert len(os.listdir(tmp_path)) == 2 and cache.snapshot()['disk_evictions'] == 1
+    assert cache.get('old') is None, "The least recently used entry should be pruned"
+    assert cache.get('used') and cache.get('new')
+
+    AnalysisCache(disk_dir=str(tmp_path), disk_max_bytes=0)
+    assert os.listdir(tmp_path) == [], "Caps are enforced on start-up too"
+
+
+def test_disk_pruning_does_not_list_the_directory_per_put(tmp_path, monkeypatch):
+    cache = AnalysisCache(max_entries=0, disk_dir=str(tmp_path), disk_max_entries=3)
+    listings = []
+    real_listdir = os.listdir
+    monkeypatch.setattr(os, 'listdir', lambda path: listings.append(path) or real_listdir(path))
+    for i in range(10):
+        cache.put(f"key-{i}", {'componentName': str(i)})
+
+    assert listings == [], "Puts should prune from the running totals"
+    assert len(real_listdir(tmp_path)) == 3 and cache.snapshot()['disk_evictions'] == 7
+    assert cache.get('key-9') and cache.get('key-6') is None
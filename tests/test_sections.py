@@ -0,0 +1,38 @@
+# tests/test_sections.py
+import sys
+import os
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+import numpy as np
+
+from benchmarks.synthetic import render_layout
+from sections import cap_sections, find_section_bounds
+
+
+def test_whitespace_bands_split_a_landing_page():
+    for scale in (1, 2):
+        parts = [render_layout(kind, scale=scale) for kind in ('hero', 'grid', 'cta')]
+        bounds = find_section_bounds(np.vstack(parts))
+        assert len(bounds) == 3, f"Expected hero, grid and CTA sections at {scale}x, got {bounds}"
+        assert bounds[0][0] == 0 and bounds[-1][1] == sum(p.shape[0] for p in parts)
+
+
+def test_background_change_splits_without_a_whitespace_gap():
+    cta = render_layout('cta')
+    hero = render_layout('hero')
+    hero[hero == 255] = 230  # grey band directly below a white one
+    bounds = find_section_bounds(np.vstack([cta, hero]))
+    assert bounds == [(0, cta.shape[0]), (cta.shape[0], cta.shape[0] + hero.shape[0])]
+
+
+def test_single_section_is_left_whole():
+    img = render_layout('grid', elements=9)
+    assert find_section_bounds(img) == [(0, img.shape[0])]
+
+
+def test_sections_past_the_cap_are_merged_into_the_last():
+    bounds = [(0, 100), (100, 250), (250, 400), (400, 480)]
+    assert cap_sections(bounds, 2) == [(0, 100), (100, 480)]
+    assert cap_sections(bounds, 4) == bounds
@@ -0,0 +1,106 @@
+# tests/test_serve.py
+import sys
+import os
+import json
+import socket
+import subprocess
+import time
+import urllib.error
+import urllib.request
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+import app as app_module
+from app import app
+from ocr_backends import OcrBackend
+
+
+class BrokenBackend(OcrBackend):
+    def recognize(self, img):
+        raise RuntimeError('tesseract is not installed')
+
+
+def test_ready_reports_warm_up_checks(monkeypatch, no_text_backend):
+    monkeypatch.setattr(app_module, 'readiness', {'ready': False, 'checks': {}, 'checked_at': None})
+    client = app.test_client()
+
+    monkeypatch.setattr(app_module, 'get_ocr_backend', lambda name: BrokenBackend())
+    assert not app_module.warm_up()
+    response = client.get('/ready')
+    body = response.get_json()
+    assert response.status_code == 503 and body['status'] == 'unavailable'
+    assert body['checks']['opencv']['ok'] and body['checks']['catalog']['ok']
+    assert 'tesseract' in body['checks']['ocr']['error']
+
+    monkeypatch.setattr(app_module, 'get_ocr_backend', lambda name: no_text_backend)
+    assert app_module.warm_up()
+    response = client.get('/ready')
+    assert response.status_code == 200 and response.get_json()['status'] == 'ready'
+
+
+def test_importing_app_does_not_load_ocr_or_cli_modules():
+    code = ("import sys, app; "
+            "print(sorted(m for m in ('pytesseract', 'PIL', 'argparse', 'benchmarks') if m in sys.modules))")
+    output = subprocess.run([sys.executable, '-c', code], cwd=project_root, capture_output=True, text=True,
+                            check=True).stdout
+    assert output.strip().splitlines()[-1] == '[]', f"Tooling modules imported eagerly: {output}"
+
+
+def test_importing_app_starts_no_catalog_watcher():
+    code = ("import threading, app; "
+            "print(sorted(t.name for t in threading.enumerate() if t.name != 'MainThread'))")
+    output = subprocess.run([sys.executable, '-c', code], cwd=project_root, capture_output=True, text=True,
+                            check=True).stdout
+    assert output.strip().splitlines()[-1] == '[]', f"Threads started at import would not survive a fork: {output}"
+
+    client = app.test_client()
+    client.get('/')
+    assert app_module.catalog_store._watcher_pid == os.getpid(), "The first request starts this process's watcher"
+
+
+def get_json(url):
+    try:
+        with urllib.request.urlopen(url, timeout=5) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_serve_forks_preloaded_workers():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+
+    server = subprocess.Popen([sys.executable, 'serve.py', '--port', str(port), '--workers', '2'],
+                              cwd=project_root, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1) as response:
+                    assert response.status == 200
+                break
+            except OSError:
+                assert server.poll() is None, server.stdout.read()
+                assert time.monotonic() < deadline, 'Server did not start'
+                time.sleep(0.2)
+
+        pids = set()
+        for _ in range(20):
+            status, body = get_json(f"http://127.0.0.1:{port}/ready")
+            # 503 is expected where tesseract is not installed; checks are reported either way
+            assert status in (200, 503) and body['checks']['catalog']['ok'], body
+            pids.add(body['pid'])
+        assert server.pid not in pids, "Requests should be served by forked workers, not the parent"
+
+        workers = set()
+        for _ in range(20):
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+                body = response.read().decode()
+            workers.update(line.split('worker="')[1].split('"')[0] for line in body.splitlines()
+                           if line.startswith('relume_catalog_components'))
+        assert workers and workers <= {'0', '1'}, f"Each worker's series should carry its slot: {workers}"
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
@@ -0,0 +1,172 @@
+# tests/test_upload.py
+import sys
+import os
+import io
+import json
+import subprocess
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+import cv2
+import numpy as np
+
+import app as app_module
+import pool_worker
+from benchmarks.synthetic import encode_png, render_layout
+from app import app, decode_image_bytes, prune_upload_folder
+from catalog import load_catalog
+
+
+def make_png_bytes(width=800, height=400, columns=10):
+    """Synthetic layout: a row of dark vertical bars on a white page."""
+    img = np.full((height, width, 3), 255, np.uint8)
+    for i in range(columns):
+        cv2.rectangle(img, (20 + i * 35, 50), (45 + i * 35, 300), (0, 0, 0), -1)
+    ok, buf = cv2.imencode('.png', img)
+    assert ok
+    return buf.tobytes()
+
+
+def test_decode_image_bytes():
+    img = decode_image_bytes(make_png_bytes())
+    assert img is not None and img.shape == (400, 800, 3)
+    assert decode_image_bytes(b'') is None
+    assert decode_image_bytes(b'not an image') is None
+
+
+def test_upload_decodes_in_memory_without_touching_disk(tmp_path, monkeypatch):
+    upload_folder = tmp_path / 'uploads'
+    monkeypatch.setitem(app.config, 'UPLOAD_FOLDER', str(upload_folder))
+    monkeypatch.setitem(app.config, 'PERSIST_UPLOADS', False)
+    app_module.analysis_cache.clear()
+    app_module.near_duplicates.clear()
+
+    client = app.test_client()
+    response = client.post('/upload', data={'file': (io.BytesIO(make_png_bytes()), 'frame.png')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200
+    assert response.get_json()['analysis']['significant_box_count'] == 10
+    assert not upload_folder.exists(), "Uploads should not be written unless PERSIST_UPLOADS is on"
+
+    large = os.urandom(2 * 1024 * 1024)
+    with app.test_request_context('/upload', method='POST', data={'file': (io.BytesIO(large), 'big.png')},
+                                  content_type='multipart/form-data'):
+        stream = app_module.request.files['file'].stream
+        assert isinstance(stream, io.BytesIO), "Large parts must not be spooled to a temporary file"
+
+
+def test_only_decoded_uploads_are_persisted(tmp_path, monkeypatch):
+    upload_folder = tmp_path / 'uploads'
+    monkeypatch.setitem(app.config, 'UPLOAD_FOLDER', str(upload_folder))
+    monkeypatch.setitem(app.config, 'PERSIST_UPLOADS', True)
+    app_module.analysis_cache.clear()
+
+    client = app.test_client()
+    for data, name in ((b'not an image', 'junk.png'), (make_png_bytes()[:200], 'truncated.png')):
+        response = client.post('/upload', data={'file': (io.BytesIO(data), name)}, content_type='multipart/form-data')
+        assert response.status_code == 415
+    assert not upload_folder.exists(), "Refused uploads should not be written"
+
+    response = client.post('/upload', data={'file': (io.BytesIO(make_png_bytes()), 'frame.png')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200
+    assert [p.name for p in upload_folder.iterdir()] == ['frame.png']
+
+
+def test_cache_keys_change_with_analysis_settings(monkeypatch):
+    version = app_module.matcher_version()
+    assert app_module.matcher_version() == version
+    for name, value in (('OCR_REGIONS', not app.config['OCR_REGIONS']), ('ANALYSIS_WORKING_WIDTH', 720),
+                        ('MAX_IMAGE_PIXELS', 1_000_000), ('OVERSIZE_IMAGES', 'reject'), ('OCR_BACKEND', 'null')):
+        with monkeypatch.context() as m:
+            m.setitem(app.config, name, value)
+            assert app_module.matcher_version() != version, f"{name} should change the cache version"
+
+
+def test_persisted_uploads_respect_retention_cap(tmp_path):
+    for i in range(5):
+        path = tmp_path / f"upload-{i}.png"
+        path.write_bytes(b'x' * 100)
+        os.utime(path, (i, i))  # upload-0 is the oldest
+
+    prune_upload_folder(str(tmp_path), max_files=3, max_bytes=10_000)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['upload-2.png', 'upload-3.png', 'upload-4.png']
+
+    prune_upload_folder(str(tmp_path), max_files=10, max_bytes=150)
+    assert [p.name for p in tmp_path.iterdir()] == ['upload-4.png']
+
+
+def test_batch_upload_returns_results_in_order_with_per_file_errors(monkeypatch):
+    monkeypatch.setitem(app.config, 'BATCH_WORKERS', 2)
+    app_module.analysis_cache.clear()
+
+    client = app.test_client()
+    files = [
+        (io.BytesIO(make_png_bytes(columns=10)), 'ten.png'),
+        (io.BytesIO(b'not an image'), 'broken.png'),
+        (io.BytesIO(make_png_bytes(columns=4)), 'four.png'),
+    ]
+    response = client.post('/upload/batch', data={'files': files}, content_type='multipart/form-data')
+    assert response.status_code == 200
+
+    results = response.get_json()['results']
+    assert [r['filename'] for r in results] == ['ten.png', 'broken.png', 'four.png']
+    assert results[0]['analysis']['significant_box_count'] == 10
+    assert 'error' in results[1], "Undecodable file should get a per-file error"
+    assert results[2]['analysis']['significant_box_count'] == 4
+    assert app_module.get_process_pool()._mp_context.get_start_method() == 'forkserver', \
+        "Workers must not be forked from the multi-threaded server process"
+    app_module.reset_process_pool()
+
+
+def test_pool_workers_load_the_matcher_they_are_told_to(tmp_path):
+    code = "import sys, pool_worker; print(sorted(m for m in ('app', 'flask', 'jobs') if m in sys.modules))"
+    output = subprocess.run([sys.executable, '-c', code], cwd=project_root, capture_output=True, text=True,
+                            check=True).stdout
+    assert output.strip().splitlines()[-1] == '[]', f"Pool workers should not import the app: {output}"
+
+    path = tmp_path / 'catalog.json'
+    path.write_text(json.dumps([{'name': 'Hero'}]))
+    first = load_catalog(str(path)).version
+    catalog, version = pool_worker.load_matcher('catalog', str(path), first)
+    assert version == first and pool_worker.load_matcher('catalog', str(path), first)[0] is catalog
+
+    path.write_text(json.dumps([{'name': 'Hero'}, {'name': 'Footer'}]))
+    second = load_catalog(str(path)).version
+    catalog, version = pool_worker.load_matcher('catalog', str(path), second)
+    assert version == second and len(catalog) == 2, "A new version is loaded when a job asks for it"
+
+    path.write_text('{"truncated')
+    assert pool_worker.load_matcher('catalog', str(path), 'newer')[1] == second, "A broken file keeps the last one"
+
+
+def test_page_upload_streams_one_result_per_section(monkeypatch):
+    monkeypatch.setitem(app.config, 'BATCH_WORKERS', 2)
+    page = np.vstack([render_layout(kind, with_text=False) for kind in ('hero', 'grid', 'cta')])
+
+    client = app.test_client()
+    response = client.post('/upload/page', data={'file': (io.BytesIO(encode_png(page)), 'landing.png')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert lines[0]['type'] == 'page' and lines[0]['section_count'] == 3
+    sections = sorted((line for line in lines if line['type'] == 'section'), key=lambda s: s['index'])
+    assert [s['index'] for s in sections] == [0, 1, 2]
+    assert all('analysis' in s for s in sections)
+    assert sum(s['bounds']['h'] for s in sections) == page.shape[0], "Sections should tile the page"
+    assert lines[-1]['type'] == 'done'
+    response.close()
+
+    monkeypatch.setitem(app.config, 'PAGE_MAX_SECTIONS', 2)
+    response = client.post('/upload/page', data={'file': (io.BytesIO(encode_png(page)), 'landing.png')},
+                           content_type='multipart/form-data')
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert lines[0]['section_count'] == 2 and lines[0]['detected_section_count'] == 3
+    sections = [line for line in lines if line['type'] == 'section']
+    assert sum(s['bounds']['h'] for s in sections) == page.shape[0], "Sections past the cap join the last one"
+    response.close()
+    assert app_module.memory_budget.in_flight == 0
+    app_module.reset_process_pool()
@@ -0,0 +1,70 @@
+# tests/test_vectors.py
+import sys
+import os
+
+import cv2
+import numpy as np
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from app import analyze_image, decode_image_bytes
+from benchmarks.synthetic import LAYOUT_KINDS, render_layout
+from vectors import (VECTOR_DIM, VectorIndex, build_vector_index, layout_vector, load_vector_index,
+                     save_vector_index)
+
+
+def vector_for(img, ocr_backend):
+    features = analyze_image(img, ocr_backend=ocr_backend, ocr_regions=False)
+    return layout_vector(features, img.shape[1], img.shape[0])
+
+
+def test_layout_vector_is_fixed_length_and_scale_invariant(no_text_backend):
+    hero_1x = vector_for(render_layout('hero', scale=1, with_text=False), no_text_backend)
+    hero_2x = vector_for(render_layout('hero', scale=2, with_text=False), no_text_backend)
+    grid = vector_for(render_layout('grid', scale=1, with_text=False), no_text_backend)
+
+    assert hero_1x.shape == (VECTOR_DIM,) and hero_1x.dtype == np.float32
+    assert abs(np.linalg.norm(hero_1x) - 1) < 1e-5
+    assert float(hero_1x @ hero_2x) > 0.95, "A 2x export should map to nearly the same vector"
+    assert float(hero_1x @ grid) < float(hero_1x @ hero_2x)
+
+
+def test_vector_index_round_trip_and_top_k(tmp_path, no_text_backend):
+    screenshots = tmp_path / 'screenshots'
+    screenshots.mkdir()
+    components = [{'id': kind, 'name': kind.title(), 'link': f"#{kind}"} for kind in LAYOUT_KINDS]
+    components.append({'id': 'missing', 'name': 'No screenshot'})
+    components.append({'name': 'No id'})  # must not pick up every top-level screenshot
+    for kind in LAYOUT_KINDS:
+        cv2.imwrite(str(screenshots / f"{kind}.png"), render_layout(kind, elements=6, with_text=False))
+
+    def analyze(img):
+        return analyze_image(img, ocr_backend=no_text_backend, ocr_regions=False)
+
+    index = build_vector_index(components, str(screenshots), analyze, decode_image_bytes)
+    assert [c['id'] for c in index.components] == list(LAYOUT_KINDS), "Components without screenshots are skipped"
+
+    path = str(tmp_path / 'relume_vectors')
+    save_vector_index(index, path)
+    loaded = load_vector_index(path)
+    assert isinstance(loaded.vectors.base, np.memmap) and loaded.version == index.version
+
+    for kind in LAYOUT_KINDS:
+        # A different variant of the same layout should still find its reference first
+        query = vector_for(render_layout(kind, elements=5, seed=3, with_text=False), no_text_backend)
+        results = loaded.search(query, k=2)
+        assert len(results) == 2 and results[0][0]['id'] == kind, f"{kind}: got {results}"
+        assert results[0][1] >= results[1][1]
+    assert loaded.search(query, k=3, min_similarity=1.01) == []
+
+
+def test_vector_search_returns_exact_top_k():
+    rng = np.random.default_rng(1)
+    vectors = rng.standard_normal((5000, VECTOR_DIM)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    index = VectorIndex([{'id': str(i)} for i in range(5000)], vectors)
+    query = vectors[42]
+
+    expected = np.argsort(-(vectors @ query), kind='stable')[:10]
+    assert [int(c['id']) for c, _ in index.search(query, k=10)] == expected.tolist()
@@ -0,0 +1,237 @@
+"""Fixed-length layout vectors and nearest-neighbour matching against reference screenshots.
+
+Each catalog component gets a vector computed from one or more reference
+screenshots with the regular analyze_image pipeline; uploads are matched by
+cosine similarity against those vectors. The index is a directory holding
+`vectors.npy` (memory-mapped on load) and `index.json` with the component
+dicts, and is built with:
+
+    python vectors.py build relume_data.json screenshots/ relume_vectors
+
+Screenshots are looked up per component id as `screenshots/<id>.<ext>` and
+`screenshots/<id>/*.<ext>`; several screenshots of a component are averaged.
+"""
+import hashlib
+import json
+import os
+import shutil
+import sys
+
+import numpy as np
+
+from catalog import swap_directory
+from geometry import BOX_AREA, BOX_H, BOX_W, BOX_X, BOX_Y
+
+# Bump when layout_vector changes; indexes built with another version are rejected
+FEATURE_VERSION = 1
+GRID_SIZE = 4
+VECTOR_DIM = 2 * GRID_SIZE * GRID_SIZE + 16
+VECTOR_INDEX_VECTORS = 'vectors.npy'
+VECTOR_INDEX_META = 'index.json'
+SCREENSHOT_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp')
+
+
+def _grid_coverage(rects, width, height):
+    """Fraction of each cell of a GRID_SIZE x GRID_SIZE grid covered by (x, y, w, h) rects."""
+    if len(rects) == 0:
+        return np.zeros(GRID_SIZE * GRID_SIZE)
+    rects = np.asarray(rects, dtype=np.float64)
+    edges_x = np.linspace(0, width, GRID_SIZE + 1)
+    edges_y = np.linspace(0, height, GRID_SIZE + 1)
+    # Overlap of every rect with every column / row band: N x GRID_SIZE each
+    overlap_x = np.clip(np.minimum(rects[:, 0:1] + rects[:, 2:3], edges_x[1:])
+                        - np.maximum(rects[:, 0:1], edges_x[:-1]), 0, None)
+    overlap_y = np.clip(np.minimum(rects[:, 1:2] + rects[:, 3:4], edges_y[1:])
+                        - np.maximum(rects[:, 1:2], edges_y[:-1]), 0, None)
+    covered = np.einsum('ni,nj->ij', overlap_y, overlap_x)
+    cell_area = (width / GRID_SIZE) * (height / GRID_SIZE)
+    return np.sqrt(np.minimum(covered / cell_area, 1.0)).ravel()
+
+
+def _spacing_regularity(spacing):
+    """Share of consecutive centre gaps within 10 px of each other (the rule scorer's grid test)."""
+    spacing = np.asarray(spacing, dtype=np.float64)
+    if spacing.size < 2:
+        return 0.0
+    return float(np.mean(np.abs(np.diff(spacing)) < 10))
+
+
+def _unit(vector):
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+def layout_vector(layout_features, width, height):
+    """Fixed-length (VECTOR_DIM) unit vector describing an analysed layout.
+
+    Made of three equally weighted parts: box coverage on a coarse grid,
+    text coverage on the same grid, and scale-free summary statistics
+    (counts, aspect ratios, spacing regularity, left/right balance).
+    Coordinates are relative to the frame, so 1x and 2x exports of the
+    same design map to (nearly) the same vector.
+    """
+    boxes = np.asarray(layout_features['bounding_boxes'], dtype=np.float64).reshape(-1, 5)
+    text_rects = [(b['position']['x'], b['position']['y'], b['position']['w'], b['position']['h'])
+                  for b in layout_features['text_blocks']]
+    ratios = np.asarray(layout_features['element_ratios'], dtype=np.float64)
+    ratios = ratios[ratios > 0]
+    log_ratios = np.log(ratios) if ratios.size else np.zeros(1)
+    image_area = float(width * height)
+
+    box_grid = _grid_coverage(boxes[:, [BOX_X, BOX_Y, BOX_W, BOX_H]], width, height)
+    text_grid = _grid_coverage(text_rects, width, height)
+
+    spacing = layout_features['spacing_patterns'] or {}
+    centers = boxes[:, BOX_X] + boxes[:, BOX_W] / 2
+    box_count = len(boxes)
+    stats = np.array([
+        np.log1p(box_count) / np.log(101),
+        np.log1p(len(text_rects)) / np.log(51),
+        np.log(height / width) / 2,
+        log_ratios.mean(),
+        log_ratios.std(),
+        np.mean(ratios > 2) if ratios.size else 0.0,
+        np.mean(ratios < 0.5) if ratios.size else 0.0,
+        np.mean((ratios >= 0.8) & (ratios <= 1.2)) if ratios.size else 0.0,
+        _spacing_regularity(spacing.get('vertical', [])),
+        _spacing_regularity(spacing.get('horizontal', [])),
+        np.mean(centers < width / 2) if box_count else 0.0,
+        np.mean(centers > width / 2) if box_count else 0.0,
+        boxes[:, BOX_AREA].max() / image_area if box_count else 0.0,
+        sum(w * h for _, _, w, h in text_rects) / image_area,
+        np.mean(boxes[:, BOX_W]) / width if box_count else 0.0,
+        np.mean(boxes[:, BOX_H]) / height if box_count else 0.0,
+    ])
+    vector = np.concatenate([_unit(box_grid), _unit(text_grid), _unit(stats)])
+    return _unit(vector).astype(np.float32)
+
+
+class VectorIndex:
+    """Exact cosine nearest-neighbour search over one unit vector per component.
+
+    A brute-force matrix-vector product over float32 rows stays well under
+    a millisecond for tens of thousands of components, with no approximation.
+    """
+
+    def __init__(self, components, vectors, version=None):
+        self.components = list(components)
+        self.vectors = np.asarray(vectors, dtype=np.float32)
+        if self.vectors.shape != (len(self.components), VECTOR_DIM):
+            raise ValueError(f"Expected a {len(self.components)} x {VECTOR_DIM} vector array, "
+                             f"got {self.vectors.shape}")
+        self.version = version or vector_index_version(self.components, self.vectors)
+
+    def search(self, query, k=1, min_similarity=-1.0):
+        """Up to `k` (component, similarity) pairs, most similar first (ties in catalog order)."""
+        if len(self.components) == 0 or k <= 0:
+            return []
+        similarity = self.vectors @ np.asarray(query, dtype=np.float32)
+        if k < len(similarity):
+            nearest = np.argpartition(-similarity, k - 1)[:k]
+        else:
+            nearest = np.arange(len(similarity))
+        nearest = nearest[np.lexsort((nearest, -similarity[nearest]))]
+        return [(self.components[i], float(similarity[i])) for i in nearest.tolist()
+                if similarity[i] >= min_similarity]
+
+    def __len__(self):
+        return len(self.components)
+
+
+def vector_index_version(components, vectors):
+    digest = hashlib.sha256(json.dumps(components, sort_keys=True, default=str).encode('utf-8'))
+    digest.update(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+    return digest.hexdigest()[:16]
+
+
+def save_vector_index(index, path):
+    """Write a vector index directory at `path` (renamed into place when complete)."""
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    np.save(os.path.join(tmp_path, VECTOR_INDEX_VECTORS), np.ascontiguousarray(index.vectors))
+    meta = {
+        'feature_version': FEATURE_VERSION,
+        'dim': VECTOR_DIM,
+        'version': index.version,
+        'components': index.components,
+    }
+    with open(os.path.join(tmp_path, VECTOR_INDEX_META), 'w') as f:
+        json.dump(meta, f)
+    swap_directory(tmp_path, path)
+
+
+def load_vector_index(path, mmap=True):
+    """Load a vector index directory; the vectors are memory-mapped by default."""
+    with open(os.path.join(path, VECTOR_INDEX_META), 'r') as f:
+        meta = json.load(f)
+    if meta.get('feature_version') != FEATURE_VERSION or meta.get('dim') != VECTOR_DIM:
+        raise ValueError(f"Vector index {path} was built with feature version {meta.get('feature_version')}, "
+                         f"expected {FEATURE_VERSION}; rebuild it")
+    vectors = np.load(os.path.join(path, VECTOR_INDEX_VECTORS), mmap_mode='r' if mmap else None)
+    return VectorIndex(meta['components'], vectors, meta['version'])
+
+
+def find_screenshots(screenshot_dir, component_id):
+    """Reference screenshots for one component: <dir>/<id>.<ext> and <dir>/<id>/*.<ext>."""
+    paths = [os.path.join(screenshot_dir, component_id + ext) for ext in SCREENSHOT_EXTENSIONS]
+    paths = [path for path in paths if os.path.isfile(path)]
+    component_dir = os.path.join(screenshot_dir, component_id)
+    if os.path.isdir(component_dir):
+        paths.extend(os.path.join(component_dir, name) for name in sorted(os.listdir(component_dir))
+                     if name.lower().endswith(SCREENSHOT_EXTENSIONS))
+    return paths
+
+
+def build_vector_index(components, screenshot_dir, analyze, decode):
+    """Vector index over the components that have reference screenshots.
+
+    `decode(bytes)` returns a BGR image (or None) and `analyze(img)` the
+    layout features, normally app.decode_image_bytes and app.analyze_image.
+    """
+    indexed, vectors = [], []
+    for component in components:
+        component_id = str(component.get('id') or '')
+        if not component_id:
+            # An empty id would make screenshot_dir itself the component's directory
+            print(f"Component {component.get('name', '(unnamed)')!r} has no id; not indexed")
+            continue
+        component_vectors = []
+        for path in find_screenshots(screenshot_dir, component_id):
+            with open(path, 'rb') as f:
+                img = decode(f.read())
+            if img is None:
+                print(f"Skipping unreadable screenshot {path}")
+                continue
+            component_vectors.append(layout_vector(analyze(img), img.shape[1], img.shape[0]))
+        if not component_vectors:
+            print(f"No reference screenshots for {component_id}; not indexed")
+            continue
+        indexed.append(component)
+        vectors.append(_unit(np.mean(component_vectors, axis=0)))
+    return VectorIndex(indexed, np.array(vectors, dtype=np.float32).reshape(-1, VECTOR_DIM))
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Reference-screenshot vector index tools.')
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    build_parser = subcommands.add_parser('build', help='Build a vector index from reference screenshots.')
+    build_parser.add_argument('catalog', help='Component list (relume_data.json)')
+    build_parser.add_argument('screenshots', help='Directory of reference screenshots named by component id')
+    build_parser.add_argument('output', help='Vector index directory to write')
+    args = parser.parse_args(argv)
+
+    import app  # analysis pipeline and its OCR configuration
+
+    with open(args.catalog, 'r') as f:
+        components = json.load(f)
+    index = build_vector_index(components, args.screenshots, app.analyze_image, app.decode_image_bytes)
+    save_vector_index(index, args.output)
+    print(f"Indexed {len(index)} of {len(components)} components (version {index.version}) into {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())